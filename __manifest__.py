@@ -17,7 +17,7 @@
     'website': "https://www.yourcompany.com",
 
     'category': 'Accounting',
-    'version': '1.0',
+    'version': '1.2',
 
     # any module necessary for this one to work correctly
     'depends': ['base', 'mail'],
@@ -27,9 +27,25 @@
         'security/cartera_security.xml',
         'security/ir.model.access.csv',
         'security/cartera_record_rules.xml',
+        'data/ir_cron_data.xml',
+        'views/eps_caja_views.xml',
         'views/cartera_credito_views.xml',
         'views/cartera_cuota_views.xml',
         'views/cartera_pago_views.xml',
+        'views/cartera_garante_views.xml',
+        'views/cartera_mora_views.xml',
+        'views/cartera_indicador_views.xml',
+        'views/cartera_reestructuracion_views.xml',
+        'views/cartera_corte_views.xml',
+        'views/cartera_estado_cuenta_views.xml',
+        'report/cartera_estado_cuenta_report.xml',
+        'views/cartera_pago_import_wizard_views.xml',
+        'views/cartera_abono_wizard_views.xml',
+        'views/cartera_reestructuracion_wizard_views.xml',
+        'views/cartera_estres_wizard_views.xml',
+        'views/eps_socio_views.xml',
+        'views/eps_socio_import_wizard_views.xml',
+        'views/eps_socio_export_wizard_views.xml',
         'views/cartera_menu.xml',
         'views/res_users_views.xml',
         'views/views.xml',
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+from werkzeug.utils import send_file
+
+from odoo import http
+from odoo.http import request
+
+
+class ExportacionSocios(http.Controller):
+    """Descarga del listado de socios generado por eps.socio.export.wizard"""
+
+    @http.route('/prefectura_ute_6/socios/exportar/<int:wizard_id>', type='http', auth='user')
+    def exportar_socios(self, wizard_id, **kw):
+        asistente = request.env['eps.socio.export.wizard'].browse(wizard_id).exists()
+        if not asistente:
+            raise request.not_found()
+        asistente.check_access('read')
+        archivo, nombre, mimetype = asistente._generar_archivo()
+        # El archivo temporal se cierra (y se borra) al terminar el envío
+        return send_file(
+            archivo, request.httprequest.environ,
+            mimetype=mimetype, as_attachment=True, download_name=nombre,
+            conditional=False, etag=False, response_class=http.Response,
+        )
@@ -10,7 +10,7 @@
     'author': "Yandri",
     'category': 'Accounting',
     'version': '1.0',
-    'depends': ['base', 'mail', 'account'],
+    'depends': ['base', 'mail', 'account', 'prefectura_ute_6'],
     'data': [
         'security/ir.model.access.csv',
         'data/ir_sequence_data.xml',
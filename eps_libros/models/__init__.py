@@ -1,2 +1,3 @@
 # -*- coding: utf-8 -*-
-from . import eps_egreso
\ No newline at end of file
+from . import eps_egreso
+from . import ir_sequence
@@ -13,6 +13,9 @@ class EpsEgreso(models.Model):
     
     fecha = fields.Date(string='Fecha', required=True, default=fields.Date.context_today, tracking=True)
     
+    caja_id = fields.Many2one('eps.caja', string='Caja de Ahorro', tracking=True, index=True,
+                              ondelete='restrict')
+    
     beneficiario = fields.Char(string='Beneficiario', required=True, tracking=True, 
                               help="Persona que recibe el dinero")
     
@@ -46,12 +49,15 @@ class EpsEgreso(models.Model):
         ('cancel', 'Anulado')
     ], string='Estado', default='draft', tracking=True)
 
-    #SECUENCIA AUTOMÁTICA 
+    #SECUENCIA AUTOMÁTICA (un bloque de números por caja en cada lote)
     @api.model_create_multi
     def create(self, vals_list):
-        for vals in vals_list:
-            if vals.get('name', 'Nuevo') == 'Nuevo':
-                vals['name'] = self.env['ir.sequence'].next_by_code('eps.egreso') or 'Nuevo'
+        nuevos = [vals for vals in vals_list if vals.get('name', 'Nuevo') == 'Nuevo']
+        nombres = self.env['ir.sequence'].siguientes_por_caja(
+            'eps.egreso', [vals.get('caja_id') for vals in nuevos]
+        )
+        for vals, nombre in zip(nuevos, nombres):
+            vals['name'] = nombre
         return super(EpsEgreso, self).create(vals_list)
 
     #ACCIONES (Validar, Anular, Borrador) 
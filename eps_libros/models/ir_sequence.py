@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+from odoo import models, api
+
+
+class IrSequence(models.Model):
+    _inherit = 'ir.sequence'
+
+    @api.model
+    def _codigos_por_caja(self):
+        return super(IrSequence, self)._codigos_por_caja() + ['eps.egreso']
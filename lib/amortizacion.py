@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""Motor de amortización independiente del ORM.
+
+Calcula tablas de amortización (método francés y alemán) con Python puro,
+de modo que pueda usarse desde ``cartera.credito``, desde el simulador de
+créditos o desde procesos por lotes sin cargar registros de la base de datos.
+"""
+import calendar
+import math
+from collections import namedtuple
+from datetime import date
+from functools import lru_cache
+
+METODOS = ('frances', 'aleman')
+
+# Número máximo de simulaciones que se conservan en memoria
+TAMANO_CACHE = 4096
+
+Cuota = namedtuple('Cuota', [
+    'numero_cuota',
+    'fecha_vencimiento',
+    'monto_capital',
+    'monto_interes',
+    'monto_total',
+    'saldo_inicial',
+    'saldo_final',
+])
+
+
+def sumar_meses(fecha, meses):
+    """Suma meses a una fecha ajustando el día al fin de mes (igual que relativedelta)"""
+    total = fecha.month - 1 + meses
+    anio = fecha.year + total // 12
+    mes = total % 12 + 1
+    dia = min(fecha.day, calendar.monthrange(anio, mes)[1])
+    return date(anio, mes, dia)
+
+
+def tasa_mensual(tasa_anual):
+    """Convierte una tasa anual en porcentaje a tasa mensual decimal"""
+    return tasa_anual / 100 / 12
+
+
+def cuota_francesa(monto, plazo, tasa_mes):
+    """Cuota constante del método francés"""
+    if tasa_mes == 0:
+        return monto / plazo
+    factor = math.pow(1 + tasa_mes, plazo)
+    return monto * (tasa_mes * factor) / (factor - 1)
+
+
+def _validar_parametros(monto, plazo, tasa, metodo):
+    if monto <= 0:
+        raise ValueError('El monto debe ser mayor a cero.')
+    if plazo <= 0:
+        raise ValueError('El plazo debe ser mayor a cero.')
+    if tasa < 0:
+        raise ValueError('La tasa de interés debe ser mayor o igual a cero.')
+    if metodo not in METODOS:
+        raise ValueError(f'Método de amortización no soportado: {metodo}')
+
+
+def _componentes_frances(monto, plazo, tasa_mes):
+    """Devuelve las listas de intereses, capitales y totales del método francés"""
+    cuota_fija = cuota_francesa(monto, plazo, tasa_mes)
+    intereses = [0.0] * plazo
+    capitales = [0.0] * plazo
+    totales = [cuota_fija] * plazo
+    saldo = monto
+    for k in range(plazo - 1):
+        interes = saldo * tasa_mes
+        capital = cuota_fija - interes
+        intereses[k] = interes
+        capitales[k] = capital
+        saldo -= capital
+    # La última cuota liquida el saldo remanente por redondeo
+    intereses[-1] = saldo * tasa_mes
+    capitales[-1] = saldo
+    totales[-1] = saldo + intereses[-1]
+    return intereses, capitales, totales
+
+
+def _componentes_aleman(monto, plazo, tasa_mes):
+    """Devuelve las listas de intereses, capitales y totales del método alemán"""
+    capital_fijo = monto / plazo
+    capitales = [capital_fijo] * plazo
+    intereses = [(monto - capital_fijo * k) * tasa_mes for k in range(plazo)]
+    totales = [capital_fijo + interes for interes in intereses]
+    return intereses, capitales, totales
+
+
+def calcular_tabla(monto, plazo, tasa, metodo, fecha):
+    """Calcula la tabla de amortización completa.
+
+    :param monto: capital del crédito
+    :param plazo: número de cuotas mensuales
+    :param tasa: tasa de interés anual en porcentaje
+    :param metodo: ``'frances'`` o ``'aleman'``
+    :param fecha: fecha de desembolso; la cuota *i* vence *i* meses después
+    :return: tupla de :class:`Cuota`
+    """
+    _validar_parametros(monto, plazo, tasa, metodo)
+    tasa_mes = tasa_mensual(tasa)
+
+    if metodo == 'frances':
+        intereses, capitales, totales = _componentes_frances(monto, plazo, tasa_mes)
+    else:
+        intereses, capitales, totales = _componentes_aleman(monto, plazo, tasa_mes)
+
+    tabla = []
+    saldo = monto
+    for k in range(plazo):
+        capital = capitales[k]
+        saldo_inicial = saldo
+        saldo = saldo - capital
+        tabla.append(Cuota(
+            k + 1,
+            sumar_meses(fecha, k + 1),
+            capital,
+            intereses[k],
+            totales[k],
+            saldo_inicial,
+            max(0, saldo),
+        ))
+    return tuple(tabla)
+
+
+def plazo_para_cuota(monto, cuota, tasa, metodo):
+    """Número de cuotas necesarias para amortizar ``monto`` manteniendo la cuota.
+
+    Para el método francés ``cuota`` es el dividendo fijo; para el alemán es
+    la amortización fija de capital. Se usa al reestructurar con reducción de
+    plazo, donde el socio conserva el valor que ya venía pagando.
+    """
+    _validar_parametros(monto, 1, tasa, metodo)
+    if cuota <= 0:
+        raise ValueError('La cuota debe ser mayor a cero.')
+
+    tasa_mes = tasa_mensual(tasa)
+    if metodo == 'aleman' or tasa_mes == 0:
+        plazo = monto / cuota
+    else:
+        if cuota <= monto * tasa_mes:
+            raise ValueError('La cuota no alcanza a cubrir el interés del periodo.')
+        plazo = -math.log(1 - tasa_mes * monto / cuota) / math.log(1 + tasa_mes)
+    # Tolerancia para que 12.0000001 no se convierta en 13 cuotas
+    return max(1, math.ceil(plazo - 1e-9))
+
+
+@lru_cache(maxsize=TAMANO_CACHE)
+def simular(monto, plazo, tasa, metodo, fecha):
+    """Versión memorizada de :func:`calcular_tabla`.
+
+    La clave es (monto, plazo, tasa, método, fecha); al ser inmutable, el
+    resultado puede compartirse entre llamadas sin riesgo de modificarse.
+    """
+    return calcular_tabla(monto, plazo, tasa, metodo, fecha)
+
+
+def resumen(tabla):
+    """Totales de una tabla de amortización"""
+    total_interes = sum(c.monto_interes for c in tabla)
+    total_capital = sum(c.monto_capital for c in tabla)
+    return {
+        'num_cuotas': len(tabla),
+        'total_capital': total_capital,
+        'total_interes': total_interes,
+        'total_a_pagar': total_capital + total_interes,
+    }
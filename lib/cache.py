@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""Caché en memoria acotada con validación por versión.
+
+Cada entrada se guarda junto con una marca de versión (por ejemplo, el
+número de registros y la última fecha de escritura de una caja). Si al leer
+la marca ya no coincide, la entrada se descarta; así la caché se invalida
+sola cuando cambian los datos, también entre distintos workers.
+"""
+import threading
+from collections import OrderedDict
+
+_SIN_VALOR = object()
+
+
+class CacheVersionada:
+    """Caché LRU con un número máximo de entradas"""
+
+    def __init__(self, tamano=256):
+        self.tamano = tamano
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave, version, defecto=None):
+        """Devuelve el valor guardado para la clave si su versión sigue vigente"""
+        with self._lock:
+            entrada = self._datos.get(clave, _SIN_VALOR)
+            if entrada is _SIN_VALOR or entrada[0] != version:
+                return defecto
+            self._datos.move_to_end(clave)
+            return entrada[1]
+
+    def guardar(self, clave, version, valor):
+        with self._lock:
+            self._datos[clave] = (version, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.tamano:
+                self._datos.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""Carga columnar de datos de cartera para cálculos analíticos.
+
+Los resultados de una consulta se leen por lotes con un cursor del lado del
+servidor (cursor con nombre de psycopg2) y se guardan en columnas
+``array.array``: un número ocupa 8 bytes en lugar de un objeto Python por
+celda, y no se crean registros del ORM. Si NumPy está instalado, cada
+columna se puede ver como arreglo sin copiar memoria y las agregaciones se
+hacen de forma vectorizada; sin NumPy se usa un recorrido en Python puro.
+"""
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Filas que se traen del servidor en cada viaje
+TAMANO_LOTE = 10000
+
+# tipo lógico -> (código de array, conversión del valor leído, dtype de NumPy)
+TIPOS = {
+    'entero': ('q', lambda valor: valor or 0, 'int64'),
+    'decimal': ('d', lambda valor: float(valor) if valor is not None else 0.0, 'float64'),
+    # Las fechas se guardan como ordinal (date.toordinal); 0 representa NULL
+    'fecha': ('q', lambda valor: valor.toordinal() if valor else 0, 'int64'),
+}
+
+
+class Columnas:
+    """Conjunto de columnas de igual longitud, accesibles por nombre"""
+
+    def __init__(self, esquema):
+        self.esquema = list(esquema)
+        self._columnas = {
+            nombre: array(TIPOS[tipo][0]) for nombre, tipo in self.esquema
+        }
+
+    def __getitem__(self, nombre):
+        return self._columnas[nombre]
+
+    def __contains__(self, nombre):
+        return nombre in self._columnas
+
+    def __len__(self):
+        if not self.esquema:
+            return 0
+        return len(self._columnas[self.esquema[0][0]])
+
+    @property
+    def nombres(self):
+        return [nombre for nombre, __ in self.esquema]
+
+    def agregar_filas(self, filas):
+        """Añade un lote de tuplas en el orden del esquema"""
+        if not filas:
+            return
+        for (nombre, tipo), valores in zip(self.esquema, zip(*filas)):
+            self._columnas[nombre].extend(map(TIPOS[tipo][1], valores))
+
+    def numpy(self, nombre):
+        """Vista NumPy (sin copia) de una columna; requiere NumPy"""
+        if numpy is None:
+            raise ImportError('NumPy no está instalado.')
+        tipo = dict(self.esquema)[nombre]
+        return numpy.frombuffer(self._columnas[nombre], dtype=TIPOS[tipo][2])
+
+    def memoria(self):
+        """Bytes ocupados por los datos de todas las columnas"""
+        return sum(col.itemsize * len(col) for col in self._columnas.values())
+
+
+def cargar(conexion, consulta, params, esquema, nombre='cartera_columnar', tamano_lote=TAMANO_LOTE):
+    """Ejecuta ``consulta`` con un cursor del lado del servidor y devuelve :class:`Columnas`.
+
+    :param conexion: conexión psycopg2; el cursor con nombre comparte su
+        transacción, por lo que ve los datos ya enviados a la base
+    :param esquema: lista de (nombre, tipo) en el orden de las columnas del SELECT
+    :param nombre: nombre del cursor en el servidor (único dentro de la transacción)
+    """
+    columnas = Columnas(esquema)
+    cursor = conexion.cursor(name=nombre)
+    cursor.itersize = tamano_lote
+    try:
+        cursor.execute(consulta, params)
+        while True:
+            filas = cursor.fetchmany(tamano_lote)
+            if not filas:
+                break
+            columnas.agregar_filas(filas)
+    finally:
+        cursor.close()
+    return columnas
+
+
+def sumar_por(claves, valores, mascara=None):
+    """Suma ``valores`` agrupando por ``claves``; devuelve {clave: suma}.
+
+    :param mascara: secuencia opcional de booleanos; solo se suman las
+        posiciones verdaderas
+    """
+    if numpy is not None:
+        claves = numpy.asarray(claves)
+        valores = numpy.asarray(valores, dtype='float64')
+        if mascara is not None:
+            mascara = numpy.asarray(mascara, dtype=bool)
+            claves, valores = claves[mascara], valores[mascara]
+        unicas, posiciones = numpy.unique(claves, return_inverse=True)
+        sumas = numpy.bincount(posiciones, weights=valores, minlength=len(unicas))
+        return dict(zip(unicas.tolist(), sumas.tolist()))
+
+    sumas = {}
+    if mascara is None:
+        for clave, valor in zip(claves, valores):
+            sumas[clave] = sumas.get(clave, 0.0) + valor
+    else:
+        for clave, valor, incluir in zip(claves, valores, mascara):
+            if incluir:
+                sumas[clave] = sumas.get(clave, 0.0) + valor
+    return sumas
+
+
+def contar_por(claves, mascara=None):
+    """Número de posiciones por clave; devuelve {clave: cantidad}"""
+    if numpy is not None:
+        claves = numpy.asarray(claves)
+        if mascara is not None:
+            claves = claves[numpy.asarray(mascara, dtype=bool)]
+        unicas, cantidades = numpy.unique(claves, return_counts=True)
+        return dict(zip(unicas.tolist(), cantidades.tolist()))
+
+    return {
+        clave: int(suma)
+        for clave, suma in sumar_por(claves, [1] * len(claves), mascara).items()
+    }
+
+
+def resumir_cartera(creditos, cuotas, corte):
+    """Indicadores por caja calculados sobre columnas de créditos y cuotas.
+
+    :param creditos: :class:`Columnas` con ``caja_id`` y ``monto``
+    :param corte: fecha de corte (``date``); las cuotas con vencimiento
+        anterior y saldo pendiente cuentan como vencidas
+    :return: {caja_id: {'num_creditos', 'monto_desembolsado',
+        'capital_pendiente', 'saldo_pendiente', 'monto_vencido'}}
+    """
+    corte = corte.toordinal()
+    if numpy is not None:
+        saldo = cuotas.numpy('saldo_pendiente')
+        interes_pendiente = numpy.maximum(cuotas.numpy('monto_interes') - cuotas.numpy('monto_pagado'), 0)
+        capital = numpy.maximum(saldo - interes_pendiente, 0)
+        vencida = (cuotas.numpy('fecha_vencimiento') < corte) & (saldo > 0.01)
+    else:
+        saldo = cuotas['saldo_pendiente']
+        capital = [
+            max(s - max(i - p, 0), 0)
+            for s, i, p in zip(saldo, cuotas['monto_interes'], cuotas['monto_pagado'])
+        ]
+        vencida = [f < corte and s > 0.01 for f, s in zip(cuotas['fecha_vencimiento'], saldo)]
+
+    indicadores = {
+        'num_creditos': contar_por(creditos['caja_id']),
+        'monto_desembolsado': sumar_por(creditos['caja_id'], creditos['monto']),
+        'capital_pendiente': sumar_por(cuotas['caja_id'], capital),
+        'saldo_pendiente': sumar_por(cuotas['caja_id'], saldo),
+        'monto_vencido': sumar_por(cuotas['caja_id'], saldo, vencida),
+    }
+    resultado = {}
+    for indicador, valores in indicadores.items():
+        for caja_id, valor in valores.items():
+            fila = resultado.setdefault(caja_id, dict.fromkeys(indicadores, 0))
+            fila[indicador] = valor
+    return resultado
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""Pruebas de estrés y simulaciones "qué pasaría si" sobre la cartera.
+
+Recalcula la amortización restante de cada crédito bajo distintos
+escenarios (choque de tasa, incumplimiento y prepago) y agrega los
+resultados por escenario y por caja. Trabaja solo con tuplas de números
+obtenidas de la carga columnar, por lo que nunca escribe en la base de datos.
+
+Con numpy, cada escenario avanza mes a mes sobre todos los créditos a la vez
+(un vector por columna) en el mismo proceso; sin numpy se usa el cálculo
+crédito por crédito, con los mismos resultados.
+"""
+import math
+
+from .amortizacion import cuota_francesa, tasa_mensual
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+ESCENARIO_BASE = {
+    'nombre': 'Base',
+    'choque_tasa': 0.0,
+    'tasa_incumplimiento': 0.0,
+    'tasa_prepago': 0.0,
+}
+
+RESULTADOS = ('capital', 'interes_esperado', 'perdida_esperada', 'prepago_esperado', 'cuota_inicial')
+
+
+def estado_creditos(creditos, cuotas):
+    """Capital pendiente y cuotas restantes de cada crédito.
+
+    :param creditos: ``Columnas`` con id, caja_id, tasa y es_aleman
+    :param cuotas: ``Columnas`` con credito_id, monto_interes, monto_pagado
+        y saldo_pendiente, ordenadas por crédito
+    :return: lista de tuplas (credito_id, caja_id, capital, plazo_restante, tasa, es_aleman)
+    """
+    capital = {}
+    plazo = {}
+    for credito_id, interes, pagado, saldo in zip(
+        cuotas['credito_id'], cuotas['monto_interes'], cuotas['monto_pagado'], cuotas['saldo_pendiente']
+    ):
+        if saldo <= 0.01:
+            continue
+        capital[credito_id] = capital.get(credito_id, 0.0) + max(saldo - max(interes - pagado, 0), 0)
+        plazo[credito_id] = plazo.get(credito_id, 0) + 1
+
+    return [
+        (credito_id, caja_id, capital[credito_id], plazo[credito_id], tasa, es_aleman)
+        for credito_id, caja_id, tasa, es_aleman in zip(
+            creditos['id'], creditos['caja_id'], creditos['tasa'], creditos['es_aleman']
+        )
+        if capital.get(credito_id, 0.0) > 0.01
+    ]
+
+
+def _tasa_mensual_equivalente(tasa_anual):
+    """Convierte una tasa anual de eventos (en porcentaje) a probabilidad mensual"""
+    return 1 - math.pow(1 - min(tasa_anual, 100) / 100, 1 / 12)
+
+
+def proyectar_credito(capital, plazo, tasa, es_aleman, escenario):
+    """Proyecta el saldo restante de un crédito mes a mes bajo un escenario.
+
+    Cada mes se castiga primero la fracción incumplida del saldo, luego se
+    cobra el interés y la amortización programada, y por último se aplica el
+    prepago sobre el saldo remanente. Tras un prepago se mantiene el plazo y
+    se recalcula la cuota.
+
+    :return: tupla con los valores de :data:`RESULTADOS`
+    """
+    tasa_mes = tasa_mensual(max(tasa + escenario['choque_tasa'], 0))
+    incumplimiento = _tasa_mensual_equivalente(escenario['tasa_incumplimiento'])
+    prepago = _tasa_mensual_equivalente(escenario['tasa_prepago'])
+
+    if es_aleman:
+        cuota_inicial = capital / plazo + capital * tasa_mes
+    else:
+        cuota_inicial = cuota_francesa(capital, plazo, tasa_mes)
+
+    saldo = capital
+    interes_total = perdida_total = prepago_total = 0.0
+    for restantes in range(plazo, 0, -1):
+        perdida = saldo * incumplimiento
+        saldo -= perdida
+        interes = saldo * tasa_mes
+        if es_aleman:
+            programado = saldo / restantes
+        else:
+            programado = cuota_francesa(saldo, restantes, tasa_mes) - interes
+        anticipado = (saldo - programado) * prepago
+        saldo -= programado + anticipado
+
+        interes_total += interes
+        perdida_total += perdida
+        prepago_total += anticipado
+
+    return capital, interes_total, perdida_total, prepago_total, cuota_inicial
+
+
+def _evaluar_lote(creditos, escenarios):
+    """Totales por (escenario, caja), crédito por crédito"""
+    totales = {}
+    for indice, escenario in enumerate(escenarios):
+        for __, caja_id, capital, plazo, tasa, es_aleman in creditos:
+            resultado = proyectar_credito(capital, plazo, tasa, es_aleman, escenario)
+            acumulado = totales.setdefault((indice, caja_id), [0] + [0.0] * len(RESULTADOS))
+            acumulado[0] += 1
+            for posicion, valor in enumerate(resultado, start=1):
+                acumulado[posicion] += valor
+    return totales
+
+
+def _cuota_francesa_vector(monto, plazo, tasa_mes):
+    """:func:`cuota_francesa` sobre vectores; ``plazo`` debe ser al menos 1"""
+    factor = numpy.power(1 + tasa_mes, plazo)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        return numpy.where(tasa_mes > 0, monto * tasa_mes * factor / (factor - 1), monto / plazo)
+
+
+def _evaluar_vectorizado(creditos, escenarios):
+    """Igual que :func:`_evaluar_lote`, con las mismas reglas de :func:`proyectar_credito`
+    aplicadas a todos los créditos en cada mes"""
+    __, cajas, capital, plazo, tasa, es_aleman = (numpy.asarray(columna) for columna in zip(*creditos))
+    capital = capital.astype('float64')
+    plazo = plazo.astype('int64')
+    tasa = tasa.astype('float64')
+    es_aleman = es_aleman.astype(bool)
+    unicas, posiciones = numpy.unique(cajas, return_inverse=True)
+    conteo = numpy.bincount(posiciones, minlength=len(unicas))
+
+    totales = {}
+    for indice, escenario in enumerate(escenarios):
+        tasa_mes = numpy.maximum(tasa + escenario['choque_tasa'], 0) / 100 / 12
+        incumplimiento = _tasa_mensual_equivalente(escenario['tasa_incumplimiento'])
+        prepago = _tasa_mensual_equivalente(escenario['tasa_prepago'])
+
+        cuota_inicial = numpy.where(
+            es_aleman, capital / plazo + capital * tasa_mes, _cuota_francesa_vector(capital, plazo, tasa_mes)
+        )
+        saldo = capital.copy()
+        interes_total = numpy.zeros_like(saldo)
+        perdida_total = numpy.zeros_like(saldo)
+        prepago_total = numpy.zeros_like(saldo)
+        for mes in range(int(plazo.max())):
+            restantes = plazo - mes
+            activos = restantes > 0
+            restantes = numpy.maximum(restantes, 1)
+
+            perdida = numpy.where(activos, saldo * incumplimiento, 0.0)
+            saldo = saldo - perdida
+            interes = numpy.where(activos, saldo * tasa_mes, 0.0)
+            programado = numpy.where(
+                es_aleman, saldo / restantes, _cuota_francesa_vector(saldo, restantes, tasa_mes) - interes
+            )
+            programado = numpy.where(activos, programado, 0.0)
+            anticipado = numpy.where(activos, (saldo - programado) * prepago, 0.0)
+            saldo = saldo - programado - anticipado
+
+            interes_total += interes
+            perdida_total += perdida
+            prepago_total += anticipado
+
+        sumas = [
+            numpy.bincount(posiciones, weights=columna, minlength=len(unicas)).tolist()
+            for columna in (capital, interes_total, perdida_total, prepago_total, cuota_inicial)
+        ]
+        for posicion, caja_id in enumerate(unicas.tolist()):
+            totales[(indice, caja_id)] = [int(conteo[posicion])] + [suma[posicion] for suma in sumas]
+    return totales
+
+
+def simular(creditos, escenarios):
+    """Evalúa los escenarios sobre toda la cartera.
+
+    :param creditos: lista de tuplas devuelta por :func:`estado_creditos`
+    :param escenarios: lista de dicts con 'nombre', 'choque_tasa' (puntos
+        porcentuales sobre la tasa anual), 'tasa_incumplimiento' y
+        'tasa_prepago' (porcentajes anuales); el escenario base se agrega
+        siempre al inicio
+    :return: lista de dicts por escenario con totales y detalle ``por_caja``
+    """
+    escenarios = [ESCENARIO_BASE] + [dict(ESCENARIO_BASE, **escenario) for escenario in escenarios]
+    if numpy is not None and creditos:
+        totales = _evaluar_vectorizado(creditos, escenarios)
+    else:
+        totales = _evaluar_lote(creditos, escenarios)
+
+    resultado = []
+    for indice, escenario in enumerate(escenarios):
+        por_caja = {
+            caja_id: valores
+            for (posicion, caja_id), valores in totales.items()
+            if posicion == indice
+        }
+        fila = _fila([sum(columna) for columna in zip(*por_caja.values())] or [0] * (len(RESULTADOS) + 1))
+        fila.update(
+            nombre=escenario['nombre'],
+            escenario=escenario,
+            por_caja={caja_id: _fila(valores) for caja_id, valores in por_caja.items()},
+        )
+        resultado.append(fila)
+
+    interes_base = resultado[0]['interes_esperado']
+    for fila in resultado:
+        fila['variacion_interes'] = fila['interes_esperado'] - interes_base
+    return resultado
+
+
+def _fila(valores):
+    """Convierte los acumulados de un grupo en un dict de resultados"""
+    num_creditos = valores[0]
+    fila = dict(zip(RESULTADOS, valores[1:]))
+    fila['num_creditos'] = num_creditos
+    fila['cuota_promedio'] = fila.pop('cuota_inicial') / num_creditos if num_creditos else 0.0
+    return fila
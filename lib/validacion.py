@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""Validación de cédulas y teléfonos ecuatorianos.
+
+Un único lugar para las reglas que usan las restricciones, los onchange y
+los asistentes de importación. Cada función devuelve el código del error o
+``None`` si el valor es válido; el texto traducible de cada código lo arma
+``eps.socio._mensaje_validacion``. Los resultados por valor se guardan en una
+caché LRU: al importar o revalidar muchos socios, las cédulas repetidas no
+se vuelven a calcular.
+"""
+from functools import lru_cache
+
+# Entradas guardadas en la caché de cada validador (por proceso)
+TAMANO_CACHE = 65536
+
+# Códigos de error
+CEDULA_NO_NUMERICA = 'cedula_no_numerica'
+CEDULA_LONGITUD = 'cedula_longitud'
+CEDULA_PROVINCIA = 'cedula_provincia'
+CEDULA_TERCER_DIGITO = 'cedula_tercer_digito'
+CEDULA_VERIFICADOR = 'cedula_verificador'
+TELEFONO_NO_NUMERICO = 'telefono_no_numerico'
+TELEFONO_LONGITUD = 'telefono_longitud'
+
+# Resultado de multiplicar por 2 un dígito y restar 9 si pasa de 9
+_DOBLE = (0, 2, 4, 6, 8, 1, 3, 5, 7, 9)
+
+
+def normalizar(valor):
+    """Quita espacios y guiones de una cédula o teléfono"""
+    if valor is None or valor is False:
+        return ''
+    return str(valor).strip().replace(' ', '').replace('-', '')
+
+
+@lru_cache(maxsize=TAMANO_CACHE)
+def _validar_cedula(cedula):
+    if not cedula.isdigit():
+        return CEDULA_NO_NUMERICA
+    if len(cedula) != 10:
+        return CEDULA_LONGITUD
+    if not 1 <= int(cedula[0:2]) <= 24:
+        return CEDULA_PROVINCIA
+    if int(cedula[2]) > 5:
+        return CEDULA_TERCER_DIGITO
+
+    # Coeficientes 2, 1, 2, 1, ...: posiciones pares se duplican
+    digitos = [int(digito) for digito in cedula]
+    suma = sum(_DOBLE[d] for d in digitos[0:9:2]) + sum(digitos[1:9:2])
+    if (10 - suma % 10) % 10 != digitos[9]:
+        return CEDULA_VERIFICADOR
+    return None
+
+
+def validar_cedula(cedula):
+    """Valida una cédula ecuatoriana con el algoritmo del dígito verificador.
+
+    :return: código de error, o ``None`` si la cédula es válida
+    """
+    return _validar_cedula(normalizar(cedula))
+
+
+@lru_cache(maxsize=TAMANO_CACHE)
+def _validar_telefono(telefono):
+    if not telefono.isdigit():
+        return TELEFONO_NO_NUMERICO
+    if len(telefono) != 10:
+        return TELEFONO_LONGITUD
+    return None
+
+
+def validar_telefono(telefono):
+    """Valida que el teléfono tenga exactamente 10 dígitos.
+
+    :return: código de error, o ``None`` si el teléfono es válido
+    """
+    return _validar_telefono(normalizar(telefono))
+
+
+def validar_cedulas(cedulas):
+    """Valida una lista de cédulas de una sola vez.
+
+    :return: lista, en el mismo orden, de tuplas (cédula normalizada, error);
+        ``error`` es un código, o ``None`` para las cédulas válidas
+    """
+    normalizadas = [normalizar(cedula) for cedula in cedulas]
+    return list(zip(normalizadas, map(_validar_cedula, normalizadas)))
+
+
+def validar_telefonos(telefonos):
+    """Igual que :func:`validar_cedulas`, para teléfonos"""
+    normalizados = [normalizar(telefono) for telefono in telefonos]
+    return list(zip(normalizados, map(_validar_telefono, normalizados)))
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from odoo.exceptions import UserError
+from odoo.tools import sql
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    """Crear y llenar eps_socio.cedula_norm antes de que el ORM cargue el modelo.
+
+    Al existir la columna, el ORM no recalcula el campo socio por socio, y la
+    restricción UNIQUE(caja_id, cedula_norm) se crea sobre datos ya
+    normalizados. La restricción anterior sobre la cédula sin normalizar se
+    elimina.
+
+    Si hay socios que solo difieren en el formato de la cédula, la
+    actualización se detiene: sin ella la restricción no podría crearse y
+    los duplicados seguirían entrando. Deben depurarse antes de reintentar.
+    """
+    if not sql.table_exists(cr, 'eps_socio'):
+        return
+
+    if not sql.column_exists(cr, 'eps_socio', 'cedula_norm'):
+        sql.create_column(cr, 'eps_socio', 'cedula_norm', 'varchar')
+    cr.execute("""
+        UPDATE eps_socio
+           SET cedula_norm = NULLIF(regexp_replace(trim(cedula), '[ -]', '', 'g'), '')
+         WHERE cedula_norm IS DISTINCT FROM NULLIF(regexp_replace(trim(cedula), '[ -]', '', 'g'), '')
+    """)
+    _logger.info('eps_socio.cedula_norm actualizada en %s socios', cr.rowcount)
+
+    cr.execute("ALTER TABLE eps_socio DROP CONSTRAINT IF EXISTS eps_socio_cedula_caja_unique")
+
+    cr.execute("""
+        SELECT caja_id, cedula_norm, array_agg(id ORDER BY id)
+          FROM eps_socio
+         WHERE cedula_norm IS NOT NULL
+      GROUP BY caja_id, cedula_norm
+        HAVING count(*) > 1
+      ORDER BY caja_id, cedula_norm
+    """)
+    duplicados = cr.fetchall()
+    if duplicados:
+        detalle = '\n'.join(
+            f'- Caja {caja_id}, cédula {cedula}: socios {socio_ids}'
+            for caja_id, cedula, socio_ids in duplicados[:50]
+        )
+        if len(duplicados) > 50:
+            detalle += f'\n... y {len(duplicados) - 50} cédulas más'
+        raise UserError(
+            'No se puede actualizar el módulo: hay socios con la misma cédula en una caja '
+            '(solo cambia el formato). Fusione o elimine los duplicados y vuelva a intentarlo.\n'
+            + detalle
+        )
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+from odoo.tools import sql
+
+
+def migrate(cr, version):
+    """Crear y llenar eps_socio.cumpleanos_clave en SQL, sin recalcular socio por socio"""
+    if not sql.table_exists(cr, 'eps_socio'):
+        return
+
+    if not sql.column_exists(cr, 'eps_socio', 'cumpleanos_clave'):
+        sql.create_column(cr, 'eps_socio', 'cumpleanos_clave', 'varchar')
+    cr.execute("""
+        UPDATE eps_socio
+           SET cumpleanos_clave = to_char(fecha_nacimiento, 'MM-DD')
+         WHERE fecha_nacimiento IS NOT NULL
+    """)
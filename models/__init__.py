@@ -1,2 +1,11 @@
+from . import eps_caja
+from . import eps_socio
 from . import models
+from . import cartera_garante
+from . import cartera_mora
+from . import cartera_indicador
+from . import cartera_reestructuracion
+from . import cartera_corte
+from . import cartera_estado_cuenta
 from . import res_users
+from . import ir_sequence
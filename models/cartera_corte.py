@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+import logging
+from datetime import timedelta
+
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+TRAMOS_MORA = [
+    ('al_dia', 'Al Día'),
+    ('1_30', '1 a 30 días'),
+    ('31_60', '31 a 60 días'),
+    ('61_90', '61 a 90 días'),
+    ('90_mas', 'Más de 90 días'),
+]
+
+
+# MODELO: CORTE MENSUAL DE CARTERA
+class CarteraCorteMensual(models.Model):
+    _name = 'cartera.corte.mensual'
+    _description = 'Corte Mensual de Cartera por Crédito'
+    _order = 'periodo desc, credito_id'
+    # Tabla histórica de solo inserción: se omiten las columnas de auditoría
+    _log_access = False
+
+    periodo = fields.Date(
+        string='Fecha de Corte',
+        required=True,
+        readonly=True
+    )
+    credito_id = fields.Many2one(
+        'cartera.credito',
+        string='Crédito',
+        required=True,
+        readonly=True,
+        index=True,
+        ondelete='cascade'
+    )
+    caja_id = fields.Many2one(
+        'eps.caja',
+        string='Caja de Ahorro',
+        readonly=True,
+        ondelete='cascade'
+    )
+    socio_id = fields.Many2one(
+        'res.partner',
+        string='Socio',
+        readonly=True
+    )
+    capital_pendiente = fields.Float(
+        string='Capital Pendiente',
+        readonly=True,
+        digits=(16, 2)
+    )
+    monto_vencido = fields.Float(
+        string='Monto Vencido',
+        readonly=True,
+        digits=(16, 2)
+    )
+    dias_mora = fields.Integer(
+        string='Días de Mora',
+        readonly=True
+    )
+    tramo = fields.Selection(
+        TRAMOS_MORA,
+        string='Tramo de Mora',
+        readonly=True
+    )
+    
+    # El índice único empieza por periodo: cada consulta histórica lee solo su mes
+    _periodo_credito_unique = models.Constraint(
+        'UNIQUE(periodo, credito_id)',
+        'Ya existe un corte de este crédito para el periodo.',
+    )
+    
+    @api.model
+    def _cron_generar_corte(self):
+        """Generar el corte del último fin de mes si aún no existe"""
+        hoy = fields.Date.context_today(self)
+        self.generar_corte(hoy.replace(day=1) - timedelta(days=1))
+    
+    @api.model
+    def generar_corte(self, periodo):
+        """Fotografiar la cartera al cierre de ``periodo`` con una sola sentencia.
+        
+        Los saldos se reconstruyen con los pagos de fecha menor o igual al
+        corte, de modo que el resultado es el mismo aunque el proceso se
+        ejecute días después o se use para completar meses anteriores. La
+        restricción única (periodo, crédito) con ON CONFLICT DO NOTHING evita
+        duplicados si se vuelve a ejecutar.
+        """
+        self.env['cartera.pago'].flush_model(['cuota_id', 'fecha', 'monto'])
+        self.env['cartera.cuota'].flush_model([
+            'credito_id', 'fecha_vencimiento', 'monto_capital', 'monto_interes', 'monto_total',
+        ])
+        self.env['cartera.credito'].flush_model(['state', 'fecha', 'caja_id', 'socio_id'])
+        self.env.cr.execute("""
+            WITH pagado AS (
+                SELECT cuota_id, SUM(monto) AS monto
+                  FROM cartera_pago
+                 WHERE fecha <= %(corte)s
+              GROUP BY cuota_id
+            ),
+            cuotas AS (
+                SELECT cu.credito_id, cu.fecha_vencimiento,
+                       cu.monto_total - COALESCE(p.monto, 0) AS saldo,
+                       GREATEST(cu.monto_capital
+                                - GREATEST(COALESCE(p.monto, 0) - cu.monto_interes, 0), 0) AS capital
+                  FROM cartera_cuota cu
+                  JOIN cartera_credito cr ON cr.id = cu.credito_id
+             LEFT JOIN pagado p ON p.cuota_id = cu.id
+                 WHERE cr.state IN ('activo', 'pagado')
+                   AND cr.fecha <= %(corte)s
+            ),
+            creditos AS (
+                SELECT credito_id,
+                       SUM(capital) AS capital_pendiente,
+                       COALESCE(SUM(saldo) FILTER (WHERE fecha_vencimiento < %(corte)s), 0)
+                           AS monto_vencido,
+                       COALESCE(MAX(%(corte)s - fecha_vencimiento)
+                           FILTER (WHERE fecha_vencimiento < %(corte)s), 0) AS dias_mora
+                  FROM cuotas
+                 WHERE saldo > 0.01
+              GROUP BY credito_id
+            )
+            INSERT INTO cartera_corte_mensual (
+                periodo, credito_id, caja_id, socio_id,
+                capital_pendiente, monto_vencido, dias_mora, tramo
+            )
+            SELECT %(corte)s, c.credito_id, cr.caja_id, cr.socio_id,
+                   ROUND(c.capital_pendiente::numeric, 2), ROUND(c.monto_vencido::numeric, 2),
+                   c.dias_mora,
+                   CASE WHEN c.dias_mora = 0 THEN 'al_dia'
+                        WHEN c.dias_mora <= 30 THEN '1_30'
+                        WHEN c.dias_mora <= 60 THEN '31_60'
+                        WHEN c.dias_mora <= 90 THEN '61_90'
+                        ELSE '90_mas' END
+              FROM creditos c
+              JOIN cartera_credito cr ON cr.id = c.credito_id
+            ON CONFLICT (periodo, credito_id) DO NOTHING
+        """, {'corte': periodo})
+        _logger.info('Corte de cartera al %s: %s créditos', periodo, self.env.cr.rowcount)
+        self.invalidate_model()
+    
+    @api.model
+    def obtener_antiguedad_historica(self, periodo, agrupar_por='caja_id'):
+        """Antigüedad de la cartera tal como estaba en un corte mensual.
+        
+        Responde preguntas como "¿cuál era la cartera vencida al 31 de marzo?"
+        leyendo solo las filas de ese periodo.
+        
+        :param agrupar_por: 'caja_id' o 'socio_id'
+        :return: lista de dicts con capital, vencido por tramo y número de créditos
+        """
+        if agrupar_por not in ('caja_id', 'socio_id'):
+            raise UserError(f'Agrupación no soportada: {agrupar_por}')
+        
+        grupos = self._read_group(
+            [('periodo', '=', periodo)],
+            [agrupar_por, 'tramo'],
+            ['capital_pendiente:sum', 'monto_vencido:sum', '__count'],
+        )
+        resultado = {}
+        for grupo, tramo, capital, vencido, num_creditos in grupos:
+            fila = resultado.setdefault(grupo.id, {
+                agrupar_por: grupo.id,
+                'num_creditos': 0,
+                'capital_pendiente': 0.0,
+                'monto_vencido': 0.0,
+                **{f'tramo_{clave}': 0.0 for clave in dict(TRAMOS_MORA) if clave != 'al_dia'},
+            })
+            fila['num_creditos'] += num_creditos
+            fila['capital_pendiente'] += capital
+            fila['monto_vencido'] += vencido
+            if tramo != 'al_dia':
+                fila[f'tramo_{tramo}'] += vencido
+        return list(resultado.values())
@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from odoo import models, fields, api
+from odoo.exceptions import UserError
+from odoo.tools import split_every
+
+_logger = logging.getLogger(__name__)
+
+# Estados de cuenta que se renderizan y guardan antes de confirmar el avance
+TAMANO_TANDA = 50
+
+# Minutos sin avance tras los que un lote en proceso se da por interrumpido
+# (el proceso murió o se agotó su tiempo) y puede retomarse
+MINUTOS_INTERRUMPIDO = 30
+
+
+# MODELO: LOTE DE ESTADOS DE CUENTA
+class CarteraEstadoCuentaLote(models.Model):
+    _name = 'cartera.estado.cuenta.lote'
+    _description = 'Lote de Estados de Cuenta'
+    _inherit = ['mail.thread']
+    _order = 'periodo desc, id desc'
+
+    name = fields.Char(
+        string='Descripción',
+        compute='_compute_name',
+        store=True
+    )
+    caja_id = fields.Many2one(
+        'eps.caja',
+        string='Caja de Ahorro',
+        required=True,
+        index=True,
+        ondelete='cascade'
+    )
+    periodo = fields.Date(
+        string='Fecha de Corte',
+        required=True,
+        default=lambda self: fields.Date.context_today(self).replace(day=1) - timedelta(days=1),
+        help='Los pagos del mes que termina en esta fecha se detallan en el estado de cuenta'
+    )
+    state = fields.Selection([
+        ('borrador', 'Borrador'),
+        ('en_cola', 'En Cola'),
+        ('procesando', 'Procesando'),
+        ('terminado', 'Terminado'),
+        ('error', 'Error'),
+    ], string='Estado', default='borrador', required=True, readonly=True, tracking=True)
+    total = fields.Integer(
+        string='Socios',
+        readonly=True
+    )
+    procesados = fields.Integer(
+        string='Procesados',
+        readonly=True
+    )
+    reutilizados = fields.Integer(
+        string='Sin Cambios',
+        readonly=True,
+        help='Estados de cuenta idénticos a uno ya generado, que no se volvieron a renderizar'
+    )
+    progreso = fields.Float(
+        string='Progreso',
+        compute='_compute_progreso'
+    )
+    mensaje = fields.Text(
+        string='Detalle del Error',
+        readonly=True
+    )
+    linea_ids = fields.One2many(
+        'cartera.estado.cuenta',
+        'lote_id',
+        string='Estados de Cuenta'
+    )
+
+    @api.depends('caja_id', 'periodo')
+    def _compute_name(self):
+        for lote in self:
+            lote.name = f'{lote.caja_id.name or ""} - {lote.periodo or ""}'
+
+    @api.depends('total', 'procesados')
+    def _compute_progreso(self):
+        for lote in self:
+            lote.progreso = 100.0 * lote.procesados / lote.total if lote.total else 0.0
+
+    def action_generar(self):
+        """Encolar el lote; el proceso en segundo plano lo toma de inmediato.
+
+        Un lote que quedó en proceso sin avanzar (ver ``MINUTOS_INTERRUMPIDO``)
+        puede volver a encolarse.
+        """
+        interrumpidos = self.search(self._dominio_interrumpidos() + [('id', 'in', self.ids)])
+        if any(lote.state in ('en_cola', 'procesando') for lote in self - interrumpidos):
+            raise UserError('El lote ya está en proceso.')
+        self.write({'state': 'en_cola', 'procesados': 0, 'reutilizados': 0, 'mensaje': False})
+        self.env.ref('prefectura_ute_6.ir_cron_cartera_estados_cuenta')._trigger()
+
+    @api.model
+    def _dominio_interrumpidos(self):
+        """Lotes en proceso cuyo avance no se confirmó en los últimos minutos"""
+        limite = fields.Datetime.now() - timedelta(minutes=MINUTOS_INTERRUMPIDO)
+        return [('state', '=', 'procesando'), ('write_date', '<', limite)]
+
+    @api.model
+    def _cron_procesar_lotes(self):
+        """Procesar los lotes en cola, uno a la vez.
+
+        También se retoman los lotes interrumpidos: los estados de cuenta ya
+        generados se reutilizan por su hash, sin volver a renderizarlos.
+        """
+        dominio = ['|', ('state', '=', 'en_cola'), '&'] + self._dominio_interrumpidos()
+        for lote in self.search(dominio, order='id'):
+            try:
+                lote._procesar()
+            except Exception as e:
+                _logger.exception('Error al generar estados de cuenta del lote %s', lote.id)
+                self.env.cr.rollback()
+                lote.write({'state': 'error', 'mensaje': str(e)})
+                self.env.cr.commit()
+
+    def _procesar(self):
+        """Generar los estados de cuenta del lote y confirmar el avance por tandas.
+
+        Todos los datos se cargan al inicio con pocas consultas. Los estados
+        cuyo contenido (hash) ya fue generado para el socio reutilizan el PDF
+        existente; el resto se renderiza en paralelo y se guarda como adjunto.
+        """
+        self.ensure_one()
+        self.write({'state': 'procesando'})
+        self.env.cr.commit()
+
+        estados = self._preparar_estados()
+        hashes = {
+            socio_id: hashlib.sha256(json.dumps(estado, sort_keys=True, default=str).encode()).hexdigest()
+            for socio_id, estado in estados.items()
+        }
+        existentes = {
+            (linea.socio_id.id, linea.hash): linea.attachment_id
+            for linea in self.env['cartera.estado.cuenta'].search([
+                ('socio_id', 'in', list(estados)),
+                ('hash', 'in', list(hashes.values())),
+                ('attachment_id', '!=', False),
+            ])
+        }
+
+        # Al reprocesar un lote se reemplazan sus líneas; los PDF se conservan
+        self.linea_ids.unlink()
+        Linea = self.env['cartera.estado.cuenta']
+        reutilizados = [socio_id for socio_id in estados if (socio_id, hashes[socio_id]) in existentes]
+        Linea.create([
+            self._valores_linea(socio_id, hashes[socio_id], existentes[socio_id, hashes[socio_id]], True)
+            for socio_id in reutilizados
+        ])
+        self.write({
+            'total': len(estados),
+            'procesados': len(reutilizados),
+            'reutilizados': len(reutilizados),
+        })
+        self.env.cr.commit()
+
+        omitir = set(reutilizados)
+        pendientes = [socio_id for socio_id in estados if socio_id not in omitir]
+        hilos = int(self.env['ir.config_parameter'].sudo().get_param(
+            'cartera.estados_cuenta_hilos', 4
+        ))
+        with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+            for tanda in split_every(TAMANO_TANDA, pendientes, list):
+                pdfs = list(ejecutor.map(
+                    self._renderizar_en_hilo, tanda, [estados[socio_id] for socio_id in tanda]
+                ))
+                adjuntos = self.env['ir.attachment'].create([{
+                    'name': f'Estado de cuenta {estados[socio_id]["socio"]["name"]} {self.periodo}.pdf',
+                    'type': 'binary',
+                    'raw': pdf,
+                    'mimetype': 'application/pdf',
+                    'res_model': 'res.partner',
+                    'res_id': socio_id,
+                } for socio_id, pdf in zip(tanda, pdfs)])
+                Linea.create([
+                    self._valores_linea(socio_id, hashes[socio_id], adjunto, False)
+                    for socio_id, adjunto in zip(tanda, adjuntos)
+                ])
+                self.procesados += len(tanda)
+                self.env.cr.commit()
+
+        self.write({'state': 'terminado'})
+        self.env.cr.commit()
+
+    def _valores_linea(self, socio_id, hash_estado, adjunto, reutilizado):
+        return {
+            'lote_id': self.id,
+            'socio_id': socio_id,
+            'hash': hash_estado,
+            'attachment_id': adjunto.id,
+            'reutilizado': reutilizado,
+        }
+
+    def _renderizar_en_hilo(self, socio_id, estado):
+        """Renderizar un estado de cuenta con un cursor propio (se ejecuta en un hilo)"""
+        with self.env.registry.cursor() as cr:
+            env = api.Environment(cr, self.env.uid, self.env.context)
+            pdf, __ = env['ir.actions.report']._render_qweb_pdf(
+                'prefectura_ute_6.action_report_estado_cuenta', [socio_id], data={'estado': estado}
+            )
+            return pdf
+
+    def _preparar_estados(self):
+        """Cargar los datos de todos los estados de cuenta del lote en pocas consultas.
+
+        El lote cubre a todos los socios de la caja: los que tienen créditos
+        en ella y los socios registrados en la caja (``eps.socio``, enlazados
+        con su contacto por la cédula), aunque solo tengan aportes. Estos
+        últimos reciben el estado de cuenta con la sección de créditos vacía.
+
+        :return: {socio_id: dict serializable con socio, créditos, cuotas, pagos y aportes}
+        """
+        self.ensure_one()
+        cr = self.env.cr
+        inicio = self.periodo.replace(day=1)
+        self.env['cartera.credito'].flush_model()
+        self.env['cartera.cuota'].flush_model()
+        self.env['cartera.pago'].flush_model()
+        self.env['eps.socio'].flush_model(['caja_id', 'cedula_norm', 'active'])
+
+        cr.execute("""
+            SELECT cr.id, cr.name, cr.socio_id, cr.fecha, cr.monto, cr.plazo, cr.tasa,
+                   cr.state, cr.saldo_actual
+              FROM cartera_credito cr
+             WHERE cr.caja_id = %s
+               AND cr.state IN ('activo', 'pagado')
+               AND cr.fecha <= %s
+          ORDER BY cr.socio_id, cr.fecha, cr.id
+        """, (self.caja_id.id, self.periodo))
+        creditos = cr.dictfetchall()
+
+        cr.execute("""
+            SELECT p.id
+              FROM eps_socio s
+              JOIN res_partner p ON replace(replace(p.vat, ' ', ''), '-', '') = s.cedula_norm
+             WHERE s.caja_id = %s
+               AND s.active
+               AND p.active
+        """, (self.caja_id.id,))
+        socio_ids = tuple(
+            {credito['socio_id'] for credito in creditos} | {fila[0] for fila in cr.fetchall()}
+        )
+        if not socio_ids:
+            return {}
+
+        cuotas = {}
+        pagos = {}
+        credito_ids = tuple(credito['id'] for credito in creditos)
+        if credito_ids:
+            cr.execute("""
+                SELECT credito_id, numero_cuota, fecha_vencimiento, monto_capital, monto_interes,
+                       monto_total, monto_pagado, saldo_pendiente, estado, dias_vencido
+                  FROM cartera_cuota
+                 WHERE credito_id IN %s
+              ORDER BY credito_id, numero_cuota
+            """, (credito_ids,))
+            for cuota in cr.dictfetchall():
+                cuotas.setdefault(cuota.pop('credito_id'), []).append(cuota)
+
+            cr.execute("""
+                SELECT credito_id, name, fecha, monto, comprobante
+                  FROM cartera_pago
+                 WHERE credito_id IN %s
+                   AND fecha BETWEEN %s AND %s
+              ORDER BY credito_id, fecha, id
+            """, (credito_ids, inicio, self.periodo))
+            for pago in cr.dictfetchall():
+                pagos.setdefault(pago.pop('credito_id'), []).append(pago)
+
+        aportes = {}
+        if 'aporte.registro' in self.env:
+            self.env['aporte.registro'].flush_model()
+            cr.execute("""
+                SELECT socio_id, anio, mes, ingreso, egreso, saldo
+                  FROM aporte_registro
+                 WHERE socio_id IN %s
+                   AND anio = %s
+              ORDER BY socio_id, mes::int
+            """, (socio_ids, self.periodo.year))
+            for aporte in cr.dictfetchall():
+                aportes.setdefault(aporte.pop('socio_id'), []).append(aporte)
+
+        cr.execute("SELECT id, name, vat FROM res_partner WHERE id IN %s ORDER BY name, id", (socio_ids,))
+        estados = {
+            socio['id']: {
+                'socio': socio,
+                'caja': self.caja_id.name,
+                'periodo': self.periodo,
+                'creditos': [],
+                'aportes': aportes.get(socio['id'], []),
+            }
+            for socio in cr.dictfetchall()
+        }
+        for credito in creditos:
+            socio_id = credito.pop('socio_id')
+            credito['cuotas'] = cuotas.get(credito['id'], [])
+            credito['pagos'] = pagos.get(credito['id'], [])
+            estados[socio_id]['creditos'].append(credito)
+        return estados
+
+
+# MODELO: ESTADO DE CUENTA GENERADO
+class CarteraEstadoCuenta(models.Model):
+    _name = 'cartera.estado.cuenta'
+    _description = 'Estado de Cuenta de Socio'
+    _order = 'lote_id desc, socio_id'
+
+    lote_id = fields.Many2one(
+        'cartera.estado.cuenta.lote',
+        string='Lote',
+        required=True,
+        readonly=True,
+        index=True,
+        ondelete='cascade'
+    )
+    caja_id = fields.Many2one(
+        'eps.caja',
+        string='Caja de Ahorro',
+        related='lote_id.caja_id',
+        store=True
+    )
+    periodo = fields.Date(
+        string='Fecha de Corte',
+        related='lote_id.periodo',
+        store=True
+    )
+    socio_id = fields.Many2one(
+        'res.partner',
+        string='Socio',
+        required=True,
+        readonly=True,
+        index=True
+    )
+    hash = fields.Char(
+        string='Hash del Contenido',
+        readonly=True,
+        index=True
+    )
+    attachment_id = fields.Many2one(
+        'ir.attachment',
+        string='PDF',
+        readonly=True,
+        ondelete='set null'
+    )
+    reutilizado = fields.Boolean(
+        string='Sin Cambios',
+        readonly=True
+    )
+
+    def action_descargar(self):
+        """Descargar el PDF del estado de cuenta"""
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/web/content/{self.attachment_id.id}?download=true',
+            'target': 'self',
+        }
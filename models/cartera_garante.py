@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+
+
+# MODELO: EXPOSICIÓN DE GARANTES
+class CarteraGaranteExposicion(models.Model):
+    _name = 'cartera.garante.exposicion'
+    _description = 'Exposición de Garante por Caja'
+    _order = 'saldo_garantizado desc, id'
+
+    garante_id = fields.Many2one(
+        'res.partner',
+        string='Garante',
+        required=True,
+        index=True,
+        readonly=True,
+        ondelete='cascade'
+    )
+    caja_id = fields.Many2one(
+        'eps.caja',
+        string='Caja de Ahorro',
+        index=True,
+        readonly=True,
+        ondelete='cascade'
+    )
+    num_creditos = fields.Integer(
+        string='Créditos Garantizados',
+        readonly=True,
+        help='Créditos aprobados o activos respaldados por el garante'
+    )
+    saldo_garantizado = fields.Float(
+        string='Saldo Garantizado',
+        readonly=True,
+        index=True,
+        digits=(16, 2),
+        help='Monto de créditos aprobados y saldo pendiente de créditos activos'
+    )
+    
+    _garante_caja_unique = models.Constraint(
+        'UNIQUE(garante_id, caja_id)',
+        'Ya existe un registro de exposición para este garante en la caja.',
+    )
+    
+    def init(self):
+        """Poblar el índice la primera vez que se instala o actualiza el módulo"""
+        self.env.cr.execute("SELECT 1 FROM cartera_garante_exposicion LIMIT 1")
+        if not self.env.cr.fetchone():
+            self._recalcular_exposicion()
+    
+    @api.model
+    def _recalcular_exposicion(self, garante_ids=None):
+        """Recalcular la exposición de los garantes indicados (o de todos).
+        
+        Se agregan en una sola consulta los créditos aprobados y activos de
+        esos garantes y se sincronizan las filas del índice: se actualizan las
+        existentes, se crean las nuevas y se eliminan las que quedaron en cero.
+        """
+        if garante_ids is not None and not garante_ids:
+            return
+        
+        self.env['cartera.credito'].flush_model(['garante_id', 'caja_id', 'state', 'monto', 'saldo_actual'])
+        filtro = 'AND garante_id = ANY(%(garantes)s)' if garante_ids is not None else ''
+        self.env.cr.execute(f"""
+            SELECT garante_id, caja_id,
+                   COUNT(*) AS num_creditos,
+                   COALESCE(SUM(CASE WHEN state = 'aprobado' THEN monto ELSE saldo_actual END), 0)
+                       AS saldo_garantizado
+              FROM cartera_credito
+             WHERE garante_id IS NOT NULL
+               AND state IN ('aprobado', 'activo')
+               {filtro}
+          GROUP BY garante_id, caja_id
+        """, {'garantes': list(garante_ids or [])})
+        nuevos = {
+            (fila['garante_id'], fila['caja_id']): fila
+            for fila in self.env.cr.dictfetchall()
+        }
+        
+        Exposicion = self.sudo()
+        domain = [('garante_id', 'in', list(garante_ids))] if garante_ids is not None else []
+        existentes = Exposicion.search(domain)
+        obsoletas = Exposicion.browse()
+        for exposicion in existentes:
+            clave = (exposicion.garante_id.id, exposicion.caja_id.id or None)
+            fila = nuevos.pop(clave, None)
+            if not fila:
+                obsoletas |= exposicion
+            elif (exposicion.num_creditos, exposicion.saldo_garantizado) != \
+                    (fila['num_creditos'], fila['saldo_garantizado']):
+                exposicion.write({
+                    'num_creditos': fila['num_creditos'],
+                    'saldo_garantizado': fila['saldo_garantizado'],
+                })
+        obsoletas.unlink()
+        Exposicion.create([{
+            'garante_id': garante_id,
+            'caja_id': caja_id,
+            'num_creditos': fila['num_creditos'],
+            'saldo_garantizado': fila['saldo_garantizado'],
+        } for (garante_id, caja_id), fila in nuevos.items()])
+    
+    @api.model
+    def _obtener_num_creditos(self, creditos):
+        """Créditos garantizados por garante, sumando todas sus cajas"""
+        grupos = self.sudo()._read_group(
+            [('garante_id', 'in', creditos.garante_id.ids)],
+            ['garante_id'],
+            ['num_creditos:sum'],
+        )
+        return {garante.id: num_creditos for garante, num_creditos in grupos}
+    
+    @api.model
+    def obtener_garantes_expuestos(self, limite=10, caja_id=False):
+        """Garantes con mayor saldo garantizado, para el comité de riesgos"""
+        domain = [('caja_id', '=', caja_id)] if caja_id else []
+        return self.search_read(
+            domain,
+            ['garante_id', 'caja_id', 'num_creditos', 'saldo_garantizado'],
+            limit=limite,
+        )
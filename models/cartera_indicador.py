@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from odoo import models, fields, api
+
+from .models import SQL_CAPITAL_PENDIENTE, SECTORES
+
+_logger = logging.getLogger(__name__)
+
+# MODELO: INDICADORES DE RIESGO (FOTOGRAFÍA DIARIA)
+class CarteraIndicadorRiesgo(models.Model):
+    _name = 'cartera.indicador.riesgo'
+    _description = 'Indicadores de Riesgo de Cartera por Caja y Día'
+    _order = 'fecha desc, caja_id, sector'
+
+    caja_id = fields.Many2one(
+        'eps.caja',
+        string='Caja de Ahorro',
+        required=True,
+        readonly=True,
+        index=True,
+        ondelete='cascade'
+    )
+    fecha = fields.Date(
+        string='Fecha',
+        required=True,
+        readonly=True,
+        index=True
+    )
+    sector = fields.Selection(
+        SECTORES + [('sin_sector', 'Sin Sector')],
+        string='Sector / Destino',
+        required=True,
+        readonly=True
+    )
+    num_creditos = fields.Integer(
+        string='Créditos Activos',
+        readonly=True
+    )
+    num_creditos_vencidos = fields.Integer(
+        string='Créditos con Mora',
+        readonly=True
+    )
+    cartera_total = fields.Float(
+        string='Cartera Total',
+        readonly=True,
+        digits=(16, 2),
+        help='Capital pendiente de los créditos activos'
+    )
+    cartera_vencida = fields.Float(
+        string='Cartera Vencida',
+        readonly=True,
+        digits=(16, 2),
+        help='Capital pendiente de cuotas vencidas'
+    )
+    cartera_riesgo_30 = fields.Float(
+        string='Cartera en Riesgo > 30 días',
+        readonly=True,
+        digits=(16, 2),
+        help='Capital pendiente total de los créditos con más de 30 días de mora'
+    )
+    par30 = fields.Float(
+        string='PAR30 (%)',
+        readonly=True,
+        digits=(5, 2),
+        aggregator=None
+    )
+    morosidad = fields.Float(
+        string='Morosidad (%)',
+        readonly=True,
+        digits=(5, 2),
+        aggregator=None
+    )
+    
+    _caja_fecha_sector_unique = models.Constraint(
+        'UNIQUE(caja_id, fecha, sector)',
+        'Ya existen indicadores para esta caja, fecha y sector.',
+    )
+    
+    @api.model
+    def _cron_actualizar_indicadores(self, fecha=None):
+        """Recalcular la fotografía de indicadores del día con una sola consulta.
+        
+        Las filas del día se reemplazan dentro de la misma transacción; gracias
+        a MVCC, el dashboard sigue leyendo la versión anterior hasta que la
+        nueva se confirma, sin bloqueos.
+        """
+        fecha = fecha or fields.Date.context_today(self)
+        
+        self.env['cartera.cuota'].flush_model([
+            'credito_id', 'fecha_vencimiento', 'estado',
+            'monto_interes', 'monto_pagado', 'saldo_pendiente',
+        ])
+        self.env['cartera.credito'].flush_model(['state', 'caja_id', 'sector'])
+        self.env.cr.execute("DELETE FROM cartera_indicador_riesgo WHERE fecha = %s", (fecha,))
+        self.env.cr.execute(f"""
+            WITH creditos AS (
+                SELECT cr.id, cr.caja_id, COALESCE(cr.sector, 'sin_sector') AS sector,
+                       SUM({SQL_CAPITAL_PENDIENTE}) AS saldo,
+                       COALESCE(SUM({SQL_CAPITAL_PENDIENTE})
+                           FILTER (WHERE cu.fecha_vencimiento < %(fecha)s), 0) AS vencido,
+                       COALESCE(MAX(%(fecha)s - cu.fecha_vencimiento)
+                           FILTER (WHERE cu.fecha_vencimiento < %(fecha)s), 0) AS dias_mora
+                  FROM cartera_cuota cu
+                  JOIN cartera_credito cr ON cr.id = cu.credito_id
+                 WHERE cr.state = 'activo'
+                   AND cr.caja_id IS NOT NULL
+                   AND cu.estado != 'pagada'
+              GROUP BY cr.id, cr.caja_id, cr.sector
+            )
+            INSERT INTO cartera_indicador_riesgo (
+                caja_id, fecha, sector, num_creditos, num_creditos_vencidos,
+                cartera_total, cartera_vencida, cartera_riesgo_30, par30, morosidad,
+                create_uid, create_date, write_uid, write_date
+            )
+            SELECT caja_id, %(fecha)s, sector,
+                   COUNT(*),
+                   COUNT(*) FILTER (WHERE vencido > 0),
+                   SUM(saldo),
+                   SUM(vencido),
+                   COALESCE(SUM(saldo) FILTER (WHERE dias_mora > 30), 0),
+                   ROUND((100 * COALESCE(SUM(saldo) FILTER (WHERE dias_mora > 30), 0)
+                          / NULLIF(SUM(saldo), 0))::numeric, 2),
+                   ROUND((100 * SUM(vencido) / NULLIF(SUM(saldo), 0))::numeric, 2),
+                   %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+              FROM creditos
+          GROUP BY caja_id, sector
+        """, {'fecha': fecha, 'uid': self.env.uid})
+        _logger.info('Indicadores de riesgo al %s: %s filas', fecha, self.env.cr.rowcount)
+        self.invalidate_model()
+    
+    @api.model
+    def obtener_indicadores(self, caja_id, fecha=None):
+        """Indicadores de la última fotografía de una caja, para el dashboard.
+        
+        Lee únicamente esta tabla (índice único caja, fecha, sector), sin
+        importar el tamaño de la cartera.
+        """
+        domain = [('caja_id', '=', caja_id)]
+        if fecha:
+            domain.append(('fecha', '<=', fecha))
+        ultima = self.search(domain, order='fecha desc', limit=1)
+        if not ultima:
+            return {}
+        
+        filas = self.search([('caja_id', '=', caja_id), ('fecha', '=', ultima.fecha)])
+        cartera_total = sum(filas.mapped('cartera_total'))
+        cartera_vencida = sum(filas.mapped('cartera_vencida'))
+        cartera_riesgo_30 = sum(filas.mapped('cartera_riesgo_30'))
+        return {
+            'fecha': ultima.fecha,
+            'num_creditos': sum(filas.mapped('num_creditos')),
+            'num_creditos_vencidos': sum(filas.mapped('num_creditos_vencidos')),
+            'cartera_total': cartera_total,
+            'cartera_vencida': cartera_vencida,
+            'par30': 100 * cartera_riesgo_30 / cartera_total if cartera_total else 0.0,
+            'morosidad': 100 * cartera_vencida / cartera_total if cartera_total else 0.0,
+            'vencida_por_sector': {fila.sector: fila.cartera_vencida for fila in filas},
+        }
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+import logging
+from datetime import timedelta
+
+from odoo import models, fields, api
+
+from .models import SQL_CAPITAL_PENDIENTE
+
+_logger = logging.getLogger(__name__)
+
+
+# MODELO: MORA DEVENGADA
+class CarteraMora(models.Model):
+    _name = 'cartera.mora'
+    _description = 'Interés de Mora Devengado'
+    _order = 'fecha desc, cuota_id'
+
+    cuota_id = fields.Many2one(
+        'cartera.cuota',
+        string='Cuota',
+        required=True,
+        readonly=True,
+        index=True,
+        ondelete='cascade'
+    )
+    credito_id = fields.Many2one(
+        'cartera.credito',
+        string='Crédito',
+        required=True,
+        readonly=True,
+        index=True,
+        ondelete='cascade'
+    )
+    caja_id = fields.Many2one(
+        'eps.caja',
+        string='Caja de Ahorro',
+        readonly=True,
+        index=True
+    )
+    socio_id = fields.Many2one(
+        'res.partner',
+        string='Socio',
+        related='credito_id.socio_id',
+        readonly=True
+    )
+    fecha = fields.Date(
+        string='Fecha de Devengo',
+        required=True,
+        readonly=True,
+        index=True
+    )
+    dias_vencido = fields.Integer(
+        string='Días Vencido',
+        readonly=True
+    )
+    base = fields.Float(
+        string='Capital Vencido',
+        readonly=True,
+        digits=(16, 2),
+        help='Capital pendiente de la cuota sobre el que se calcula la mora'
+    )
+    tasa = fields.Float(
+        string='Tasa de Mora Anual (%)',
+        readonly=True,
+        digits=(5, 2)
+    )
+    monto = fields.Float(
+        string='Mora del Día',
+        readonly=True,
+        digits=(16, 2)
+    )
+    reestructuracion_id = fields.Many2one(
+        'cartera.reestructuracion',
+        string='Capitalizada en',
+        readonly=True,
+        index=True,
+        help='Reestructuración que sumó esta mora al capital del crédito'
+    )
+    
+    # Solo la mora aún no capitalizada: al reestructurar, la de las cuotas
+    # eliminadas pasa a la primera cuota de la nueva tabla
+    _cuota_fecha_devengo_unique = models.UniqueIndex(
+        '(cuota_id, fecha) WHERE reestructuracion_id IS NULL',
+        'La mora de una cuota solo puede devengarse una vez por día.',
+    )
+    
+    def init(self):
+        # Restricción anterior, sobre todas las líneas
+        self.env.cr.execute(
+            "ALTER TABLE cartera_mora DROP CONSTRAINT IF EXISTS cartera_mora_cuota_fecha_unique"
+        )
+    
+    @api.model
+    def _cron_devengar_mora(self, fecha=None):
+        """Devengar la mora diaria de todas las cuotas vencidas.
+        
+        El último día devengado se guarda en ``cartera.mora_ultima_fecha``:
+        si el proceso no corrió uno o varios días (caída del servidor, cron
+        desactivado), se devengan todos los días pendientes hasta ``fecha``,
+        uno por uno y confirmando cada día. Los días recuperados usan el
+        saldo actual de las cuotas, ya que no se guarda el saldo histórico.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        fecha = fecha or fields.Date.context_today(self)
+        ultima = fields.Date.to_date(ICP.get_param('cartera.mora_ultima_fecha'))
+        
+        dia = ultima + timedelta(days=1) if ultima else fecha
+        while dia <= fecha:
+            self._devengar_dia(dia)
+            ICP.set_param('cartera.mora_ultima_fecha', fields.Date.to_string(dia))
+            self.env.cr.commit()
+            dia += timedelta(days=1)
+    
+    @api.model
+    def _devengar_dia(self, fecha):
+        """Devengar la mora de un día en una sola sentencia.
+        
+        La mora del día es capital vencido × tasa de mora de la caja / 360.
+        Se inserta con un único INSERT ... SELECT, y el índice único
+        (cuota, fecha) de la mora no capitalizada con ON CONFLICT DO NOTHING
+        hace que repetir un día ya devengado no vuelva a cobrar las cuotas.
+        """
+        self.env['cartera.cuota'].flush_model([
+            'credito_id', 'caja_id', 'fecha_vencimiento', 'estado',
+            'monto_interes', 'monto_pagado', 'saldo_pendiente',
+        ])
+        self.env['cartera.credito'].flush_model(['state'])
+        self.env['eps.caja'].flush_model(['tasa_mora'])
+        self.env.cr.execute(f"""
+            INSERT INTO cartera_mora (
+                cuota_id, credito_id, caja_id, fecha, dias_vencido, base, tasa, monto,
+                create_uid, create_date, write_uid, write_date
+            )
+            SELECT cuota_id, credito_id, caja_id, %(fecha)s, dias_vencido, base, tasa,
+                   ROUND((base * tasa / 100 / 360)::numeric, 2),
+                   %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+              FROM (
+                    SELECT cu.id AS cuota_id, cu.credito_id, cu.caja_id,
+                           %(fecha)s - cu.fecha_vencimiento AS dias_vencido,
+                           {SQL_CAPITAL_PENDIENTE} AS base,
+                           ca.tasa_mora AS tasa
+                      FROM cartera_cuota cu
+                      JOIN cartera_credito cr ON cr.id = cu.credito_id
+                      JOIN eps_caja ca ON ca.id = cu.caja_id
+                     WHERE cr.state = 'activo'
+                       AND cu.estado != 'pagada'
+                       AND cu.fecha_vencimiento < %(fecha)s
+                       AND ca.tasa_mora > 0
+                   ) AS vencidas
+             WHERE ROUND((base * tasa / 100 / 360)::numeric, 2) > 0
+            ON CONFLICT (cuota_id, fecha) WHERE reestructuracion_id IS NULL DO NOTHING
+        """, {'fecha': fecha, 'uid': self.env.uid})
+        _logger.info('Mora devengada al %s: %s cuotas', fecha, self.env.cr.rowcount)
+        self.invalidate_model()
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields
+
+MODALIDADES_REESTRUCTURACION = [
+    ('cuota', 'Reducir Cuota (mantener plazo)'),
+    ('plazo', 'Reducir Plazo (mantener cuota)'),
+]
+
+
+# MODELO: BITÁCORA DE REESTRUCTURACIONES
+class CarteraReestructuracion(models.Model):
+    _name = 'cartera.reestructuracion'
+    _description = 'Reestructuración de Crédito'
+    _order = 'fecha desc, id desc'
+
+    credito_id = fields.Many2one(
+        'cartera.credito',
+        string='Crédito',
+        required=True,
+        readonly=True,
+        index=True,
+        ondelete='cascade'
+    )
+    socio_id = fields.Many2one(
+        'res.partner',
+        string='Socio',
+        related='credito_id.socio_id',
+        store=True,
+        readonly=True
+    )
+    fecha = fields.Date(
+        string='Fecha',
+        required=True,
+        readonly=True
+    )
+    usuario_id = fields.Many2one(
+        'res.users',
+        string='Responsable',
+        required=True,
+        readonly=True,
+        default=lambda self: self.env.user
+    )
+    modalidad = fields.Selection(
+        MODALIDADES_REESTRUCTURACION,
+        string='Modalidad',
+        required=True,
+        readonly=True
+    )
+    motivo = fields.Text(
+        string='Motivo',
+        readonly=True
+    )
+    saldo_capital = fields.Float(
+        string='Capital Pendiente',
+        readonly=True,
+        digits=(16, 2)
+    )
+    interes_capitalizado = fields.Float(
+        string='Interés Vencido Capitalizado',
+        readonly=True,
+        digits=(16, 2),
+        help='Interés no pagado de las cuotas vencidas a la fecha de reestructuración'
+    )
+    mora_capitalizada = fields.Float(
+        string='Mora Capitalizada',
+        readonly=True,
+        digits=(16, 2)
+    )
+    saldo_reestructurado = fields.Float(
+        string='Saldo Reestructurado',
+        readonly=True,
+        digits=(16, 2),
+        help='Capital pendiente más interés vencido y mora: base de la nueva tabla'
+    )
+    cuotas_anteriores = fields.Integer(
+        string='Cuotas Pendientes Antes',
+        readonly=True
+    )
+    cuotas_nuevas = fields.Integer(
+        string='Cuotas Pendientes Después',
+        readonly=True
+    )
+    cuota_anterior = fields.Float(
+        string='Cuota Antes',
+        readonly=True,
+        digits=(16, 2)
+    )
+    cuota_nueva = fields.Float(
+        string='Cuota Después',
+        readonly=True,
+        digits=(16, 2)
+    )
+    num_modificadas = fields.Integer(
+        string='Cuotas Modificadas',
+        readonly=True
+    )
+    num_creadas = fields.Integer(
+        string='Cuotas Creadas',
+        readonly=True
+    )
+    num_eliminadas = fields.Integer(
+        string='Cuotas Eliminadas',
+        readonly=True
+    )
+    tabla_anterior = fields.Text(
+        string='Tabla Anterior',
+        readonly=True,
+        help='Cuotas no pagadas tal como estaban antes de la reestructuración (JSON)'
+    )
@@ -1,4 +1,4 @@
-from odoo import models, fields
+from odoo import models, fields, api
 
 class EpsCaja(models.Model):
     _name = 'eps.caja'
@@ -7,6 +7,8 @@ class EpsCaja(models.Model):
 
     # === IDENTIDAD VISUAL ===
     name = fields.Char(string='Nombre de la Caja', required=True, tracking=True)
+    codigo = fields.Char(string='Código', size=10, tracking=True,
+                         help="Prefijo de la numeración de créditos, pagos y egresos de la caja (ej: SJ)")
     logo = fields.Binary(string='Logo de la Caja', attachment=True)
     
     # === PARAMETRIZACIÓN ECONÓMICA ===
@@ -25,4 +27,55 @@ class EpsCaja(models.Model):
         ('saldo_cuenta', 'Garantía sobre saldo propio')
     ], string='Regla de Garantes', default='1_garante')
 
-    active = fields.Boolean(default=True)
\ No newline at end of file
+    active = fields.Boolean(default=True)
+
+    # === INDICADORES SOCIALES ===
+    socios_activos = fields.Integer(string='Socios Activos', compute='_compute_indicadores_sociales')
+    socios_mujeres = fields.Integer(string='Mujeres', compute='_compute_indicadores_sociales')
+    socios_hombres = fields.Integer(string='Hombres', compute='_compute_indicadores_sociales')
+    socios_indigenas = fields.Integer(string='Indígenas', compute='_compute_indicadores_sociales')
+    socios_afroecuatorianos = fields.Integer(string='Afroecuatorianos', compute='_compute_indicadores_sociales')
+    socios_montubios = fields.Integer(string='Montubios', compute='_compute_indicadores_sociales')
+    socios_con_discapacidad = fields.Integer(string='Con Discapacidad', compute='_compute_indicadores_sociales')
+    socios_cabezas_hogar = fields.Integer(string='Cabezas de Hogar', compute='_compute_indicadores_sociales')
+    socios_menores_edad = fields.Integer(string='Menores de Edad', compute='_compute_indicadores_sociales')
+    socios_tercera_edad = fields.Integer(string='Tercera Edad', compute='_compute_indicadores_sociales')
+    porcentaje_mujeres = fields.Float(string='% Mujeres', digits=(5, 2), compute='_compute_indicadores_sociales')
+    edad_promedio_socios = fields.Float(string='Edad Promedio', digits=(5, 1), compute='_compute_indicadores_sociales')
+
+    _codigo_unique = models.Constraint(
+        'UNIQUE(codigo)',
+        'Ya existe una caja con este código.',
+    )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        cajas = super(EpsCaja, self).create(vals_list)
+        self.env['ir.sequence']._crear_secuencias_caja(cajas)
+        return cajas
+
+    def write(self, vals):
+        res = super(EpsCaja, self).write(vals)
+        if 'codigo' in vals:
+            self.env['ir.sequence']._crear_secuencias_caja(self)
+        return res
+
+    def _compute_indicadores_sociales(self):
+        """Indicadores de los socios activos, leídos de la caché de eps.socio"""
+        indicadores = self.env['eps.socio'].obtener_indicadores_sociales(
+            [caja.id for caja in self if isinstance(caja.id, int)]
+        )
+        for caja in self:
+            datos = indicadores.get(caja.id, {})
+            caja.socios_activos = datos.get('total', 0)
+            caja.socios_mujeres = datos.get('mujeres', 0)
+            caja.socios_hombres = datos.get('hombres', 0)
+            caja.socios_indigenas = datos.get('indigenas', 0)
+            caja.socios_afroecuatorianos = datos.get('afroecuatorianos', 0)
+            caja.socios_montubios = datos.get('montubios', 0)
+            caja.socios_con_discapacidad = datos.get('con_discapacidad', 0)
+            caja.socios_cabezas_hogar = datos.get('cabezas_hogar', 0)
+            caja.socios_menores_edad = datos.get('menores_edad', 0)
+            caja.socios_tercera_edad = datos.get('tercera_edad', 0)
+            caja.porcentaje_mujeres = datos.get('porcentajes', {}).get('mujeres', 0.0)
+            caja.edad_promedio_socios = datos.get('edad_promedio', 0.0)
@@ -1,7 +1,49 @@
 # -*- coding: utf-8 -*-
+import calendar
+import copy
+import logging
+
+import psycopg2
+
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
-from datetime import date
+from odoo.tools import SQL, sql
+from datetime import date, timedelta
+
+from ..lib import validacion
+from ..lib.cache import CacheVersionada
+
+_logger = logging.getLogger(__name__)
+
+_CACHE_INDICADORES = CacheVersionada(tamano=256)
+
+# Indicadores sociales: nombre -> condición SQL sobre eps_socio (alias s)
+# y la edad calculada a la fecha de consulta (columna edad_actual)
+INDICADORES_SOCIALES = {
+    'mujeres': "s.genero = 'mujer'",
+    'hombres': "s.genero = 'hombre'",
+    'otro_genero': "s.genero = 'otro'",
+    'indigenas': "s.es_indigena",
+    'afroecuatorianos': "s.es_afroecuatoriano",
+    'montubios': "s.es_montubio",
+    'mestizos': "s.es_mestizo",
+    'con_discapacidad': "s.tiene_discapacidad",
+    'cabezas_hogar': "s.es_cabeza_hogar",
+    'con_dependientes': "s.num_dependientes > 0",
+    'menores_edad': "edad_actual < 18",
+    'edad_18_29': "edad_actual BETWEEN 18 AND 29",
+    'edad_30_64': "edad_actual BETWEEN 30 AND 64",
+    'tercera_edad': "edad_actual >= 65",
+    'sin_fecha_nacimiento': "edad_actual IS NULL",
+}
+
+# Campos de eps.socio de los que dependen los indicadores sociales
+CAMPOS_INDICADORES = {
+    'caja_id', 'active', 'genero', 'fecha_nacimiento',
+    'es_indigena', 'es_afroecuatoriano', 'es_montubio', 'es_mestizo',
+    'tiene_discapacidad', 'tipo_discapacidad', 'porcentaje_discapacidad',
+    'es_cabeza_hogar', 'num_dependientes',
+}
 
 
 class EpsSocio(models.Model):
@@ -38,6 +80,14 @@ class EpsSocio(models.Model):
         help="Número de cédula de identidad (único por caja)"
     )
     
+    cedula_norm = fields.Char(
+        string='Cédula Normalizada',
+        compute='_compute_cedula_norm',
+        store=True,
+        index=True,
+        help="Cédula sin espacios ni guiones; clave para búsquedas y unicidad"
+    )
+    
     # === RELACIÓN CON CAJA ===
     caja_id = fields.Many2one(
         'eps.caja',
@@ -68,6 +118,14 @@ class EpsSocio(models.Model):
         help="Edad calculada automáticamente"
     )
     
+    cumpleanos_clave = fields.Char(
+        string='Cumpleaños',
+        compute='_compute_cumpleanos_clave',
+        store=True,
+        index=True,
+        help="Mes y día de nacimiento (MM-DD); permite ubicar a quienes cumplen años en una fecha"
+    )
+    
     # === CONTACTO ===
     telefono = fields.Char(
         string='Teléfono',
@@ -238,11 +296,25 @@ class EpsSocio(models.Model):
     )
     
     # === RESTRICCIONES SQL ===
-    _sql_constraints = [
-        ('cedula_caja_unique',
-         'UNIQUE(cedula, caja_id)',
-         'Ya existe un socio con esta cédula en la caja seleccionada.')
-    ]
+    _cedula_norm_caja_unique = models.Constraint(
+        'UNIQUE(caja_id, cedula_norm)',
+        'Ya existe un socio con esta cédula en la caja seleccionada.',
+    )
+    
+    def init(self):
+        """Índices de trigramas (pg_trgm) para la búsqueda aproximada por nombre y cédula"""
+        cr = self.env.cr
+        if not sql.has_trigram(cr):
+            try:
+                with cr.savepoint(flush=False):
+                    cr.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            except psycopg2.Error:
+                _logger.warning('No se pudo instalar la extensión pg_trgm: la búsqueda de socios no tendrá índices de trigramas.')
+                return
+        sql.create_index(cr, 'eps_socio_nombre_completo_trgm_index', self._table,
+                         ['nombre_completo gin_trgm_ops'], method='gin')
+        sql.create_index(cr, 'eps_socio_cedula_norm_trgm_index', self._table,
+                         ['cedula_norm gin_trgm_ops'], method='gin')
     
     # === CAMPOS COMPUTADOS ===
     @api.depends('name', 'apellido')
@@ -254,6 +326,12 @@ class EpsSocio(models.Model):
             else:
                 socio.nombre_completo = socio.name or ''
     
+    @api.depends('cedula')
+    def _compute_cedula_norm(self):
+        """Normaliza la cédula para que '171003406-5' y '1710034065' coincidan"""
+        for socio in self:
+            socio.cedula_norm = validacion.normalizar(socio.cedula) or False
+    
     @api.depends('es_tercera_edad', 'es_menor_edad', 'tiene_discapacidad', 'es_cabeza_hogar')
     def _compute_textos_booleanos(self):
         """Convierte campos booleanos a texto Sí/No"""
@@ -265,10 +343,14 @@ class EpsSocio(models.Model):
     
     @api.depends('fecha_nacimiento')
     def _compute_edad(self):
-        """Calcula la edad del socio basándose en la fecha de nacimiento"""
+        """Calcula la edad del socio basándose en la fecha de nacimiento.
+        
+        El valor se guarda; el proceso diario :meth:`_cron_actualizar_edades`
+        lo recalcula el día del cumpleaños.
+        """
+        today = fields.Date.context_today(self)
         for socio in self:
             if socio.fecha_nacimiento:
-                today = date.today()
                 edad = today.year - socio.fecha_nacimiento.year
                 # Ajustar si aún no ha cumplido años este año
                 if (today.month, today.day) < (socio.fecha_nacimiento.month, socio.fecha_nacimiento.day):
@@ -277,6 +359,11 @@ class EpsSocio(models.Model):
             else:
                 socio.edad = 0
     
+    @api.depends('fecha_nacimiento')
+    def _compute_cumpleanos_clave(self):
+        for socio in self:
+            socio.cumpleanos_clave = socio.fecha_nacimiento and socio.fecha_nacimiento.strftime('%m-%d')
+    
     @api.depends('edad')
     def _compute_tercera_edad(self):
         """Determina si el socio es de tercera edad (>= 65 años)"""
@@ -290,6 +377,22 @@ class EpsSocio(models.Model):
             socio.es_menor_edad = socio.edad < 18 if socio.edad else False
     
     # === VALIDACIONES ===
+    @api.model
+    def _mensaje_validacion(self, codigo):
+        """Mensaje traducido de un código de error de ``lib/validacion.py``"""
+        mensajes = {
+            validacion.CEDULA_NO_NUMERICA: _('La cédula debe contener solo números.'),
+            validacion.CEDULA_LONGITUD: _('La cédula debe tener exactamente 10 dígitos.'),
+            validacion.CEDULA_PROVINCIA: _('Los dos primeros dígitos de la cédula no corresponden '
+                                           'a una provincia válida (01-24).'),
+            validacion.CEDULA_TERCER_DIGITO: _('El tercer dígito de la cédula debe ser menor a 6 '
+                                               'para personas naturales.'),
+            validacion.CEDULA_VERIFICADOR: _('La cédula ingresada no es válida. Por favor verifique el número.'),
+            validacion.TELEFONO_NO_NUMERICO: _('El teléfono debe contener solo números.'),
+            validacion.TELEFONO_LONGITUD: _('El teléfono debe tener exactamente 10 dígitos.'),
+        }
+        return mensajes[codigo]
+    
     @api.onchange('telefono')
     def _onchange_telefono(self):
         """Valida que el teléfono tenga exactamente 10 dígitos"""
@@ -298,7 +401,7 @@ class EpsSocio(models.Model):
             telefono_limpio = ''.join(filter(str.isdigit, self.telefono))
             
             # Si el usuario escribió letras u otros caracteres, limpiar automáticamente
-            if telefono_limpio != self.telefono.replace(' ', '').replace('-', ''):
+            if telefono_limpio != validacion.normalizar(self.telefono):
                 self.telefono = telefono_limpio
                 return {
                     'warning': {
@@ -307,280 +410,60 @@ class EpsSocio(models.Model):
                     }
                 }
             
-            # Verificar longitud (10 dígitos para Ecuador)
-            if len(telefono_limpio) != 10:
+            error = validacion.validar_telefono(telefono_limpio)
+            if error:
                 return {
                     'warning': {
                         'title': 'Teléfono inválido',
-                        'message': 'El teléfono debe tener exactamente 10 dígitos.'
+                        'message': self._mensaje_validacion(error)
                     }
                 }
     
     @api.onchange('cedula')
     def _onchange_cedula(self):
         """Valida la cédula ecuatoriana en tiempo real"""
-        if self.cedula:
-            # Eliminar espacios y guiones
-            cedula = self.cedula.replace(' ', '').replace('-', '')
-            
-            # Verificar que tenga solo dígitos
-            if not cedula.isdigit():
-                return {
-                    'warning': {
-                        'title': 'Cédula inválida',
-                        'message': 'La cédula debe contener solo números.'
-                    }
-                }
-            
-            # Verificar longitud (10 dígitos para Ecuador)
-            if len(cedula) != 10:
-                return {
-                    'warning': {
-                        'title': 'Cédula inválida',
-                        'message': 'La cédula debe tener exactamente 10 dígitos.'
-                    }
-                }
-            
-            # Validar provincia (primeros 2 dígitos)
-            provincia = int(cedula[0:2])
-            if provincia < 1 or provincia > 24:
-                return {
-                    'warning': {
-                        'title': 'Cédula inválida',
-                        'message': 'Los dos primeros dígitos no corresponden a una provincia válida (01-24).'
-                    }
-                }
-            
-            # Validar tercer dígito (debe ser menor a 6 para personas naturales)
-            tercer_digito = int(cedula[2])
-            if tercer_digito > 5:
-                return {
-                    'warning': {
-                        'title': 'Cédula inválida',
-                        'message': 'El tercer dígito debe ser menor a 6 para personas naturales.'
-                    }
-                }
-            
-            # Algoritmo de validación del dígito verificador
-            coeficientes = [2, 1, 2, 1, 2, 1, 2, 1, 2]
-            suma = 0
-            
-            for i in range(9):
-                valor = int(cedula[i]) * coeficientes[i]
-                if valor >= 10:
-                    valor -= 9
-                suma += valor
-            
-            # Calcular dígito verificador
-            resultado = suma % 10
-            if resultado == 0:
-                digito_verificador = 0
-            else:
-                digito_verificador = 10 - resultado
-            
-            # Comparar con el último dígito de la cédula
-            if digito_verificador != int(cedula[9]):
-                return {
-                    'warning': {
-                        'title': 'Cédula inválida',
-                        'message': 'La cédula ingresada no es válida. Por favor verifique el número.'
-                    }
+        error = self.cedula and validacion.validar_cedula(self.cedula)
+        if error:
+            return {
+                'warning': {
+                    'title': 'Cédula inválida',
+                    'message': self._mensaje_validacion(error)
                 }
+            }
     
     @api.constrains('telefono')
     def _check_telefono(self):
         """Valida que el teléfono tenga exactamente 10 dígitos al guardar"""
         for socio in self:
-            if socio.telefono:
-                # Eliminar espacios y guiones
-                telefono = socio.telefono.replace(' ', '').replace('-', '')
-                
-                # Verificar que tenga solo dígitos
-                if not telefono.isdigit():
-                    raise ValidationError(_('El teléfono debe contener solo números.'))
-                
-                # Verificar longitud
-                if len(telefono) != 10:
-                    raise ValidationError(_('El teléfono debe tener exactamente 10 dígitos.'))
+            error = socio.telefono and validacion.validar_telefono(socio.telefono)
+            if error:
+                raise ValidationError(socio._mensaje_validacion(error))
     
     @api.constrains('cedula')
     def _check_cedula(self):
         """Valida que la cédula ecuatoriana sea correcta usando el algoritmo del dígito verificador"""
         for socio in self:
-            if socio.cedula:
-                # Eliminar espacios y guiones
-                cedula = socio.cedula.replace(' ', '').replace('-', '')
-                
-                # Verificar que tenga solo dígitos
-                if not cedula.isdigit():
-                    raise ValidationError(_('La cédula debe contener solo números.'))
-                
-                # Verificar longitud (10 dígitos para Ecuador)
-                if len(cedula) != 10:
-                    raise ValidationError(_('La cédula debe tener exactamente 10 dígitos.'))
-                
-                # Validar provincia (primeros 2 dígitos)
-                provincia = int(cedula[0:2])
-                if provincia < 1 or provincia > 24:
-                    raise ValidationError(_('Los dos primeros dígitos de la cédula no corresponden a una provincia válida (01-24).'))
-                
-                # Validar tercer dígito (debe ser menor a 6 para personas naturales)
-                tercer_digito = int(cedula[2])
-                if tercer_digito > 5:
-                    raise ValidationError(_('El tercer dígito de la cédula debe ser menor a 6 para personas naturales.'))
-                
-                # Algoritmo de validación del dígito verificador
-                coeficientes = [2, 1, 2, 1, 2, 1, 2, 1, 2]
-                suma = 0
-                
-                for i in range(9):
-                    valor = int(cedula[i]) * coeficientes[i]
-                    if valor >= 10:
-                        valor -= 9
-                    suma += valor
-                
-                # Calcular dígito verificador
-                resultado = suma % 10
-                if resultado == 0:
-                    digito_verificador = 0
-                else:
-                    digito_verificador = 10 - resultado
-                
-                # Comparar con el último dígito de la cédula
-                if digito_verificador != int(cedula[9]):
-                    raise ValidationError(_('La cédula ingresada no es válida. Por favor verifique el número.'))
-    
-    @api.constrains('cedula')
-    def _check_cedula_unique(self):
-        """Valida que la cédula sea única en la caja"""
-        for socio in self:
-            if socio.cedula:
-                cedula = socio.cedula.replace(' ', '').replace('-', '')
-                # Buscar si ya existe otra persona con la misma cédula en esta caja
-                existe = self.search([
-                    ('cedula', '=', cedula),
-                    ('caja_id', '=', socio.caja_id.id),
-                    ('id', '!=', socio.id)
-                ], limit=1)
-                if existe:
-                    raise ValidationError(_('Ya existe un socio con esta cédula en la caja seleccionada.'))
+            error = socio.cedula and validacion.validar_cedula(socio.cedula)
+            if error:
+                raise ValidationError(socio._mensaje_validacion(error))
     
     @api.onchange('representante_cedula')
-    def _onchange_representante_cedula(self):
-        """Valida que la cédula del representante sea correcta"""
-        for socio in self:
-            if socio.representante_cedula:
-                # Eliminar espacios y guiones
-                cedula = socio.representante_cedula.replace(' ', '').replace('-', '')
-                
-                # Verificar que tenga solo dígitos
-                if not cedula.isdigit():
-                    raise ValidationError(_('La cédula del representante debe contener solo números.'))
-                
-                # Verificar longitud
-                if len(cedula) != 10:
-                    raise ValidationError(_('La cédula del representante debe tener exactamente 10 dígitos.'))
-                
-                # Validar provincia
-                provincia = int(cedula[0:2])
-                if provincia < 1 or provincia > 24:
-                    raise ValidationError(_('La cédula del representante no es válida: provincia incorrecta.'))
-                
-                # Validar tercer dígito
-                tercer_digito = int(cedula[2])
-                if tercer_digito > 5:
-                    raise ValidationError(_('La cédula del representante no es válida.'))
-                
-                # Algoritmo de validación
-    @api.onchange('representante_cedula')
     def _onchange_representante_cedula(self):
         """Valida la cédula del representante en tiempo real"""
-        if self.representante_cedula:
-            # Eliminar espacios y guiones
-            cedula = self.representante_cedula.replace(' ', '').replace('-', '')
-            
-            # Verificar que tenga solo dígitos
-            if not cedula.isdigit():
-                return {
-                    'warning': {
-                        'title': 'Cédula del representante inválida',
-                        'message': 'La cédula debe contener solo números.'
-                    }
-                }
-            
-            # Verificar longitud
-            if len(cedula) != 10:
-                return {
-                    'warning': {
-                        'title': 'Cédula del representante inválida',
-                        'message': 'La cédula debe tener exactamente 10 dígitos.'
-                    }
-                }
-            
-            # Validar provincia
-            provincia = int(cedula[0:2])
-            if provincia < 1 or provincia > 24:
-                return {
-                    'warning': {
-                        'title': 'Cédula del representante inválida',
-                        'message': 'Provincia incorrecta (debe estar entre 01-24).'
-                    }
-                }
-            
-            # Validar tercer dígito
-            tercer_digito = int(cedula[2])
-            if tercer_digito > 5:
-                return {
-                    'warning': {
-                        'title': 'Cédula del representante inválida',
-                        'message': 'El tercer dígito debe ser menor a 6.'
-                    }
-                }
-            
-            # Algoritmo de validación
-            coeficientes = [2, 1, 2, 1, 2, 1, 2, 1, 2]
-            suma = 0
-            
-            for i in range(9):
-                valor = int(cedula[i]) * coeficientes[i]
-                if valor >= 10:
-                    valor -= 9
-                suma += valor
-            
-            resultado = suma % 10
-            if resultado == 0:
-                digito_verificador = 0
-            else:
-                digito_verificador = 10 - resultado
-            
-            if digito_verificador != int(cedula[9]):
-                return {
-                    'warning': {
-                        'title': 'Cédula del representante inválida',
-                        'message': 'La cédula no es válida. Por favor verifique el número.'
-                    }
+        error = self.representante_cedula and validacion.validar_cedula(self.representante_cedula)
+        if error:
+            return {
+                'warning': {
+                    'title': 'Cédula del representante inválida',
+                    'message': self._mensaje_validacion(error)
                 }
-                
-                for i in range(9):
-                    valor = int(cedula[i]) * coeficientes[i]
-                    if valor >= 10:
-                        valor -= 9
-                    suma += valor
-                
-                resultado = suma % 10
-                if resultado == 0:
-                    digito_verificador = 0
-                else:
-                    digito_verificador = 10 - resultado
-                
-                if digito_verificador != int(cedula[9]):
-                    raise ValidationError(_('La cédula del representante no es válida. Por favor verifique el número.'))
+            }
     
     @api.constrains('porcentaje_discapacidad')
     def _check_porcentaje_discapacidad(self):
         """Valida que el porcentaje de discapacidad esté entre 0 y 100"""
         for socio in self:
-            if socio.porcentaje_discapacidad and (socio.porcentaje_discapacidad < 0 or socio.porcentaje_discapacidad > 100):
+            if socio.porcentaje_discapacidad and not 0 <= int(socio.porcentaje_discapacidad) <= 100:
                 raise ValidationError(_('El porcentaje de discapacidad debe estar entre 0 y 100.'))
     
     @api.constrains('fecha_nacimiento', 'fecha_ingreso')
@@ -621,26 +504,273 @@ class EpsSocio(models.Model):
             self.motivo_baja = False
     
     # === MÉTODOS ===
-    def name_get(self):
+    @api.depends('name', 'cedula')
+    def _compute_display_name(self):
         """Personaliza el nombre mostrado: Nombre (Cédula)"""
-        result = []
         for socio in self:
-            name = f"{socio.name} ({socio.cedula})"
-            result.append((socio.id, name))
-        return result
+            socio.display_name = f"{socio.name} ({socio.cedula})"
+    
+    @api.model
+    def _search_display_name(self, operator, value):
+        """Permite buscar por nombre o cédula.
+        
+        Una cédula completa se busca de forma exacta sobre el índice único.
+        Con pg_trgm, ``ilike`` usa los índices de trigramas: encuentra el
+        texto en cualquier parte del nombre y tolera errores de tipeo.
+        """
+        if operator not in ('ilike', '=ilike', '=', 'like') or not value or not isinstance(value, str):
+            return super()._search_display_name(operator, value)
+        cedula = validacion.normalizar(value)
+        if len(cedula) == 10 and cedula.isdigit():
+            return [('cedula_norm', '=', cedula)]
+        if operator == 'ilike' and self.env.registry.has_trigram:
+            query = self.sudo()._search([])
+            query.add_where(self._sql_similitud(SQL.identifier(query.table), value))
+            return [('id', 'in', query)]
+        return ['|', ('nombre_completo', operator, value), ('cedula_norm', operator, cedula or value)]
+    
+    @api.model
+    def name_search(self, name='', domain=None, operator='ilike', limit=100):
+        """Con pg_trgm, ordena primero la cédula exacta y luego los nombres más parecidos"""
+        if not (name and operator == 'ilike' and self.env.registry.has_trigram):
+            return super().name_search(name, domain, operator, limit)
+        socios = self.browse(self._buscar_por_similitud(name, domain or [], limit))
+        return [(socio.id, socio.display_name) for socio in socios]
+    
+    @api.model
+    def _sql_similitud(self, tabla, name):
+        """Condición de trigramas: ``name`` en el nombre completo, parecido a él o prefijo de la cédula"""
+        cedula = validacion.normalizar(name)
+        patron = '%' + name.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        return SQL(
+            """(%(tabla)s.nombre_completo ILIKE %(patron)s
+                OR %(tabla)s.nombre_completo %% %(nombre)s
+                OR %(tabla)s.cedula_norm LIKE %(cedula)s)""",
+            tabla=tabla,
+            patron=patron,
+            nombre=name,
+            cedula=cedula + '%' if cedula.isdigit() else None,
+        )
+    
+    @api.model
+    def _buscar_por_similitud(self, name, domain, limit):
+        """Ids de socios visibles cuyo nombre completo o cédula se parecen a ``name``, por similitud"""
+        self.flush_model(['nombre_completo', 'cedula_norm'])
+        permitidos = self._search(domain)
+        self.env.cr.execute(SQL("""
+            SELECT id
+              FROM eps_socio
+             WHERE id IN %(permitidos)s
+               AND %(similitud)s
+          ORDER BY cedula_norm = %(cedula_exacta)s DESC,
+                   similarity(nombre_completo, %(nombre)s) DESC,
+                   nombre_completo, id
+             LIMIT %(limite)s
+        """,
+            permitidos=permitidos.subselect(),
+            similitud=self._sql_similitud(SQL.identifier('eps_socio'), name),
+            nombre=name,
+            cedula_exacta=validacion.normalizar(name),
+            limite=limit,
+        ))
+        return [fila[0] for fila in self.env.cr.fetchall()]
+    
+    @api.model
+    def _cron_actualizar_edades(self):
+        """Recalcular la edad de quienes cumplen años desde la última ejecución.
+        
+        La fecha de la última ejecución se guarda en el parámetro
+        ``eps_socio.edades_actualizadas_hasta``; si el proceso dejó de correr
+        algunos días, se incluyen todos los cumpleaños pendientes. La primera
+        vez (o tras más de un año sin correr) se recalculan todos los socios.
+        La edad arrastra los indicadores de tercera edad y menor de edad y sus
+        textos Sí/No.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        hoy = fields.Date.context_today(self)
+        ultima = fields.Date.to_date(ICP.get_param('eps_socio.edades_actualizadas_hasta'))
+        if ultima and ultima >= hoy:
+            return
+        
+        Socio = self.with_context(active_test=False)
+        if not ultima or (hoy - ultima).days > 365:
+            socios = Socio.search([('fecha_nacimiento', '!=', False)])
+        else:
+            claves = set()
+            dia = ultima + timedelta(days=1)
+            while dia <= hoy:
+                claves.add(dia.strftime('%m-%d'))
+                # En años no bisiestos, quienes nacieron un 29 de febrero
+                # cumplen años el 1 de marzo
+                if (dia.month, dia.day) == (3, 1) and not calendar.isleap(dia.year):
+                    claves.add('02-29')
+                dia += timedelta(days=1)
+            socios = Socio.search([('cumpleanos_clave', 'in', sorted(claves))])
+        
+        for fname in ('edad', 'es_tercera_edad', 'es_menor_edad'):
+            self.env.add_to_compute(self._fields[fname], socios)
+        socios.flush_recordset(['edad', 'es_tercera_edad', 'es_menor_edad'])
+        ICP.set_param('eps_socio.edades_actualizadas_hasta', fields.Date.to_string(hoy))
+        _logger.info('Edad actualizada en %s socios', len(socios))
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        socios = super(EpsSocio, self).create(vals_list)
+        socios._marcar_cajas_modificadas(socios.caja_id)
+        return socios
+    
+    def write(self, vals):
+        if not CAMPOS_INDICADORES.intersection(vals):
+            return super(EpsSocio, self).write(vals)
+        cajas = self.caja_id
+        res = super(EpsSocio, self).write(vals)
+        self._marcar_cajas_modificadas(cajas | self.caja_id)
+        return res
+    
+    def unlink(self):
+        cajas = self.caja_id
+        res = super(EpsSocio, self).unlink()
+        self._marcar_cajas_modificadas(cajas)
+        return res
+    
+    @api.model
+    def _marcar_cajas_modificadas(self, cajas):
+        """Anota en la transacción las cajas cuyos indicadores sociales cambiaron.
+        
+        No se escribe en la base: la marca vive en los datos de la transacción
+        y se descarta al confirmarla o revertirla.
+        """
+        self.env.cr.precommit.data.setdefault('eps.socio.cajas_modificadas', set()).update(cajas.ids)
+    
+    @api.model
+    def _cajas_modificadas(self):
+        return self.env.cr.precommit.data.get('eps.socio.cajas_modificadas', set())
+    
+    @api.model
+    def _versiones_socios(self, caja_ids=None):
+        """Marca de versión de los socios de cada caja, incluidas las que no tienen socios.
+        
+        Se obtiene de las propias filas de socios, sin escribir en la caja:
+        cantidad, mayor id y la suma de los ``xmin`` (la transacción que
+        escribió cada fila), que cambia con cualquier alta, cambio o baja
+        confirmada por otra transacción. Los cambios de la transacción en
+        curso no la alteran; esas cajas se recalculan sin caché (ver
+        :meth:`_cajas_modificadas`).
+        """
+        self.flush_model()
+        filtro = 'WHERE c.id = ANY(%(cajas)s)' if caja_ids is not None else ''
+        self.env.cr.execute(f"""
+            SELECT c.id, COUNT(s.id), MAX(s.id), COALESCE(SUM(s.xmin::text::bigint), 0)
+              FROM eps_caja c
+              LEFT JOIN eps_socio s ON s.caja_id = c.id
+             {filtro}
+          GROUP BY c.id
+        """, {'cajas': list(caja_ids or [])})
+        return {caja_id: tuple(version) for caja_id, *version in self.env.cr.fetchall()}
+    
+    @api.model
+    def obtener_indicadores_sociales(self, caja_ids=None):
+        """Indicadores sociales de los socios activos de cada caja.
+        
+        Se calculan con dos consultas agrupadas (conteos con FILTER por caja y
+        género, y discapacidad por tipo y porcentaje) y se guardan en caché por
+        caja. La caché se invalida cuando cambian los socios de la caja y cada
+        día, porque los rangos de edad se calculan a la fecha de consulta; las
+        cajas con socios modificados en la transacción en curso se calculan
+        sin caché. Las
+        cajas sin socios activos devuelven todos los indicadores en cero.
+        
+        :return: dict {caja_id: {'total', 'edad_promedio', indicador: cantidad,
+            'porcentajes': {indicador: %}, 'por_genero': {genero: {indicador: cantidad}},
+            'dependientes', 'discapacidad_por_tipo', 'discapacidad_por_porcentaje'}}
+        """
+        hoy = fields.Date.context_today(self)
+        versiones = self._versiones_socios(caja_ids)
+        modificadas = self._cajas_modificadas()
+        resultado = {}
+        pendientes = []
+        for caja_id, version in versiones.items():
+            clave = (self.env.cr.dbname, caja_id, hoy)
+            indicadores = None if caja_id in modificadas else _CACHE_INDICADORES.obtener(clave, version)
+            if indicadores is None:
+                pendientes.append(caja_id)
+            else:
+                resultado[caja_id] = copy.deepcopy(indicadores)
+        if not pendientes:
+            return resultado
+        
+        conteos = ',\n'.join(
+            f'COUNT(*) FILTER (WHERE {condicion}) AS {nombre}'
+            for nombre, condicion in INDICADORES_SOCIALES.items()
+        )
+        self.env.cr.execute(f"""
+            SELECT s.caja_id, s.genero,
+                   COUNT(*) AS total,
+                   COALESCE(SUM(s.num_dependientes), 0) AS dependientes,
+                   COALESCE(SUM(edad_actual), 0) AS suma_edades,
+                   COUNT(edad_actual) AS con_edad,
+                   {conteos}
+              FROM eps_socio s
+             CROSS JOIN LATERAL (
+                   SELECT date_part('year', age(%(hoy)s, s.fecha_nacimiento))::int AS edad_actual
+             ) e
+             WHERE s.active
+               AND s.caja_id = ANY(%(cajas)s)
+          GROUP BY s.caja_id, s.genero
+        """, {'hoy': hoy, 'cajas': pendientes})
+        
+        filas = {caja_id: [] for caja_id in pendientes}
+        for fila in self.env.cr.dictfetchall():
+            filas[fila.pop('caja_id')].append(fila)
+        
+        self.env.cr.execute("""
+            SELECT caja_id, tipo_discapacidad, porcentaje_discapacidad, COUNT(*)
+              FROM eps_socio
+             WHERE active
+               AND tiene_discapacidad
+               AND caja_id = ANY(%(cajas)s)
+          GROUP BY caja_id, tipo_discapacidad, porcentaje_discapacidad
+        """, {'cajas': pendientes})
+        discapacidad = {}
+        for caja_id, tipo, porcentaje, cantidad in self.env.cr.fetchall():
+            por_tipo, por_porcentaje = discapacidad.setdefault(caja_id, ({}, {}))
+            por_tipo[tipo or 'sin_tipo'] = por_tipo.get(tipo or 'sin_tipo', 0) + cantidad
+            por_porcentaje[porcentaje or 'sin_porcentaje'] = (
+                por_porcentaje.get(porcentaje or 'sin_porcentaje', 0) + cantidad
+            )
+        
+        for caja_id in pendientes:
+            indicadores = self._consolidar_indicadores_sociales(filas[caja_id])
+            indicadores['discapacidad_por_tipo'], indicadores['discapacidad_por_porcentaje'] = (
+                discapacidad.get(caja_id, ({}, {}))
+            )
+            if caja_id not in modificadas:
+                _CACHE_INDICADORES.guardar((self.env.cr.dbname, caja_id, hoy), versiones[caja_id], indicadores)
+            resultado[caja_id] = copy.deepcopy(indicadores)
+        return resultado
     
     @api.model
-    def _name_search(self, name='', args=None, operator='ilike', limit=100, name_get_uid=None):
-        """Permite buscar por nombre o cédula"""
-        args = args or []
-        if name:
-            socios = self._search([
-                '|',
-                ('name', operator, name),
-                ('cedula', operator, name)
-            ] + args, limit=limit, access_rights_uid=name_get_uid)
-            return socios
-        return super()._name_search(name, args=args, operator=operator, limit=limit, name_get_uid=name_get_uid)
+    def _consolidar_indicadores_sociales(self, filas):
+        """Suma las filas por género de una caja en el dict de indicadores"""
+        claves = ['total', 'dependientes'] + list(INDICADORES_SOCIALES)
+        indicadores = dict.fromkeys(claves, 0)
+        suma_edades = con_edad = 0
+        por_genero = {}
+        for fila in filas:
+            por_genero[fila['genero']] = {clave: fila[clave] for clave in claves}
+            for clave in claves:
+                indicadores[clave] += fila[clave]
+            suma_edades += fila['suma_edades']
+            con_edad += fila['con_edad']
+        
+        total = indicadores['total']
+        indicadores['edad_promedio'] = round(suma_edades / con_edad, 1) if con_edad else 0.0
+        indicadores['porcentajes'] = {
+            nombre: round(100.0 * indicadores[nombre] / total, 2) if total else 0.0
+            for nombre in INDICADORES_SOCIALES
+        }
+        indicadores['por_genero'] = por_genero
+        return indicadores
     
     def action_marcar_inactivo(self):
         """Acción para marcar socio como inactivo"""
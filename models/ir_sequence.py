@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+from collections import defaultdict
+
+from odoo import models, fields, api
+
+
+class IrSequence(models.Model):
+    _inherit = 'ir.sequence'
+
+    caja_id = fields.Many2one(
+        'eps.caja',
+        string='Caja de Ahorro',
+        index=True,
+        ondelete='cascade',
+        help='Si se indica, la secuencia numera solo los documentos de esta caja'
+    )
+    
+    _code_caja_unique = models.Constraint(
+        'UNIQUE(code, caja_id)',
+        'Ya existe una secuencia con este código para la caja.',
+    )
+    
+    def reservar_bloque(self, cantidad):
+        """Reservar ``cantidad`` números de la secuencia con un solo acceso.
+        
+        Las secuencias estándar toman los valores de su secuencia de
+        PostgreSQL con un único ``nextval`` sobre ``generate_series``; las
+        secuencias sin huecos avanzan ``number_next`` con un solo UPDATE, de
+        modo que la fila se bloquea una vez por lote y no una vez por registro.
+        
+        :return: lista de nombres formateados (prefijo, relleno y sufijo)
+        """
+        self.ensure_one()
+        if cantidad <= 0:
+            return []
+        if self.use_date_range:
+            # Los rangos de fechas tienen su propio contador; se delega en el ORM
+            return [self._next() for __ in range(cantidad)]
+        
+        if self.implementation == 'standard':
+            self.env.cr.execute(
+                "SELECT nextval(%s) FROM generate_series(1, %s)",
+                ('ir_sequence_%03d' % self.id, cantidad)
+            )
+            numeros = sorted(fila[0] for fila in self.env.cr.fetchall())
+        else:
+            self.env.cr.execute("""
+                UPDATE ir_sequence
+                   SET number_next = number_next + %(cantidad)s * number_increment
+                 WHERE id = %(id)s
+             RETURNING number_next - %(cantidad)s * number_increment, number_increment
+            """, {'id': self.id, 'cantidad': cantidad})
+            inicio, incremento = self.env.cr.fetchone()
+            numeros = [inicio + k * incremento for k in range(cantidad)]
+            self.invalidate_recordset(['number_next'])
+        
+        return [self.get_next_char(numero) for numero in numeros]
+    
+    @api.model
+    def _codigos_por_caja(self):
+        """Códigos de las secuencias que se numeran por separado en cada caja"""
+        return ['cartera.credito', 'cartera.pago']
+    
+    @api.model
+    def _crear_secuencias_caja(self, cajas):
+        """Crear las secuencias propias que aún no tengan las cajas dadas.
+        
+        Se llama al crear la caja o cambiar su código, de modo que la primera
+        reserva de números no tenga que crear la secuencia. Las existentes
+        toman el código actual de la caja como prefijo.
+        """
+        Secuencia = self.sudo()
+        for codigo in self._codigos_por_caja():
+            base = self._secuencia_para_caja(codigo, False)
+            if not base:
+                continue
+            existentes = Secuencia.search([('code', '=', codigo), ('caja_id', 'in', cajas.ids)])
+            for secuencia in existentes:
+                secuencia.prefix = self._prefijo_caja(base, secuencia.caja_id)
+            for caja in cajas - existentes.caja_id:
+                self._copiar_secuencia(base, caja)
+    
+    @api.model
+    def _prefijo_caja(self, base, caja):
+        return f'{caja.codigo or caja.id}-{base.prefix or ""}'
+    
+    @api.model
+    def _copiar_secuencia(self, base, caja):
+        return base.copy({
+            'name': f'{base.name} - {caja.name}',
+            'caja_id': caja.id,
+            'company_id': False,
+            'prefix': self._prefijo_caja(base, caja),
+            'number_next': 1,
+        })
+    
+    @api.model
+    def _secuencia_para_caja(self, codigo, caja):
+        """Secuencia de ``codigo`` propia de la caja.
+        
+        Normalmente ya existe desde que se creó la caja; si no (cajas
+        anteriores a la numeración por caja, o códigos instalados después),
+        se crea copiando la secuencia global del código, con el código de la
+        caja antepuesto al prefijo. Sin caja se usa la global.
+        """
+        Secuencia = self.sudo()
+        if not caja:
+            return Secuencia.search([
+                ('code', '=', codigo),
+                ('caja_id', '=', False),
+                ('company_id', 'in', [self.env.company.id, False]),
+            ], order='company_id', limit=1)
+        
+        dominio = [('code', '=', codigo), ('caja_id', '=', caja.id)]
+        secuencia = Secuencia.search(dominio, limit=1)
+        if not secuencia:
+            base = self._secuencia_para_caja(codigo, False)
+            if not base:
+                return base
+            # Dos primeras reservas simultáneas se ordenan sobre la fila de la
+            # caja. Se modifica la fila (no basta con bloquearla): en
+            # REPEATABLE READ la transacción que esperaba recibe entonces un
+            # error de serialización y Odoo la reintenta, ya con la secuencia
+            # creada por la otra, en lugar de chocar con UNIQUE(code, caja_id).
+            self.env.cr.execute("UPDATE eps_caja SET write_date = write_date WHERE id = %s", [caja.id])
+            secuencia = Secuencia.search(dominio, limit=1) or self._copiar_secuencia(base, caja)
+        return secuencia
+    
+    @api.model
+    def siguientes_por_caja(self, codigo, caja_ids):
+        """Números para un lote de registros, con un acceso a la secuencia por caja.
+        
+        :param codigo: código de la secuencia (ej. 'cartera.credito')
+        :param caja_ids: id de ``eps.caja`` (o False) de cada registro, en orden
+        :return: lista de nombres en el mismo orden; 'Nuevo' si no hay secuencia
+        """
+        posiciones = defaultdict(list)
+        for posicion, caja_id in enumerate(caja_ids):
+            posiciones[caja_id or False].append(posicion)
+        
+        nombres = ['Nuevo'] * len(caja_ids)
+        for caja_id, indices in posiciones.items():
+            secuencia = self._secuencia_para_caja(codigo, self.env['eps.caja'].sudo().browse(caja_id))
+            if not secuencia:
+                continue
+            for indice, nombre in zip(indices, secuencia.reservar_bloque(len(indices))):
+                nombres[indice] = nombre
+        return nombres
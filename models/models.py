@@ -1,10 +1,70 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api
 from odoo.exceptions import ValidationError, UserError
+from odoo.tools import SQL, split_every
 from datetime import datetime
-from dateutil.relativedelta import relativedelta
-import math
+import json
 
+from ..lib import amortizacion, columnar, estres
+from ..lib.cache import CacheVersionada
+from .cartera_reestructuracion import MODALIDADES_REESTRUCTURACION
+
+# Proyecciones de flujo de caja por caja, validadas con la versión de su cartera
+_CACHE_PROYECCION = CacheVersionada(tamano=256)
+
+# Campos de cartera.credito que alteran la exposición de los garantes
+CAMPOS_EXPOSICION_GARANTE = {'garante_id', 'caja_id', 'state', 'monto'}
+
+# Capital pendiente de una cuota (alias cu): los pagos cubren primero el interés
+SQL_CAPITAL_PENDIENTE = """
+    GREATEST(cu.saldo_pendiente - GREATEST(cu.monto_interes - cu.monto_pagado, 0), 0)
+"""
+
+# Sectores económicos de destino del crédito (mismas opciones que eps.egreso)
+SECTORES = [
+    ('comercio', 'Comercio'),
+    ('agropecuario', 'Agropecuario'),
+    ('produccion', 'Producción'),
+    ('servicios', 'Servicios'),
+    ('consumo', 'Consumo'),
+    ('vivienda', 'Vivienda'),
+    ('salud', 'Salud'),
+    ('educacion', 'Educación'),
+]
+
+# Agrupaciones disponibles para el reporte de cartera vencida: (clave, expresión SQL)
+AGRUPACIONES_CARTERA_VENCIDA = {
+    'mes': ('periodo', "to_char(cu.fecha_vencimiento, 'YYYY-MM')"),
+    'caja': ('caja_id', 'cu.caja_id'),
+    'socio': ('socio_id', 'cu.socio_id'),
+}
+
+# Tramos de antigüedad de mora sobre el saldo pendiente de cuotas vencidas
+SQL_TRAMOS_MORA = """
+    COALESCE(SUM(cu.saldo_pendiente) FILTER (
+        WHERE %(corte)s - cu.fecha_vencimiento BETWEEN 1 AND 30), 0) AS tramo_1_30,
+    COALESCE(SUM(cu.saldo_pendiente) FILTER (
+        WHERE %(corte)s - cu.fecha_vencimiento BETWEEN 31 AND 60), 0) AS tramo_31_60,
+    COALESCE(SUM(cu.saldo_pendiente) FILTER (
+        WHERE %(corte)s - cu.fecha_vencimiento BETWEEN 61 AND 90), 0) AS tramo_61_90,
+    COALESCE(SUM(cu.saldo_pendiente) FILTER (
+        WHERE %(corte)s - cu.fecha_vencimiento > 90), 0) AS tramo_90_mas
+"""
+
+# Columnas de la carga columnar de cartera: (nombre, tipo) en el orden del SELECT
+ESQUEMA_CREDITOS = [
+    ('id', 'entero'), ('caja_id', 'entero'), ('socio_id', 'entero'), ('fecha', 'fecha'),
+    ('monto', 'decimal'), ('plazo', 'entero'), ('tasa', 'decimal'), ('es_aleman', 'entero'),
+]
+ESQUEMA_CUOTAS = [
+    ('id', 'entero'), ('credito_id', 'entero'), ('caja_id', 'entero'), ('numero_cuota', 'entero'),
+    ('fecha_vencimiento', 'fecha'), ('monto_capital', 'decimal'), ('monto_interes', 'decimal'),
+    ('monto_total', 'decimal'), ('monto_pagado', 'decimal'), ('saldo_pendiente', 'decimal'),
+]
+ESQUEMA_PAGOS = [
+    ('id', 'entero'), ('credito_id', 'entero'), ('cuota_id', 'entero'), ('caja_id', 'entero'),
+    ('fecha', 'fecha'), ('monto', 'decimal'),
+]
 
 # MODELO: CRÉDITO
 class CarteraCredito(models.Model):
@@ -28,6 +88,13 @@ class CarteraCredito(models.Model):
         tracking=True,
         domain=[('is_company', '=', False)]
     )
+    caja_id = fields.Many2one(
+        'eps.caja',
+        string='Caja de Ahorro',
+        tracking=True,
+        index=True,
+        ondelete='restrict'
+    )
     garante_id = fields.Many2one(
         'res.partner',
         string='Garante',
@@ -71,6 +138,12 @@ class CarteraCredito(models.Model):
         string='Destino del Crédito',
         tracking=True
     )
+    sector = fields.Selection(
+        SECTORES,
+        string='Sector / Destino',
+        tracking=True,
+        help='Sector económico al que se destina el crédito'
+    )
     
     # Estado
     state = fields.Selection([
@@ -96,6 +169,11 @@ class CarteraCredito(models.Model):
         'credito_id',
         string='Pagos'
     )
+    reestructuracion_ids = fields.One2many(
+        'cartera.reestructuracion',
+        'credito_id',
+        string='Reestructuraciones'
+    )
     
     # Campos computados
     total_a_pagar = fields.Float(
@@ -133,6 +211,13 @@ class CarteraCredito(models.Model):
         compute='_compute_num_cuotas',
         store=True
     )
+    racha_solo_interes = fields.Integer(
+        string='Pagos Consecutivos Solo Interés',
+        default=0,
+        readonly=True,
+        copy=False,
+        help='Número de pagos consecutivos que solo cubrieron el interés'
+    )
     currency_id = fields.Many2one(
         'res.currency',
         string='Moneda',
@@ -148,18 +233,73 @@ class CarteraCredito(models.Model):
     
     @api.model_create_multi
     def create(self, vals_list):
-        """Generar número de crédito consecutivo"""
-        for vals in vals_list:
-            if vals.get('name', 'Nuevo') == 'Nuevo':
-                vals['name'] = self.env['ir.sequence'].next_by_code('cartera.credito') or 'Nuevo'
-        return super(CarteraCredito, self).create(vals_list)
+        """Generar números de crédito consecutivos por caja, un bloque por lote"""
+        nuevos = [vals for vals in vals_list if vals.get('name', 'Nuevo') == 'Nuevo']
+        nombres = self.env['ir.sequence'].siguientes_por_caja(
+            'cartera.credito', [vals.get('caja_id') for vals in nuevos]
+        )
+        for vals, nombre in zip(nuevos, nombres):
+            vals['name'] = nombre
+        creditos = super(CarteraCredito, self).create(vals_list)
+        
+        con_garante = creditos.filtered('garante_id')
+        if con_garante:
+            self.env['cartera.garante.exposicion']._recalcular_exposicion(con_garante.garante_id.ids)
+            con_garante._check_garante_limite()
+        return creditos
+    
+    def write(self, vals):
+        """Mantener el índice de exposición de garantes"""
+        if not CAMPOS_EXPOSICION_GARANTE.intersection(vals):
+            return super(CarteraCredito, self).write(vals)
+        
+        garantes = self.garante_id
+        res = super(CarteraCredito, self).write(vals)
+        garantes |= self.garante_id
+        if garantes:
+            self.env['cartera.garante.exposicion']._recalcular_exposicion(garantes.ids)
+        if vals.get('garante_id'):
+            self._check_garante_limite()
+        return res
     
-    @api.depends('cuota_ids.monto_total')
+    def unlink(self):
+        """Quitar los créditos eliminados del índice de exposición de garantes"""
+        garantes = self.garante_id
+        res = super(CarteraCredito, self).unlink()
+        if garantes:
+            self.env['cartera.garante.exposicion']._recalcular_exposicion(garantes.ids)
+        return res
+    
+    def _agregar_por_credito(self, modelo, agregados, domain=None):
+        """Agregar cuotas o pagos de todos los créditos del recordset en una consulta.
+        
+        :param modelo: 'cartera.cuota' o 'cartera.pago'
+        :param agregados: especificaciones de _read_group, p. ej. ['monto:sum']
+        :return: dict {credito_id: [valor por agregado]}, o None si el
+            recordset contiene registros sin guardar (formularios en edición),
+            que deben calcularse en memoria
+        """
+        if not all(isinstance(id_, int) for id_ in self._ids):
+            return None
+        grupos = self.env[modelo]._read_group(
+            [('credito_id', 'in', self.ids)] + (domain or []),
+            ['credito_id'],
+            agregados,
+        )
+        return {credito.id: valores for credito, *valores in grupos}
+    
+    @api.depends('cuota_ids.monto_total', 'pago_ids.monto')
     def _compute_indicadores(self):
         """Calcular indicadores del crédito"""
+        cuotas = self._agregar_por_credito('cartera.cuota', ['monto_total:sum'])
+        pagos = self._agregar_por_credito('cartera.pago', ['monto:sum'])
         for credito in self:
-            total_a_pagar = sum(credito.cuota_ids.mapped('monto_total'))
-            total_cobrado = sum(credito.pago_ids.mapped('monto'))
+            if cuotas is None:
+                total_a_pagar = sum(credito.cuota_ids.mapped('monto_total'))
+                total_cobrado = sum(credito.pago_ids.mapped('monto'))
+            else:
+                total_a_pagar = cuotas.get(credito.id, [0.0])[0]
+                total_cobrado = pagos.get(credito.id, [0.0])[0]
             credito.total_a_pagar = total_a_pagar
             credito.total_cobrar = total_cobrado
             credito.saldo_por_cobrar = total_a_pagar - total_cobrado
@@ -167,42 +307,59 @@ class CarteraCredito(models.Model):
     @api.depends('cuota_ids.saldo_pendiente')
     def _compute_saldo_actual(self):
         """Calcular saldo actual del capital"""
+        cuotas = self._agregar_por_credito('cartera.cuota', ['saldo_pendiente:sum'])
         for credito in self:
-            saldo = sum(credito.cuota_ids.mapped('saldo_pendiente'))
-            credito.saldo_actual = saldo
+            if cuotas is None:
+                credito.saldo_actual = sum(credito.cuota_ids.mapped('saldo_pendiente'))
+            else:
+                credito.saldo_actual = cuotas.get(credito.id, [0.0])[0]
     
     @api.depends('cuota_ids.estado')
     def _compute_esta_vencido(self):
         """Verificar si tiene cuotas vencidas"""
+        vencidas = self._agregar_por_credito('cartera.cuota', ['__count'], [('estado', '=', 'vencida')])
         for credito in self:
-            credito.esta_vencido = any(cuota.estado == 'vencida' for cuota in credito.cuota_ids)
+            if vencidas is None:
+                credito.esta_vencido = any(cuota.estado == 'vencida' for cuota in credito.cuota_ids)
+            else:
+                credito.esta_vencido = credito.id in vencidas
     
     @api.depends('cuota_ids')
     def _compute_num_cuotas(self):
         """Contar número de cuotas generadas"""
+        cuotas = self._agregar_por_credito('cartera.cuota', ['__count'])
         for credito in self:
-            credito.num_cuotas = len(credito.cuota_ids)
+            if cuotas is None:
+                credito.num_cuotas = len(credito.cuota_ids)
+            else:
+                credito.num_cuotas = cuotas.get(credito.id, [0])[0]
     
-    @api.constrains('garante_id')
     def _check_garante_limite(self):
-        """Validar límite de créditos por garante"""
-        for credito in self:
-            if credito.garante_id:
-                limite = int(self.env['ir.config_parameter'].sudo().get_param(
-                    'cartera.max_creditos_garante', default=3
-                ))
-                
-                creditos_activos = self.search_count([
-                    ('garante_id', '=', credito.garante_id.id),
-                    ('state', 'in', ['aprobado', 'activo']),
-                    ('id', '!=', credito.id)
-                ])
-                
-                if creditos_activos >= limite:
-                    raise ValidationError(
-                        f'El garante {credito.garante_id.name} ya tiene {creditos_activos} '
-                        f'créditos activos. El límite es {limite}.'
-                    )
+        """Validar límite de créditos por garante con el índice de exposición.
+        
+        El límite es global: se cuentan los créditos que el garante respalda
+        en todas las cajas, no solo en la del crédito.
+        """
+        con_garante = self.filtered('garante_id')
+        if not con_garante:
+            return
+        
+        limite = int(self.env['ir.config_parameter'].sudo().get_param(
+            'cartera.max_creditos_garante', default=3
+        ))
+        num_creditos = self.env['cartera.garante.exposicion']._obtener_num_creditos(con_garante)
+        
+        for credito in con_garante:
+            creditos_activos = num_creditos.get(credito.garante_id.id, 0)
+            # El índice ya incluye al propio crédito si está aprobado o activo
+            if credito.state in ('aprobado', 'activo'):
+                creditos_activos -= 1
+            
+            if creditos_activos >= limite:
+                raise ValidationError(
+                    f'El garante {credito.garante_id.name} ya tiene {creditos_activos} '
+                    f'créditos activos. El límite es {limite}.'
+                )
     
     def action_aprobar(self):
         """Aprobar crédito"""
@@ -212,15 +369,15 @@ class CarteraCredito(models.Model):
             credito.state = 'aprobado'
     
     def action_activar(self):
-        """Activar crédito y generar tabla de amortización"""
-        for credito in self:
-            if credito.state != 'aprobado':
-                raise UserError('Solo se pueden activar créditos aprobados.')
-            
-            if not credito.cuota_ids:
-                credito.generar_tabla_amortizacion()
-            
-            credito.state = 'activo'
+        """Activar créditos y generar sus tablas de amortización en un solo lote"""
+        if any(credito.state != 'aprobado' for credito in self):
+            raise UserError('Solo se pueden activar créditos aprobados.')
+        
+        sin_tabla = self.filtered(lambda c: not c.cuota_ids)
+        if sin_tabla:
+            sin_tabla.generar_tabla_amortizacion()
+        
+        self.write({'state': 'activo'})
     
     def action_cancelar(self):
         """Cancelar crédito"""
@@ -229,6 +386,94 @@ class CarteraCredito(models.Model):
                 raise UserError('No se puede cancelar un crédito ya pagado.')
             credito.state = 'cancelado'
     
+    def action_registrar_abono(self):
+        """Abrir wizard para registrar un abono distribuido entre cuotas"""
+        self.ensure_one()
+        
+        return {
+            'name': 'Registrar Abono',
+            'type': 'ir.actions.act_window',
+            'res_model': 'cartera.abono.wizard',
+            'view_mode': 'form',
+            'target': 'new',
+            'context': {
+                'default_credito_id': self.id,
+            }
+        }
+    
+    def distribuir_pago(self, montos, fecha=None, comprobante=False, notas=False):
+        """Distribuir abonos globales sobre las cuotas pendientes más antiguas.
+        
+        Cada monto se aplica en orden de vencimiento: primero las cuotas
+        vencidas y luego, como pago anticipado, las siguientes. Dentro de cada
+        cuota el pago cubre primero el interés y después el capital. Todos los
+        pagos resultantes se crean en un solo lote, por lo que el método sirve
+        también para archivos de descuento por rol con muchos créditos.
+        
+        :param montos: dict {credito_id: monto}, o un número si el recordset
+            tiene un solo crédito
+        :return: tupla (pagos creados, dict {credito_id: remanente no aplicado})
+        """
+        if not isinstance(montos, dict):
+            self.ensure_one()
+            montos = {self.id: montos}
+        
+        creditos = self.browse(list(montos))
+        if any(credito.state != 'activo' for credito in creditos):
+            raise UserError('Solo se pueden registrar abonos en créditos activos.')
+        
+        fecha = fecha or fields.Date.context_today(self)
+        cuotas = self.env['cartera.cuota'].search([
+            ('credito_id', 'in', creditos.ids),
+            ('estado', '!=', 'pagada'),
+        ], order='credito_id, numero_cuota')
+        cuotas._bloquear_para_pago()
+        saldos = {cuota.id: cuota.saldo_pendiente for cuota in cuotas}
+        cuotas_por_credito = {}
+        for cuota in cuotas:
+            cuotas_por_credito.setdefault(cuota.credito_id.id, []).append(cuota)
+        
+        vals_list = []
+        remanentes = {}
+        for credito in creditos:
+            asignaciones, remanente = self._asignar_en_cascada(
+                cuotas_por_credito.get(credito.id, []), montos[credito.id], saldos
+            )
+            remanentes[credito.id] = remanente
+            vals_list += [{
+                'credito_id': credito.id,
+                'cuota_id': cuota.id,
+                'monto': monto,
+                'fecha': fecha,
+                'comprobante': comprobante,
+                'notas': notas,
+            } for cuota, monto in asignaciones]
+        
+        pagos = self.env['cartera.pago']._crear_distribuidos(vals_list)
+        return pagos, remanentes
+    
+    @api.model
+    def _asignar_en_cascada(self, cuotas, monto, saldos):
+        """Repartir un monto sobre cuotas ordenadas por antigüedad.
+        
+        ``saldos`` ({cuota_id: saldo}) se actualiza en el lugar para que varias
+        asignaciones sobre las mismas cuotas no excedan su saldo pendiente.
+        
+        :return: tupla (lista de (cuota, monto asignado), monto no asignado)
+        """
+        asignaciones = []
+        restante = round(monto, 2)
+        for cuota in cuotas:
+            if restante <= 0:
+                break
+            aplicado = round(min(restante, saldos[cuota.id]), 2)
+            if aplicado <= 0:
+                continue
+            asignaciones.append((cuota, aplicado))
+            saldos[cuota.id] -= aplicado
+            restante = round(restante - aplicado, 2)
+        return asignaciones, restante
+    
     def action_view_cuotas(self):
         """Abrir vista de cuotas del crédito"""
         self.ensure_one()
@@ -243,118 +488,458 @@ class CarteraCredito(models.Model):
     
     def action_volver_borrador(self):
         """Volver a borrador"""
+        self._verificar_sin_pagos()
         for credito in self:
             credito.cuota_ids.unlink()
             credito.state = 'borrador'
     
-    def generar_tabla_amortizacion(self):
-        """Generar tabla de amortización según el método seleccionado"""
+    def action_reestructurar(self):
+        """Abrir wizard de reestructuración"""
         self.ensure_one()
         
+        return {
+            'name': 'Reestructurar Crédito',
+            'type': 'ir.actions.act_window',
+            'res_model': 'cartera.reestructuracion.wizard',
+            'view_mode': 'form',
+            'target': 'new',
+            'context': {
+                'default_credito_id': self.id,
+            }
+        }
+    
+    def _verificar_sin_pagos(self):
+        """Impedir que se borre la tabla de créditos que ya registran pagos"""
+        con_pagos = self.filtered('pago_ids')
+        if con_pagos:
+            raise UserError(
+                'Los créditos %s ya registran pagos; su tabla no puede eliminarse. '
+                'Use la opción Reestructurar para recalcular las cuotas pendientes.'
+                % ', '.join(con_pagos.mapped('name'))
+            )
+    
+    def generar_tabla_amortizacion(self):
+        """Generar tabla de amortización según el método seleccionado.
+        
+        Las cuotas de todos los créditos del recordset se calculan en memoria
+        y se guardan con un único create, de modo que los campos computados
+        de cuotas y créditos se recalculan una sola vez por lote.
+        """
+        self._verificar_sin_pagos()
         self.cuota_ids.unlink()
         
-        tasa_mensual = self.tasa / 100 / 12
+        vals_list = []
+        for credito in self:
+            vals_list += credito._preparar_cuotas_vals()
         
-        if self.metodo_amortizacion == 'frances':
-            self._generar_amortizacion_frances(tasa_mensual)
-        elif self.metodo_amortizacion == 'aleman':
-            self._generar_amortizacion_aleman(tasa_mensual)
+        return self.env['cartera.cuota'].create(vals_list)
+    
+    def _preparar_cuotas_vals(self):
+        """Calcular los valores de las cuotas con el motor de amortización"""
+        self.ensure_one()
+        tabla = amortizacion.simular(
+            self.monto, self.plazo, self.tasa, self.metodo_amortizacion, self.fecha
+        )
+        return [{
+            'credito_id': self.id,
+            'numero_cuota': cuota.numero_cuota,
+            'fecha_vencimiento': cuota.fecha_vencimiento,
+            'monto_capital': cuota.monto_capital,
+            'monto_interes': cuota.monto_interes,
+            'monto_total': cuota.monto_total,
+            'saldo_inicial': cuota.saldo_inicial,
+            'saldo_final': cuota.saldo_final,
+        } for cuota in tabla]
     
-    def _generar_amortizacion_frances(self, tasa_mensual):
-        """Generar tabla de amortización método francés (cuota constante)"""
-        if tasa_mensual == 0:
-            cuota_fija = self.monto / self.plazo
+    def reestructurar(self, modalidad='cuota', fecha=None, motivo=False):
+        """Recalcular solo las cuotas no pagadas a partir de la deuda pendiente.
+        
+        Las cuotas pagadas no se tocan y las pagadas parcialmente se cierran
+        por el valor abonado (interés primero). La nueva tabla amortiza desde
+        ``fecha`` el capital pendiente más lo que ya se adeuda a esa fecha, de
+        modo que la deuda total se conserva:
+        
+        - el interés no pagado de las cuotas vencidas antes de ``fecha``, y
+        - la mora devengada que aún no se había capitalizado.
+        
+        Modalidades:
+        
+        - ``'cuota'``: mismo número de cuotas pendientes, cuota menor.
+        - ``'plazo'``: se mantiene la cuota vigente y se reduce el número de cuotas.
+        
+        Las cuotas existentes se reutilizan en orden y solo se escriben las
+        que cambian; las sobrantes se eliminan y las faltantes se crean. La
+        tabla anterior y los montos capitalizados quedan en
+        ``cartera.reestructuracion``, y las líneas de mora capitalizadas se
+        conservan enlazadas a ella.
+        
+        :return: registro ``cartera.reestructuracion`` creado
+        """
+        self.ensure_one()
+        if self.state != 'activo':
+            raise UserError('Solo se pueden reestructurar créditos activos.')
+        if modalidad not in dict(MODALIDADES_REESTRUCTURACION):
+            raise UserError(f'Modalidad de reestructuración no soportada: {modalidad}')
+        
+        fecha = fecha or fields.Date.context_today(self)
+        cuotas = self.cuota_ids.sorted('numero_cuota')
+        abonadas = cuotas.filtered(lambda c: c.monto_pagado > 0)
+        parciales = abonadas.filtered(lambda c: c.saldo_pendiente > 0.01)
+        pendientes = cuotas - abonadas
+        if not (parciales or pendientes):
+            raise UserError('El crédito no tiene cuotas pendientes por reestructurar.')
+        
+        # Capital de las cuotas no pagadas, descontando lo abonado a capital
+        saldo_capital = round(sum(
+            cuota.monto_capital - min(cuota.monto_capital, max(cuota.monto_pagado - cuota.monto_interes, 0))
+            for cuota in parciales | pendientes
+        ), 2)
+        if saldo_capital <= 0.01:
+            raise UserError('El crédito no tiene capital pendiente por reestructurar.')
+        
+        interes_capitalizado = round(sum(
+            max(cuota.monto_interes - cuota.monto_pagado, 0)
+            for cuota in parciales | pendientes
+            if cuota.fecha_vencimiento < fecha
+        ), 2)
+        moras = self.env['cartera.mora'].sudo().search([
+            ('credito_id', '=', self.id),
+            ('reestructuracion_id', '=', False),
+        ])
+        mora_capitalizada = round(sum(moras.mapped('monto')), 2)
+        saldo = round(saldo_capital + interes_capitalizado + mora_capitalizada, 2)
+        
+        afectadas = (parciales | pendientes).sorted('numero_cuota')
+        vigente = afectadas[0]
+        cuota_anterior = vigente.monto_total
+        if modalidad == 'cuota':
+            plazo = max(len(pendientes), 1)
         else:
-            cuota_fija = self.monto * (tasa_mensual * math.pow(1 + tasa_mensual, self.plazo)) / \
-                        (math.pow(1 + tasa_mensual, self.plazo) - 1)
+            referencia = vigente.monto_capital if self.metodo_amortizacion == 'aleman' else vigente.monto_total
+            try:
+                plazo = amortizacion.plazo_para_cuota(saldo, referencia, self.tasa, self.metodo_amortizacion)
+            except ValueError as e:
+                raise UserError(str(e))
         
-        saldo = self.monto
-        CuotaObj = self.env['cartera.cuota']
+        tabla_anterior = [{
+            'numero_cuota': cuota.numero_cuota,
+            'fecha_vencimiento': str(cuota.fecha_vencimiento),
+            'monto_capital': cuota.monto_capital,
+            'monto_interes': cuota.monto_interes,
+            'monto_total': cuota.monto_total,
+            'monto_pagado': cuota.monto_pagado,
+        } for cuota in afectadas]
         
-        for i in range(1, self.plazo + 1):
-            interes = saldo * tasa_mensual
-            capital = cuota_fija - interes
-            
-            if i == self.plazo:
-                capital = saldo
-                cuota = saldo + interes
-            else:
-                cuota = cuota_fija
-            
-            saldo_inicial = saldo
-            saldo = saldo - capital
-            
-            fecha_vencimiento = self.fecha + relativedelta(months=i)
-            
-            CuotaObj.create({
-                'credito_id': self.id,
-                'numero_cuota': i,
-                'fecha_vencimiento': fecha_vencimiento,
-                'monto_capital': capital,
+        # Cerrar las cuotas parciales por lo efectivamente pagado
+        for cuota in parciales:
+            interes = min(cuota.monto_pagado, cuota.monto_interes)
+            capital = round(cuota.monto_pagado - interes, 2)
+            cuota.write({
                 'monto_interes': interes,
-                'monto_total': cuota,
-                'saldo_inicial': saldo_inicial,
-                'saldo_final': max(0, saldo)
+                'monto_capital': capital,
+                'monto_total': cuota.monto_pagado,
+                'saldo_final': round(cuota.saldo_inicial - capital, 2),
             })
-    
-    def _generar_amortizacion_aleman(self, tasa_mensual):
-        """Generar tabla de amortización método alemán (capital constante)"""
-        capital_fijo = self.monto / self.plazo
         
-        saldo = self.monto
-        CuotaObj = self.env['cartera.cuota']
+        numero_base = max(abonadas.mapped('numero_cuota'), default=0)
+        tabla = amortizacion.simular(saldo, plazo, self.tasa, self.metodo_amortizacion, fecha)
+        nuevas_vals = [{
+            'numero_cuota': numero_base + cuota.numero_cuota,
+            'fecha_vencimiento': cuota.fecha_vencimiento,
+            'monto_capital': round(cuota.monto_capital, 2),
+            'monto_interes': round(cuota.monto_interes, 2),
+            'monto_total': round(cuota.monto_total, 2),
+            'saldo_inicial': round(cuota.saldo_inicial, 2),
+            'saldo_final': round(cuota.saldo_final, 2),
+        } for cuota in tabla]
         
-        for i in range(1, self.plazo + 1):
-            interes = saldo * tasa_mensual
-            capital = capital_fijo
-            cuota = capital + interes
-            
-            saldo_inicial = saldo
-            saldo = saldo - capital
-            
-            fecha_vencimiento = self.fecha + relativedelta(months=i)
-            
-            CuotaObj.create({
-                'credito_id': self.id,
-                'numero_cuota': i,
-                'fecha_vencimiento': fecha_vencimiento,
-                'monto_capital': capital,
-                'monto_interes': interes,
-                'monto_total': cuota,
-                'saldo_inicial': saldo_inicial,
-                'saldo_final': max(0, saldo)
-            })
+        num_modificadas = len(parciales)
+        for cuota, vals in zip(pendientes, nuevas_vals):
+            cambios = {campo: valor for campo, valor in vals.items() if cuota[campo] != valor}
+            if cambios:
+                cuota.write(cambios)
+                num_modificadas += 1
+        
+        sobrantes = pendientes[len(nuevas_vals):]
+        creadas = self.env['cartera.cuota'].create([
+            dict(vals, credito_id=self.id) for vals in nuevas_vals[len(pendientes):]
+        ])
+        
+        registro = self.env['cartera.reestructuracion'].create({
+            'credito_id': self.id,
+            'fecha': fecha,
+            'modalidad': modalidad,
+            'motivo': motivo,
+            'saldo_capital': saldo_capital,
+            'interes_capitalizado': interes_capitalizado,
+            'mora_capitalizada': mora_capitalizada,
+            'saldo_reestructurado': saldo,
+            'cuotas_anteriores': len(afectadas),
+            'cuotas_nuevas': len(nuevas_vals),
+            'cuota_anterior': cuota_anterior,
+            'cuota_nueva': nuevas_vals[0]['monto_total'],
+            'num_modificadas': num_modificadas,
+            'num_creadas': len(creadas),
+            'num_eliminadas': len(sobrantes),
+            'tabla_anterior': json.dumps(tabla_anterior, indent=1),
+        })
+        moras.write({'reestructuracion_id': registro.id})
+        # La mora capitalizada de las cuotas sobrantes pasa a la primera cuota
+        # de la nueva tabla, que absorbe el saldo reestructurado; si no, se
+        # borraría en cascada con su cuota
+        moras.filtered(lambda mora: mora.cuota_id in sobrantes).write({'cuota_id': pendientes[0].id})
+        sobrantes.unlink()
+        
+        if self.garante_id:
+            self.env['cartera.garante.exposicion']._recalcular_exposicion(self.garante_id.ids)
+        
+        self.message_post(
+            body=f'Crédito reestructurado ({dict(MODALIDADES_REESTRUCTURACION)[modalidad]}): '
+                 f'capital ${saldo_capital:.2f}, interés vencido ${interes_capitalizado:.2f} y '
+                 f'mora ${mora_capitalizada:.2f} en {len(nuevas_vals)} cuota(s) de '
+                 f'${nuevas_vals[0]["monto_total"]:.2f}. Cuotas modificadas: {num_modificadas}, '
+                 f'creadas: {len(creadas)}, eliminadas: {len(sobrantes)}.',
+            message_type='notification'
+        )
+        return registro
+    
+    @api.model
+    def _sql_registros_permitidos(self, modelo, alias):
+        """Condición SQL que limita ``alias`` a los registros de ``modelo`` visibles
+        para el usuario, aplicando sus derechos de acceso y reglas de registro.
+        
+        Las consultas agregadas en SQL no pasan por el ORM; esta condición
+        evita que un usuario de cartera vea totales de créditos ajenos.
+        """
+        if self.env.su:
+            return SQL('TRUE')
+        return SQL('%s.id IN %s', SQL.identifier(alias), self.env[modelo]._search([]).subselect())
     
     @api.model
-    def calcular_cartera_vencida(self, fecha_corte=None):
-        """Calcular cartera vencida hasta una fecha de corte"""
+    def calcular_cartera_vencida(self, fecha_corte=None, agrupar_por='mes'):
+        """Calcular cartera vencida hasta una fecha de corte.
+        
+        La agregación se hace en una sola consulta agrupada, por lo que el
+        consumo de memoria depende del número de grupos y no del número de
+        cuotas vencidas. Cada fila incluye los tramos de antigüedad de mora.
+        Solo se consideran las cuotas que el usuario puede ver.
+        
+        :param agrupar_por: 'mes' (mes de vencimiento), 'caja' o 'socio'
+        """
+        if agrupar_por not in AGRUPACIONES_CARTERA_VENCIDA:
+            raise UserError(f'Agrupación no soportada: {agrupar_por}')
         if not fecha_corte:
             fecha_corte = fields.Date.context_today(self)
         
-        cuotas_vencidas = self.env['cartera.cuota'].search([
-            ('fecha_vencimiento', '<', fecha_corte),
-            ('estado', 'in', ['pendiente', 'vencida'])
+        clave, expresion = AGRUPACIONES_CARTERA_VENCIDA[agrupar_por]
+        self.env['cartera.cuota'].flush_model([
+            'credito_id', 'caja_id', 'socio_id', 'fecha_vencimiento', 'estado', 'saldo_pendiente',
         ])
+        self.env.cr.execute(SQL(f"""
+            SELECT {expresion} AS grupo,
+                   COUNT(DISTINCT cu.credito_id) AS num_creditos,
+                   COALESCE(SUM(cu.saldo_pendiente), 0) AS monto_vencido,
+                   {SQL_TRAMOS_MORA}
+              FROM cartera_cuota cu
+             WHERE cu.fecha_vencimiento < %(corte)s
+               AND cu.estado != 'pagada'
+               AND %(permitidas)s
+          GROUP BY grupo
+          ORDER BY grupo
+        """, corte=fecha_corte, permitidas=self._sql_registros_permitidos('cartera.cuota', 'cu')))
         
+        resultado = []
+        for fila in self.env.cr.dictfetchall():
+            fila[clave] = fila.pop('grupo')
+            resultado.append(fila)
+        return resultado
+    
+    @api.model
+    def _versiones_cartera(self, caja_ids=None):
+        """Marca de versión de la cartera de cada caja: (créditos, última escritura).
+        
+        Registrar o anular pagos y generar cuotas recalcula los indicadores
+        almacenados del crédito, por lo que cualquier cambio de la cartera de
+        una caja se refleja en esta marca.
+        """
+        self.flush_model()
+        filtro = 'WHERE caja_id = ANY(%(cajas)s)' if caja_ids is not None else ''
+        self.env.cr.execute(f"""
+            SELECT caja_id, COUNT(*), MAX(write_date)
+              FROM cartera_credito
+             {filtro}
+          GROUP BY caja_id
+        """, {'cajas': list(caja_ids or [])})
+        return {caja_id or False: (num, ultima) for caja_id, num, ultima in self.env.cr.fetchall()}
+    
+    @api.model
+    def proyectar_flujo_caja(self, meses=12, caja_ids=None):
+        """Proyectar capital e interés por cobrar de los créditos activos por mes y caja.
+        
+        Se consideran las cuotas con vencimiento desde el mes actual hasta
+        ``meses`` meses después, descontando los pagos parciales (que cubren
+        primero el interés). Solo se suman las cuotas que el usuario puede ver
+        según las reglas de registro. El resultado de cada caja se guarda en
+        caché, separado por usuario salvo para quienes ven toda la cartera, y
+        solo se recalcula cuando cambian sus créditos o pagos.
+        
+        :return: dict {caja_id: [{'periodo', 'capital', 'interes', 'total'}, ...]}
+        """
+        hoy = fields.Date.context_today(self)
+        inicio = hoy.replace(day=1)
+        fin = amortizacion.sumar_meses(inicio, meses)
+        periodos = [amortizacion.sumar_meses(inicio, i).strftime('%Y-%m') for i in range(meses)]
+        
+        if self.env.su or self.env.user.has_group('prefectura_ute_6.group_cartera_manager'):
+            alcance, permitidas = None, SQL('TRUE')
+        else:
+            alcance, permitidas = self.env.uid, self._sql_registros_permitidos('cartera.cuota', 'cu')
+        
+        versiones = self._versiones_cartera(caja_ids)
         resultado = {}
-        for cuota in cuotas_vencidas:
-            mes = cuota.fecha_vencimiento.strftime('%Y-%m')
-            if mes not in resultado:
-                resultado[mes] = {
-                    'periodo': mes,
-                    'num_creditos': 0,
-                    'monto_vencido': 0,
-                    'creditos': set()
-                }
+        pendientes = []
+        for caja_id, version in versiones.items():
+            clave = (self.env.cr.dbname, alcance, caja_id, inicio, meses)
+            proyeccion = _CACHE_PROYECCION.obtener(clave, version)
+            if proyeccion is None:
+                pendientes.append(caja_id)
+            else:
+                resultado[caja_id] = [dict(fila) for fila in proyeccion]
+        
+        if pendientes:
+            self.env['cartera.cuota'].flush_model()
+            self.env.cr.execute(SQL(f"""
+                SELECT cu.caja_id,
+                       to_char(cu.fecha_vencimiento, 'YYYY-MM') AS periodo,
+                       SUM({SQL_CAPITAL_PENDIENTE}) AS capital,
+                       SUM(GREATEST(cu.monto_interes - cu.monto_pagado, 0)) AS interes
+                  FROM cartera_cuota cu
+                  JOIN cartera_credito cr ON cr.id = cu.credito_id
+                 WHERE cr.state = 'activo'
+                   AND cu.estado != 'pagada'
+                   AND cu.fecha_vencimiento >= %(inicio)s
+                   AND cu.fecha_vencimiento < %(fin)s
+                   AND COALESCE(cu.caja_id, 0) = ANY(%(cajas)s)
+                   AND %(permitidas)s
+              GROUP BY cu.caja_id, periodo
+            """,
+                inicio=inicio,
+                fin=fin,
+                cajas=[caja_id or 0 for caja_id in pendientes],
+                permitidas=permitidas,
+            ))
+            montos = {}
+            for caja_id, periodo, capital, interes in self.env.cr.fetchall():
+                montos[(caja_id or False, periodo)] = (capital or 0.0, interes or 0.0)
             
-            resultado[mes]['monto_vencido'] += cuota.saldo_pendiente
-            resultado[mes]['creditos'].add(cuota.credito_id.id)
+            for caja_id in pendientes:
+                proyeccion = []
+                for periodo in periodos:
+                    capital, interes = montos.get((caja_id, periodo), (0.0, 0.0))
+                    proyeccion.append({
+                        'periodo': periodo,
+                        'capital': capital,
+                        'interes': interes,
+                        'total': capital + interes,
+                    })
+                clave = (self.env.cr.dbname, alcance, caja_id, inicio, meses)
+                _CACHE_PROYECCION.guardar(clave, versiones[caja_id], proyeccion)
+                resultado[caja_id] = [dict(fila) for fila in proyeccion]
+        
+        return resultado
+    
+    @api.model
+    def obtener_reporte_antiguedad(self, fecha_corte=None):
+        """Reporte de antigüedad de cartera por mes, caja y socio (para reportes y dashboard)"""
+        return {
+            agrupacion: self.calcular_cartera_vencida(fecha_corte, agrupacion)
+            for agrupacion in AGRUPACIONES_CARTERA_VENCIDA
+        }
+    
+    @api.model
+    def cargar_cartera_columnar(self, caja_ids=None, estados=('activo',), incluir_pagos=False):
+        """Cargar créditos, cuotas y (opcionalmente) pagos en columnas.
+        
+        Cada tabla se lee con una sola consulta a través de un cursor del lado
+        del servidor, sin instanciar registros del ORM; ver ``lib/columnar.py``.
+        Solo se cargan los registros permitidos por las reglas de registro del
+        usuario. Las claves foráneas vacías se cargan como 0.
+        
+        :return: dict {'creditos', 'cuotas'[, 'pagos']} de ``columnar.Columnas``
+        """
+        self.flush_model(['caja_id', 'socio_id', 'fecha', 'monto', 'plazo', 'tasa',
+                          'metodo_amortizacion', 'state'])
+        self.env['cartera.cuota'].flush_model()
+        if incluir_pagos:
+            self.env['cartera.pago'].flush_model(['credito_id', 'cuota_id', 'caja_id', 'fecha', 'monto'])
+        
+        filtro = SQL("cr.state IN %s", tuple(estados))
+        if caja_ids:
+            filtro = SQL("%s AND cr.caja_id IN %s", filtro, tuple(caja_ids))
+        
+        cnx = self.env.cr._cnx
         
-        for mes in resultado:
-            resultado[mes]['num_creditos'] = len(resultado[mes]['creditos'])
-            del resultado[mes]['creditos']
+        def cargar(consulta, esquema, nombre):
+            return columnar.cargar(cnx, consulta.code, consulta.params, esquema, nombre=nombre)
         
-        return list(resultado.values())
+        datos = {
+            'creditos': cargar(SQL("""
+                SELECT cr.id, cr.caja_id, cr.socio_id, cr.fecha, cr.monto, cr.plazo, cr.tasa,
+                       (cr.metodo_amortizacion = 'aleman')::int
+                  FROM cartera_credito cr
+                 WHERE %s AND %s
+              ORDER BY cr.id
+            """, filtro, self._sql_registros_permitidos('cartera.credito', 'cr')),
+                ESQUEMA_CREDITOS, 'cartera_columnar_creditos'),
+            'cuotas': cargar(SQL("""
+                SELECT cu.id, cu.credito_id, cr.caja_id, cu.numero_cuota, cu.fecha_vencimiento,
+                       cu.monto_capital, cu.monto_interes, cu.monto_total,
+                       cu.monto_pagado, cu.saldo_pendiente
+                  FROM cartera_cuota cu
+                  JOIN cartera_credito cr ON cr.id = cu.credito_id
+                 WHERE %s AND %s
+              ORDER BY cu.credito_id, cu.numero_cuota
+            """, filtro, self._sql_registros_permitidos('cartera.cuota', 'cu')),
+                ESQUEMA_CUOTAS, 'cartera_columnar_cuotas'),
+        }
+        if incluir_pagos:
+            datos['pagos'] = cargar(SQL("""
+                SELECT pa.id, pa.credito_id, pa.cuota_id, cr.caja_id, pa.fecha, pa.monto
+                  FROM cartera_pago pa
+                  JOIN cartera_credito cr ON cr.id = pa.credito_id
+                 WHERE %s AND %s
+              ORDER BY pa.credito_id, pa.fecha
+            """, filtro, self._sql_registros_permitidos('cartera.pago', 'pa')),
+                ESQUEMA_PAGOS, 'cartera_columnar_pagos')
+        return datos
+    
+    @api.model
+    def resumen_cartera(self, fecha_corte=None, caja_ids=None):
+        """Indicadores de la cartera activa por caja, calculados sobre columnas.
+        
+        :return: {caja_id: {'num_creditos', 'monto_desembolsado',
+            'capital_pendiente', 'saldo_pendiente', 'monto_vencido'}}
+        """
+        fecha_corte = fecha_corte or fields.Date.context_today(self)
+        datos = self.cargar_cartera_columnar(caja_ids)
+        return columnar.resumir_cartera(datos['creditos'], datos['cuotas'], fecha_corte)
+    
+    @api.model
+    def simular_escenarios(self, escenarios, caja_ids=None):
+        """Prueba de estrés de la cartera activa; no modifica ningún registro.
+        
+        Recalcula la amortización restante de cada crédito bajo cada escenario
+        (ver ``lib/estres.py``) en el proceso actual. Para carteras grandes se
+        invoca desde el proceso en segundo plano del asistente de simulación,
+        no desde la petición del usuario.
+        
+        :param escenarios: lista de dicts con 'nombre', 'choque_tasa',
+            'tasa_incumplimiento' y 'tasa_prepago'
+        :return: lista de resultados por escenario, con el escenario base primero
+        """
+        datos = self.cargar_cartera_columnar(caja_ids)
+        creditos = estres.estado_creditos(datos['creditos'], datos['cuotas'])
+        return estres.simular(creditos, escenarios)
 
 
 # MODELO: CUOTA
@@ -377,13 +962,22 @@ class CarteraCuota(models.Model):
         store=True,
         readonly=True
     )
+    caja_id = fields.Many2one(
+        'eps.caja',
+        string='Caja de Ahorro',
+        related='credito_id.caja_id',
+        store=True,
+        index=True,
+        readonly=True
+    )
     numero_cuota = fields.Integer(
         string='N° Cuota',
         required=True
     )
     fecha_vencimiento = fields.Date(
         string='Fecha de Vencimiento',
-        required=True
+        required=True,
+        index=True
     )
     
     # Montos
@@ -448,6 +1042,18 @@ class CarteraCuota(models.Model):
         store=True
     )
     
+    # Mora
+    mora_ids = fields.One2many(
+        'cartera.mora',
+        'cuota_id',
+        string='Mora Devengada'
+    )
+    monto_mora = fields.Float(
+        string='Mora Acumulada',
+        compute='_compute_monto_mora',
+        digits=(16, 2)
+    )
+    
     @api.depends('pago_ids.monto')
     def _compute_monto_pagado(self):
         """Calcular monto total pagado"""
@@ -491,6 +1097,101 @@ class CarteraCuota(models.Model):
             else:
                 cuota.dias_vencido = 0
     
+    @api.depends('mora_ids.monto', 'mora_ids.reestructuracion_id')
+    def _compute_monto_mora(self):
+        """Sumar la mora devengada de cada cuota que no se haya capitalizado"""
+        grupos = self.env['cartera.mora']._read_group(
+            [('cuota_id', 'in', self.ids), ('reestructuracion_id', '=', False)],
+            ['cuota_id'],
+            ['monto:sum'],
+        )
+        moras = {cuota.id: monto for cuota, monto in grupos}
+        for cuota in self:
+            cuota.monto_mora = moras.get(cuota.id, 0.0)
+    
+    @api.model
+    def _cron_actualizar_vencimientos(self, tamano_lote=1000):
+        """Actualizar estado y días de mora de las cuotas afectadas por el paso del tiempo.
+        
+        ``estado`` y ``dias_vencido`` dependen de la fecha actual, pero el ORM
+        solo los recalcula cuando cambian pagos o fechas. Este proceso diario
+        toca solo:
+        
+        * las cuotas con saldo cuyo estado guardado no corresponde a su
+          vencimiento (pendientes ya vencidas, o vencidas cuya fecha se movió
+          al futuro), que se recalculan con el ORM (cambian de estado y
+          afectan al crédito). Se buscan por su estado y no desde la última
+          ejecución, para recoger también cuotas creadas con fecha pasada o
+          que volvieron a tener saldo al anular un pago;
+        * las cuotas vencidas o parciales cuyo contador de días quedó
+          desactualizado, que se corrigen directamente en SQL.
+        
+        La fecha de la última ejecución solo evita repetir el proceso el
+        mismo día. Cada lote se confirma por separado para no mantener
+        transacciones largas.
+        """
+        ICP = self.env['ir.config_parameter'].sudo()
+        hoy = fields.Date.context_today(self)
+        ultima = fields.Date.to_date(ICP.get_param('cartera.vencimientos_ultima_fecha'))
+        if ultima and ultima >= hoy:
+            return
+        
+        cruzadas = self.search([
+            '|',
+            '&', ('estado', '=', 'pendiente'), ('fecha_vencimiento', '<', hoy),
+            '&', ('estado', '=', 'vencida'), ('fecha_vencimiento', '>=', hoy),
+        ], order='id').ids
+        
+        campos_cuota = [self._fields['estado'], self._fields['dias_vencido']]
+        campo_credito = self.env['cartera.credito']._fields['esta_vencido']
+        for lote in split_every(tamano_lote, cruzadas):
+            cuotas = self.browse(lote)
+            for campo in campos_cuota:
+                self.env.add_to_compute(campo, cuotas)
+            self.env.add_to_compute(campo_credito, cuotas.credito_id)
+            self.env.flush_all()
+            self.env.cr.commit()
+            self.env.invalidate_all()
+        
+        self.env.cr.execute("""
+            SELECT id
+              FROM cartera_cuota
+             WHERE estado IN ('vencida', 'parcial')
+               AND dias_vencido IS DISTINCT FROM GREATEST(%s - fecha_vencimiento, 0)
+          ORDER BY id
+        """, (hoy,))
+        desactualizadas = [fila[0] for fila in self.env.cr.fetchall()]
+        for lote in split_every(tamano_lote, desactualizadas):
+            self.env.cr.execute("""
+                UPDATE cartera_cuota
+                   SET dias_vencido = GREATEST(%s - fecha_vencimiento, 0)
+                 WHERE id = ANY(%s)
+            """, (hoy, list(lote)))
+            self.env.cr.commit()
+        self.invalidate_model(['dias_vencido'])
+        
+        ICP.set_param('cartera.vencimientos_ultima_fecha', fields.Date.to_string(hoy))
+    
+    def _bloquear_para_pago(self):
+        """Bloquear las filas de las cuotas mientras se registran pagos sobre ellas.
+        
+        Dos cajeros que pagan la misma cuota quedan en fila: el segundo espera
+        al primero y, como Odoo trabaja en REPEATABLE READ, al obtener el
+        bloqueo de una fila ya modificada recibe un error de serialización.
+        Odoo reintenta entonces la petición completa, que vuelve a validar
+        contra el saldo actualizado, por lo que no puede haber sobrepago. Las
+        filas se bloquean en orden de id para evitar interbloqueos entre
+        lotes. FOR NO KEY UPDATE no impide insertar pagos que referencian la
+        cuota ni leerla.
+        """
+        if not self.ids:
+            return
+        self.env.cr.execute(
+            "SELECT id FROM cartera_cuota WHERE id IN %s ORDER BY id FOR NO KEY UPDATE",
+            [tuple(self.ids)]
+        )
+        self.invalidate_recordset(['pago_ids', 'monto_pagado', 'saldo_pendiente'])
+    
     def action_registrar_pago(self):
         """Abrir wizard para registrar pago"""
         self.ensure_one()
@@ -550,6 +1251,14 @@ class CarteraPago(models.Model):
         store=True,
         readonly=True
     )
+    caja_id = fields.Many2one(
+        'eps.caja',
+        string='Caja de Ahorro',
+        related='credito_id.caja_id',
+        store=True,
+        index=True,
+        readonly=True
+    )
     fecha = fields.Date(
         string='Fecha de Pago',
         required=True,
@@ -595,19 +1304,57 @@ class CarteraPago(models.Model):
     
     @api.model_create_multi
     def create(self, vals_list):
-        """Generar número de pago consecutivo y validar"""
-        for vals in vals_list:
-            if vals.get('name', 'Nuevo') == 'Nuevo':
-                vals['name'] = self.env['ir.sequence'].next_by_code('cartera.pago') or 'Nuevo'
+        """Generar números de pago consecutivos por caja y validar"""
+        return self._crear_pagos(vals_list)
+    
+    @api.model
+    def _crear_distribuidos(self, vals_list):
+        """Crear en un lote pagos ya repartidos sobre las cuotas.
+        
+        Uso interno de los abonos en cascada y las cargas por archivo: se
+        valida igual que ``create`` que ningún pago exceda el saldo de su
+        cuota, pero se admite que el último tramo de un abono cubra solo
+        parte del interés.
+        """
+        return self._crear_pagos(vals_list, minimo_interes=False)
+    
+    def _crear_pagos(self, vals_list, minimo_interes=True):
+        # Serializar los pagos concurrentes sobre las mismas cuotas antes de validar
+        self.env['cartera.cuota'].browse(
+            {vals['cuota_id'] for vals in vals_list if vals.get('cuota_id')}
+        )._bloquear_para_pago()
+        
+        nuevos = [vals for vals in vals_list if vals.get('name', 'Nuevo') == 'Nuevo']
+        if nuevos:
+            creditos = self.env['cartera.credito'].browse(
+                {vals['credito_id'] for vals in nuevos if vals.get('credito_id')}
+            )
+            caja_por_credito = {credito.id: credito.caja_id.id for credito in creditos}
+            nombres = self.env['ir.sequence'].siguientes_por_caja(
+                'cartera.pago', [caja_por_credito.get(vals.get('credito_id')) for vals in nuevos]
+            )
+            for vals, nombre in zip(nuevos, nombres):
+                vals['name'] = nombre
         
         pagos = super(CarteraPago, self).create(vals_list)
         
-        for pago in pagos:
-            pago._validar_pago()
-            pago._verificar_alerta_solo_interes()
+        pagos._validar_pago(minimo_interes=minimo_interes)
+        pagos._verificar_alerta_solo_interes()
+        
+        garantes = pagos.credito_id.garante_id
+        if garantes:
+            self.env['cartera.garante.exposicion']._recalcular_exposicion(garantes.ids)
         
         return pagos
     
+    def unlink(self):
+        """Devolver al saldo garantizado lo que cubrían los pagos eliminados"""
+        garantes = self.credito_id.garante_id
+        res = super(CarteraPago, self).unlink()
+        if garantes:
+            self.env['cartera.garante.exposicion']._recalcular_exposicion(garantes.ids)
+        return res
+    
     @api.depends('monto', 'cuota_id.monto_interes')
     def _compute_es_solo_interes(self):
         """Verificar si el pago es solo interés"""
@@ -638,58 +1385,93 @@ class CarteraPago(models.Model):
                 pago.aplicado_a_interes = 0
                 pago.aplicado_a_capital = 0
     
-    def _validar_pago(self):
-        """Validar que el pago no exceda el saldo pendiente"""
-        for pago in self:
-            if pago.cuota_id:
-                otros_pagos = pago.cuota_id.pago_ids.filtered(lambda p: p.id != pago.id)
-                monto_otros_pagos = sum(otros_pagos.mapped('monto'))
-                saldo_pendiente = pago.cuota_id.monto_total - monto_otros_pagos
-                
-                if pago.monto > saldo_pendiente + 0.01:
-                    raise ValidationError(
-                        f'El monto del pago (${pago.monto:.2f}) excede el saldo pendiente '
-                        f'de la cuota (${saldo_pendiente:.2f}).'
-                    )
-                
-                if pago.monto < pago.cuota_id.monto_interes:
-                    raise UserError(
-                        f'Advertencia: El pago (${pago.monto:.2f}) es menor que el interés '
-                        f'de la cuota (${pago.cuota_id.monto_interes:.2f}). '
-                        f'El pago solo se aplicará parcialmente al interés.'
-                    )
+    def _validar_pago(self, minimo_interes=True):
+        """Validar que los pagos no excedan el saldo pendiente de sus cuotas.
+        
+        Lo pagado en cada cuota se suma en una sola consulta, de modo que el
+        costo no depende de cuántos pagos tenga cada cuota ni del tamaño del
+        lote. Con ``minimo_interes`` se rechaza además el pago menor al
+        interés de la cuota.
+        """
+        con_cuota = self.filtered('cuota_id')
+        if not con_cuota:
+            return
+        
+        self.flush_model(['cuota_id', 'monto'])
+        pagado = dict(self.sudo()._read_group(
+            [('cuota_id', 'in', con_cuota.cuota_id.ids)],
+            ['cuota_id'],
+            ['monto:sum'],
+        ))
+        montos = {}
+        for pago in con_cuota:
+            montos[pago.cuota_id] = montos.get(pago.cuota_id, 0.0) + pago.monto
+        
+        for cuota, monto in montos.items():
+            saldo_pendiente = cuota.monto_total - (pagado.get(cuota, 0.0) - monto)
+            error = self._verificar_monto(cuota, monto, saldo_pendiente, minimo_interes)
+            if error:
+                raise error
+    
+    @api.model
+    def _verificar_monto(self, cuota, monto, saldo_pendiente, minimo_interes=True):
+        """Devolver el error de validación de un monto sobre una cuota, o None.
+        
+        Se comparte entre el registro individual de pagos y las cargas por
+        lote, que validan en memoria contra el saldo pendiente acumulado.
+        """
+        if monto > saldo_pendiente + 0.01:
+            return ValidationError(
+                f'El monto del pago (${monto:.2f}) excede el saldo pendiente '
+                f'de la cuota (${saldo_pendiente:.2f}).'
+            )
+        
+        if minimo_interes and monto < cuota.monto_interes:
+            return UserError(
+                f'Advertencia: El pago (${monto:.2f}) es menor que el interés '
+                f'de la cuota (${cuota.monto_interes:.2f}). '
+                f'El pago solo se aplicará parcialmente al interés.'
+            )
+        return None
     
     def _verificar_alerta_solo_interes(self):
-        """Verificar y alertar sobre pagos consecutivos de solo interés"""
-        for pago in self:
-            if pago.es_solo_interes and pago.credito_id:
-                limite = int(self.env['ir.config_parameter'].sudo().get_param(
-                    'cartera.alertas_solo_interes', default=3
-                ))
-                
-                pagos_credito = self.search([
-                    ('credito_id', '=', pago.credito_id.id),
-                    ('es_solo_interes', '=', True)
-                ], order='fecha desc')
-                
-                num_pagos_solo_interes = len(pagos_credito)
+        """Actualizar la racha de pagos consecutivos de solo interés y alertar.
+        
+        La racha se guarda en el crédito: aumenta con cada pago de solo interés
+        y se reinicia con cualquier otro pago. La alerta se genera únicamente
+        cuando la racha alcanza el límite configurado.
+        """
+        limite = int(self.env['ir.config_parameter'].sudo().get_param(
+            'cartera.alertas_solo_interes', default=3
+        ))
+        
+        rachas = {}
+        for pago in self.filtered('credito_id'):
+            credito = pago.credito_id
+            racha = rachas.get(credito, credito.racha_solo_interes)
+            racha = racha + 1 if pago.es_solo_interes else 0
+            rachas[credito] = racha
+            
+            if racha == limite:
+                credito.activity_schedule(
+                    'mail.mail_activity_data_warning',
+                    summary=f'Alerta: {racha} pagos consecutivos de solo interés',
+                    note=f'El socio {pago.socio_id.name} ha realizado {racha} '
+                         f'pagos consecutivos cubriendo solo el interés del crédito {credito.name}. '
+                         f'Se recomienda contactar al socio para regularizar la situación.',
+                    user_id=self.env.user.id
+                )
                 
-                if num_pagos_solo_interes >= limite:
-                    pago.credito_id.activity_schedule(
-                        'mail.mail_activity_data_warning',
-                        summary=f'Alerta: {num_pagos_solo_interes} pagos consecutivos de solo interés',
-                        note=f'El socio {pago.socio_id.name} ha realizado {num_pagos_solo_interes} '
-                             f'pagos consecutivos cubriendo solo el interés del crédito {pago.credito_id.name}. '
-                             f'Se recomienda contactar al socio para regularizar la situación.',
-                        user_id=self.env.user.id
-                    )
-                    
-                    pago.credito_id.message_post(
-                        body=f'⚠️ <b>Alerta de Pago Solo Interés</b><br/>'
-                             f'Se han detectado {num_pagos_solo_interes} pagos consecutivos '
-                             f'cubriendo solo el interés. Se recomienda seguimiento.',
-                        message_type='notification'
-                    )
+                credito.message_post(
+                    body=f'⚠️ <b>Alerta de Pago Solo Interés</b><br/>'
+                         f'Se han detectado {racha} pagos consecutivos '
+                         f'cubriendo solo el interés. Se recomienda seguimiento.',
+                    message_type='notification'
+                )
+        
+        for credito, racha in rachas.items():
+            if credito.racha_solo_interes != racha:
+                credito.racha_solo_interes = racha
     
     @api.onchange('cuota_id')
     def _onchange_cuota_id(self):
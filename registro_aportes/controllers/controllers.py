@@ -1,21 +1,39 @@
-# from odoo import http
+from datetime import date
 
+from odoo import http
+from odoo.exceptions import UserError
 
-# class RegistroAportes(http.Controller):
-#     @http.route('/registro_aportes/registro_aportes', auth='public')
-#     def index(self, **kw):
-#         return "Hello, world"
+from odoo.addons.prefectura_ute_6.lib import amortizacion
 
-#     @http.route('/registro_aportes/registro_aportes/objects', auth='public')
-#     def list(self, **kw):
-#         return http.request.render('registro_aportes.listing', {
-#             'root': '/registro_aportes/registro_aportes',
-#             'objects': http.request.env['registro_aportes.registro_aportes'].search([]),
-#         })
 
-#     @http.route('/registro_aportes/registro_aportes/objects/<model("registro_aportes.registro_aportes"):obj>', auth='public')
-#     def object(self, obj, **kw):
-#         return http.request.render('registro_aportes.object', {
-#             'object': obj
-#         })
+class SimuladorCredito(http.Controller):
+    """Simulador de crédito: devuelve la tabla de amortización sin escribir en la base"""
 
+    @http.route('/registro_aportes/simulador_credito', type='jsonrpc', auth='user')
+    def simular(self, monto, plazo, tasa, metodo='frances', fecha=None, **kw):
+        try:
+            monto = round(float(monto), 2)
+            plazo = int(plazo)
+            tasa = round(float(tasa), 2)
+            fecha = date.fromisoformat(fecha) if fecha else date.today()
+            tabla = amortizacion.simular(monto, plazo, tasa, metodo, fecha)
+        except (TypeError, ValueError) as e:
+            raise UserError(f'Parámetros de simulación inválidos: {e}')
+
+        return {
+            'monto': monto,
+            'plazo': plazo,
+            'tasa': tasa,
+            'metodo': metodo,
+            'fecha': fecha.isoformat(),
+            'resumen': amortizacion.resumen(tabla),
+            'cuotas': [{
+                'numero_cuota': cuota.numero_cuota,
+                'fecha_vencimiento': cuota.fecha_vencimiento.isoformat(),
+                'monto_capital': round(cuota.monto_capital, 2),
+                'monto_interes': round(cuota.monto_interes, 2),
+                'monto_total': round(cuota.monto_total, 2),
+                'saldo_inicial': round(cuota.saldo_inicial, 2),
+                'saldo_final': round(cuota.saldo_final, 2),
+            } for cuota in tabla],
+        }
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+from . import test_amortizacion
+from . import test_cartera_vencida
+from . import test_vencimientos
+from . import test_garante
+from . import test_pagos
+from . import test_pagos_concurrencia
+from . import test_secuencias
+from . import test_mora
+from . import test_reestructuracion
+from . import test_estres
+from . import test_estado_cuenta
+from . import test_validacion
+from . import test_socio_busqueda
+from . import test_edades
+from . import test_indicadores_sociales
+from . import test_exportacion_socios
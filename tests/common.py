@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from datetime import date
+
+from odoo.tests.common import TransactionCase, new_test_user
+
+
+class CarteraCommon(TransactionCase):
+    """Caja, socios y créditos de prueba compartidos por los tests de cartera"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.caja = cls.env['eps.caja'].create({
+            'name': 'Caja de Prueba',
+            'codigo': 'CP',
+            'tasa_interes_prestamo': 12.0,
+            'tasa_mora': 2.0,
+        })
+        cls.socio = cls.env['res.partner'].create({'name': 'Socia de Prueba'})
+        cls.garante = cls.env['res.partner'].create({'name': 'Garante de Prueba'})
+
+    @classmethod
+    def _crear_credito(cls, activar=True, **vals):
+        valores = {
+            'socio_id': cls.socio.id,
+            'caja_id': cls.caja.id,
+            'fecha': date(2025, 1, 15),
+            'monto': 1200.0,
+            'plazo': 12,
+            'tasa': 12.0,
+            'metodo_amortizacion': 'frances',
+        }
+        valores.update(vals)
+        credito = cls.env['cartera.credito'].create(valores)
+        if activar:
+            credito.action_aprobar()
+            credito.action_activar()
+        return credito
+
+    @classmethod
+    def _crear_usuario_cartera(cls, login, grupo='prefectura_ute_6.group_cartera_user'):
+        """Usuario con el grupo indicado; su contacto es el socio de sus créditos"""
+        return new_test_user(cls.env, login=login, groups=grupo)
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+from unittest.mock import patch
+
+from odoo.tests import tagged
+
+from .common import CarteraCommon
+from ..lib import amortizacion
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('post_install', '-at_install')
+class TestGenerarTablaAmortizacion(CarteraCommon):
+
+    def test_tabla_igual_al_motor(self):
+        """Las cuotas guardadas coinciden con las del motor en memoria"""
+        credito = self._crear_credito()
+        tabla = amortizacion.simular(1200.0, 12, 12.0, 'frances', credito.fecha)
+        cuotas = credito.cuota_ids.sorted('numero_cuota')
+        self.assertEqual(len(cuotas), 12)
+        for cuota, esperada in zip(cuotas, tabla):
+            self.assertEqual(cuota.fecha_vencimiento, esperada.fecha_vencimiento)
+            self.assertAlmostEqual(cuota.monto_total, esperada.monto_total, places=2)
+            self.assertAlmostEqual(cuota.saldo_final, esperada.saldo_final, places=2)
+        self.assertAlmostEqual(sum(cuotas.mapped('monto_capital')), 1200.0, places=2)
+
+    def test_un_solo_create_por_lote(self):
+        """Las cuotas de todos los créditos del recordset se crean en una sola llamada"""
+        creditos = self._crear_credito(activar=False) | self._crear_credito(activar=False, plazo=24)
+        Cuota = type(self.env['cartera.cuota'])
+        with patch.object(Cuota, 'create', autospec=True, side_effect=Cuota.create) as create:
+            creditos.generar_tabla_amortizacion()
+        self.assertEqual(create.call_count, 1)
+        self.assertEqual(len(create.call_args.args[1]), 36)
+        self.assertEqual(creditos.mapped('num_cuotas'), [12, 24])
+
+    def test_regenerar_reemplaza_cuotas(self):
+        credito = self._crear_credito(activar=False)
+        credito.generar_tabla_amortizacion()
+        credito.plazo = 6
+        credito.generar_tabla_amortizacion()
+        self.assertEqual(credito.num_cuotas, 6)
+
+
+@tagged('-standard', 'benchmark')
+class TestBenchmarkAmortizacion(CarteraCommon):
+    """Medición de la generación de tablas; se ejecuta con --test-tags=benchmark"""
+
+    def _creditos_aprobados(self, cantidad):
+        creditos = self.env['cartera.credito'].create([{
+            'socio_id': self.socio.id,
+            'caja_id': self.caja.id,
+            'monto': 1000.0 + i,
+            'plazo': 12,
+            'tasa': 15.0,
+        } for i in range(cantidad)])
+        creditos.action_aprobar()
+        self.env.flush_all()
+        return creditos
+
+    def _medir_consultas(self, funcion):
+        """Ejecuta ``funcion`` y devuelve (consultas totales, INSERT en cartera_cuota)"""
+        cr = self.env.cr
+        ejecutar = cr.execute
+        inserts = []
+
+        def registrar(consulta, params=None, *args, **kwargs):
+            codigo = getattr(consulta, 'code', consulta)
+            if codigo.lstrip().upper().startswith('INSERT INTO "CARTERA_CUOTA"'):
+                inserts.append(consulta)
+            return ejecutar(consulta, params, *args, **kwargs)
+
+        antes = cr.sql_log_count
+        with patch.object(cr, 'execute', registrar):
+            funcion()
+            self.env.flush_all()
+        return cr.sql_log_count - antes, len(inserts)
+
+    def test_benchmark_consultas_activacion_500(self):
+        """Activar 500 créditos en lote frente a activarlos uno por uno (como antes)"""
+        en_lote = self._creditos_aprobados(500)
+        consultas_lote, inserts_lote = self._medir_consultas(en_lote.action_activar)
+
+        uno_a_uno = self._creditos_aprobados(500)
+
+        def activar_uno_a_uno():
+            for credito in uno_a_uno:
+                credito.action_activar()
+
+        consultas_antes, inserts_antes = self._medir_consultas(activar_uno_a_uno)
+        _logger.info('Activación de 500 créditos x 12 cuotas: %s consultas (%s INSERT de cuotas) en lote, '
+                     '%s consultas (%s INSERT) uno por uno',
+                     consultas_lote, inserts_lote, consultas_antes, inserts_antes)
+
+        num_cuotas = sum(en_lote.mapped('num_cuotas'))
+        self.assertEqual(num_cuotas, 6000)
+        # Las cuotas se insertan por bloques del ORM, no una sentencia por cuota ni por crédito
+        self.assertLessEqual(inserts_lote * 50, num_cuotas)
+        self.assertGreaterEqual(inserts_antes, 500)
+        self.assertLess(consultas_lote * 5, consultas_antes)
+
+    def test_benchmark_generar_tablas(self):
+        creditos = self.env['cartera.credito'].create([{
+            'socio_id': self.socio.id,
+            'caja_id': self.caja.id,
+            'monto': 1000.0 + i,
+            'plazo': 60,
+            'tasa': 15.0,
+        } for i in range(200)])
+        inicio = time.perf_counter()
+        creditos.generar_tabla_amortizacion()
+        creditos.env.flush_all()
+        duracion = time.perf_counter() - inicio
+        _logger.info('Tablas de 200 créditos x 60 cuotas generadas en %.2f s', duracion)
+        self.assertEqual(sum(creditos.mapped('num_cuotas')), 12000)
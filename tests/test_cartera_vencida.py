@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from datetime import date
+
+from odoo import fields
+from odoo.tests import tagged
+
+from .common import CarteraCommon
+
+
+@tagged('post_install', '-at_install')
+class TestCarteraVencida(CarteraCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.usuario = cls._crear_usuario_cartera('socia_cartera')
+        cls.propio = cls._crear_credito(socio_id=cls.usuario.partner_id.id)
+        cls.ajeno = cls._crear_credito()
+        cls.corte = date(2025, 6, 30)
+
+    def test_gestor_ve_toda_la_cartera(self):
+        filas = self.env['cartera.credito'].calcular_cartera_vencida(self.corte, 'socio')
+        socios = {fila['socio_id'] for fila in filas}
+        self.assertEqual(socios, {self.usuario.partner_id.id, self.socio.id})
+
+    def test_usuario_solo_ve_sus_creditos(self):
+        Credito = self.env['cartera.credito'].with_user(self.usuario)
+        filas = Credito.calcular_cartera_vencida(self.corte, 'socio')
+        self.assertEqual([fila['socio_id'] for fila in filas], [self.usuario.partner_id.id])
+        self.assertEqual(filas[0]['num_creditos'], 1)
+
+        por_caja = Credito.calcular_cartera_vencida(self.corte, 'caja')
+        propias = self.propio.cuota_ids.filtered(lambda c: c.fecha_vencimiento < self.corte)
+        self.assertAlmostEqual(por_caja[0]['monto_vencido'], sum(propias.mapped('saldo_pendiente')), places=2)
+
+    def test_proyeccion_respeta_reglas(self):
+        hoy = fields.Date.context_today(self.env['cartera.credito'])
+        self._crear_credito(socio_id=self.usuario.partner_id.id, fecha=hoy)
+        self._crear_credito(fecha=hoy)
+        meses = 24
+        total = self.env['cartera.credito'].proyectar_flujo_caja(meses, [self.caja.id])[self.caja.id]
+        propia = self.env['cartera.credito'].with_user(self.usuario).proyectar_flujo_caja(
+            meses, [self.caja.id]
+        )[self.caja.id]
+        self.assertAlmostEqual(
+            sum(fila['total'] for fila in propia) * 2, sum(fila['total'] for fila in total), places=2
+        )
+        self.assertTrue(sum(fila['total'] for fila in propia))
+
+    def test_resumen_columnar_respeta_reglas(self):
+        resumen = self.env['cartera.credito'].resumen_cartera(self.corte, [self.caja.id])
+        self.assertEqual(resumen[self.caja.id]['num_creditos'], 2)
+        propio = self.env['cartera.credito'].with_user(self.usuario).resumen_cartera(self.corte, [self.caja.id])
+        self.assertEqual(propio[self.caja.id]['num_creditos'], 1)
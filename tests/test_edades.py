@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+from contextlib import contextmanager
+from datetime import date
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.tests import TransactionCase, tagged
+
+PARAMETRO = 'eps_socio.edades_actualizadas_hasta'
+
+
+@tagged('post_install', '-at_install')
+class TestActualizarEdades(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.caja = cls.env['eps.caja'].create({'name': 'Caja Edades', 'codigo': 'CED'})
+
+    @contextmanager
+    def _en_fecha(self, fecha):
+        with patch.object(fields.Date, 'context_today', lambda *args, **kwargs: fecha):
+            yield
+
+    def _crear_socios(self, creado_el, nacimientos):
+        """Crea socios con la edad que tenían en ``creado_el``"""
+        cedulas = ['1710034008', '1710034016', '1710034024', '1710034032', '1710034040', '1710034065']
+        with self._en_fecha(creado_el):
+            socios = self.env['eps.socio'].create([{
+                'name': f'Socio {indice}',
+                'cedula': cedulas[indice],
+                'caja_id': self.caja.id,
+                'fecha_nacimiento': nacimiento,
+            } for indice, nacimiento in enumerate(nacimientos)])
+            self.env.flush_all()
+        return socios
+
+    def _ejecutar_cron(self, hoy, ultima):
+        ICP = self.env['ir.config_parameter'].sudo()
+        ICP.set_param(PARAMETRO, ultima and fields.Date.to_string(ultima))
+        with self._en_fecha(hoy):
+            self.env['eps.socio']._cron_actualizar_edades()
+        return ICP.get_param(PARAMETRO)
+
+    def test_recupera_los_dias_sin_ejecutar(self):
+        cumplio, por_cumplir = self._crear_socios(date(2023, 6, 10), [date(1960, 6, 12), date(1960, 6, 20)])
+        self.assertEqual((cumplio.edad, por_cumplir.edad), (62, 62))
+
+        # El proceso no corrió el 11 ni el 12: el cumpleaños del 12 se recupera
+        hasta = self._ejecutar_cron(date(2023, 6, 13), ultima=date(2023, 6, 10))
+        self.assertEqual(cumplio.edad, 63)
+        self.assertEqual(por_cumplir.edad, 62)
+        self.assertEqual(hasta, '2023-06-13')
+
+    def test_solo_recalcula_los_cumpleanos_del_periodo(self):
+        cumplio, fuera = self._crear_socios(date(2023, 6, 10), [date(1960, 6, 12), date(1960, 6, 5)])
+        # Edad desactualizada a propósito: quien no cumple años en el periodo no se toca
+        self.env.cr.execute("UPDATE eps_socio SET edad = 10 WHERE id = %s", [fuera.id])
+        fuera.invalidate_recordset(['edad'])
+
+        self._ejecutar_cron(date(2023, 6, 12), ultima=date(2023, 6, 11))
+        self.assertEqual(cumplio.edad, 63)
+        self.assertEqual(fuera.edad, 10)
+
+    def test_29_de_febrero_en_anio_no_bisiesto(self):
+        bisiesto, = self._crear_socios(date(2023, 2, 28), [date(1960, 2, 29)])
+        self.assertEqual(bisiesto.edad, 62)
+
+        self._ejecutar_cron(date(2023, 3, 1), ultima=date(2023, 2, 28))
+        self.assertEqual(bisiesto.edad, 63)
+
+    def test_primera_ejecucion_recalcula_todos(self):
+        socios = self._crear_socios(date(2023, 1, 1), [date(1960, 6, 12), date(1970, 9, 3)])
+        self.assertEqual(socios.mapped('edad'), [62, 52])
+
+        hasta = self._ejecutar_cron(date(2023, 12, 1), ultima=False)
+        self.assertEqual(socios.mapped('edad'), [63, 53])
+        self.assertEqual(hasta, '2023-12-01')
+
+    def test_mas_de_un_anio_sin_ejecutar_recalcula_todos(self):
+        socios = self._crear_socios(date(2022, 1, 1), [date(1960, 6, 12), date(1970, 9, 3)])
+        self.assertEqual(socios.mapped('edad'), [61, 51])
+
+        self._ejecutar_cron(date(2023, 12, 1), ultima=date(2022, 1, 1))
+        self.assertEqual(socios.mapped('edad'), [63, 53])
+
+    def test_arrastra_tercera_edad_y_menor_de_edad(self):
+        mayor, menor = self._crear_socios(date(2023, 6, 10), [date(1958, 6, 12), date(2005, 6, 11)])
+        self.assertEqual((mayor.edad, mayor.es_tercera_edad, mayor.tercera_edad_texto), (64, False, 'No'))
+        self.assertEqual((menor.edad, menor.es_menor_edad, menor.menor_edad_texto), (17, True, 'Sí'))
+
+        self._ejecutar_cron(date(2023, 6, 12), ultima=date(2023, 6, 10))
+        self.assertEqual((mayor.edad, mayor.es_tercera_edad, mayor.tercera_edad_texto), (65, True, 'Sí'))
+        self.assertEqual((menor.edad, menor.es_menor_edad, menor.menor_edad_texto), (18, False, 'No'))
+
+    def test_segunda_ejecucion_del_dia_no_recalcula(self):
+        cumplio, = self._crear_socios(date(2023, 6, 10), [date(1960, 6, 12)])
+        self._ejecutar_cron(date(2023, 6, 12), ultima=date(2023, 6, 11))
+        self.env.cr.execute("UPDATE eps_socio SET edad = 10 WHERE id = %s", [cumplio.id])
+        cumplio.invalidate_recordset(['edad'])
+
+        with self._en_fecha(date(2023, 6, 12)):
+            self.env['eps.socio']._cron_actualizar_edades()
+        self.assertEqual(cumplio.edad, 10)
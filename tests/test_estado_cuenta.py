@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+
+from .common import CarteraCommon
+
+
+@tagged('post_install', '-at_install')
+class TestEstadoCuentaLote(CarteraCommon):
+
+    def test_incluye_socios_sin_creditos(self):
+        credito = self._crear_credito()
+        solo_aportes = self.env['res.partner'].create({'name': 'Socia con aportes', 'vat': '171003406-5'})
+        self.env['eps.socio'].create({
+            'name': 'Socia',
+            'apellido': 'Con Aportes',
+            'cedula': '1710034065',
+            'caja_id': self.caja.id,
+        })
+        lote = self.env['cartera.estado.cuenta.lote'].create({
+            'caja_id': self.caja.id,
+            'periodo': date(2025, 6, 30),
+        })
+
+        estados = lote._preparar_estados()
+
+        self.assertEqual(set(estados), {self.socio.id, solo_aportes.id})
+        self.assertEqual([c['id'] for c in estados[self.socio.id]['creditos']], credito.ids)
+        self.assertEqual(estados[solo_aportes.id]['creditos'], [])
+
+    def _lote_procesando(self, minutos):
+        lote = self.env['cartera.estado.cuenta.lote'].create({
+            'caja_id': self.caja.id,
+            'periodo': date(2025, 6, 30),
+        })
+        lote.state = 'procesando'
+        lote.flush_recordset()
+        self.env.cr.execute(
+            "UPDATE cartera_estado_cuenta_lote SET write_date = %s WHERE id = %s",
+            [fields.Datetime.now() - timedelta(minutes=minutos), lote.id],
+        )
+        lote.invalidate_recordset()
+        return lote
+
+    def test_retoma_lotes_interrumpidos(self):
+        interrumpido = self._lote_procesando(120)
+        activo = self._lote_procesando(1)
+        Lote = type(self.env['cartera.estado.cuenta.lote'])
+        with patch.object(Lote, '_procesar', autospec=True) as procesar, \
+                patch.object(self.env.cr, 'commit', lambda: None):
+            self.env['cartera.estado.cuenta.lote']._cron_procesar_lotes()
+        self.assertEqual([llamada.args[0] for llamada in procesar.call_args_list], [interrumpido])
+
+        # Solo el lote interrumpido puede volver a encolarse a mano
+        with patch.object(type(self.env['ir.cron']), '_trigger', autospec=True):
+            interrumpido.action_generar()
+            self.assertEqual(interrumpido.state, 'en_cola')
+            with self.assertRaises(UserError):
+                activo.action_generar()
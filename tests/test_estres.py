@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+
+from odoo.tests import tagged
+
+from .common import CarteraCommon
+from ..lib import estres
+
+
+@tagged('post_install', '-at_install')
+class TestSimulacionEstres(CarteraCommon):
+
+    def test_simulacion_en_segundo_plano(self):
+        self._crear_credito()
+        wizard = self.env['cartera.estres.wizard'].create({
+            'caja_id': self.caja.id,
+            'choque_tasa': 2.0,
+        })
+        wizard.action_simular()
+        self.assertEqual(wizard.state, 'en_cola')
+        self.assertFalse(wizard.resultado)
+
+        with patch.object(self.env.cr, 'commit', lambda: None):
+            self.env['cartera.estres.wizard']._cron_procesar_simulaciones()
+
+        self.assertEqual(wizard.state, 'done')
+        self.assertIn('Créditos evaluados: 1', wizard.resultado)
+
+    def test_vectorizado_igual_al_calculo_por_credito(self):
+        if estres.numpy is None:
+            self.skipTest('numpy no está instalado')
+        creditos = [
+            (1, 1, 1000.0, 12, 12.0, False),
+            (2, 1, 2500.0, 36, 18.0, True),
+            (3, 2, 800.0, 6, 0.0, False),
+        ]
+        escenarios = [dict(estres.ESCENARIO_BASE, choque_tasa=3, tasa_incumplimiento=5, tasa_prepago=10)]
+        esperado = estres._evaluar_lote(creditos, escenarios)
+        obtenido = estres._evaluar_vectorizado(creditos, escenarios)
+        self.assertEqual(esperado.keys(), obtenido.keys())
+        for clave, valores in esperado.items():
+            for valor, vectorizado in zip(valores, obtenido[clave]):
+                self.assertAlmostEqual(valor, vectorizado, places=6)
@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+import csv
+import io
+
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestExportacionSocios(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Caja = cls.env['eps.caja']
+        cls.caja = Caja.create({'name': 'Caja "San José"/Norte', 'codigo': 'SJN'})
+        cls.otra_caja = Caja.create({'name': 'Caja Sur', 'codigo': 'CS'})
+        Socio = cls.env['eps.socio']
+        cls.activa = Socio.create({'name': 'Rosa', 'cedula': '1710034008', 'caja_id': cls.caja.id})
+        cls.inactiva = Socio.create({'name': 'Ana', 'cedula': '1710034016', 'caja_id': cls.caja.id})
+        cls.inactiva.action_marcar_inactivo()
+        Socio.create({'name': 'Luz', 'cedula': '1710034024', 'caja_id': cls.otra_caja.id})
+
+    def _exportar(self, **vals):
+        asistente = self.env['eps.socio.export.wizard'].create(dict({'formato': 'csv'}, **vals))
+        archivo, nombre, mimetype = asistente._generar_archivo()
+        with archivo:
+            filas = list(csv.reader(io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')))
+        return filas, nombre, mimetype
+
+    def test_descarga_por_controlador(self):
+        asistente = self.env['eps.socio.export.wizard'].create({'caja_id': self.caja.id, 'formato': 'csv'})
+        accion = asistente.action_exportar()
+        self.assertEqual(accion['url'], f'/prefectura_ute_6/socios/exportar/{asistente.id}')
+        # No se deja el archivo como adjunto
+        self.assertFalse(self.env['ir.attachment'].search([
+            ('res_model', '=', 'eps.socio.export.wizard'), ('res_id', '=', asistente.id),
+        ]))
+
+    def test_filtra_caja_e_inactivos(self):
+        filas, nombre, mimetype = self._exportar(caja_id=self.caja.id)
+        self.assertEqual([fila[1] for fila in filas[1:]], ['Rosa'])
+        self.assertEqual(mimetype, 'text/csv')
+        self.assertTrue(nombre.startswith('socios_Caja_San_José_Norte_'))
+
+        filas, __, __ = self._exportar(caja_id=self.caja.id, incluir_inactivos=True)
+        self.assertEqual(sorted(fila[1] for fila in filas[1:]), ['Ana', 'Rosa'])
+
+        filas, nombre, __ = self._exportar()
+        self.assertEqual(sorted(fila[1] for fila in filas[1:]), ['Luz', 'Rosa'])
+        self.assertTrue(nombre.startswith('socios_todas_'))
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+from odoo.exceptions import ValidationError
+from odoo.tests import tagged
+
+from .common import CarteraCommon
+
+
+@tagged('post_install', '-at_install')
+class TestGaranteExposicion(CarteraCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env['ir.config_parameter'].sudo().set_param('cartera.max_creditos_garante', 2)
+        cls.otra_caja = cls.env['eps.caja'].create({
+            'name': 'Caja Secundaria',
+            'codigo': 'CS',
+            'tasa_interes_prestamo': 12,
+            'tasa_mora': 2,
+        })
+
+    def _exposicion(self):
+        return self.env['cartera.garante.exposicion'].search([('garante_id', '=', self.garante.id)])
+
+    def test_limite_suma_todas_las_cajas(self):
+        self._crear_credito(garante_id=self.garante.id)
+        self._crear_credito(garante_id=self.garante.id, caja_id=self.otra_caja.id)
+        with self.assertRaises(ValidationError):
+            self._crear_credito(garante_id=self.garante.id, caja_id=self.otra_caja.id)
+
+    def test_unlink_actualiza_exposicion(self):
+        credito = self._crear_credito(garante_id=self.garante.id)
+        pago = self.env['cartera.pago'].create({
+            'credito_id': credito.id,
+            'cuota_id': credito.cuota_ids[0].id,
+            'monto': credito.cuota_ids[0].monto_total,
+        })
+        saldo_con_pago = self._exposicion().saldo_garantizado
+
+        pago.unlink()
+        self.assertGreater(self._exposicion().saldo_garantizado, saldo_con_pago)
+
+        credito.unlink()
+        self.assertFalse(self._exposicion())
+
+    def test_usuario_no_lee_exposicion(self):
+        self._crear_credito(garante_id=self.garante.id)
+        usuario = self._crear_usuario_cartera('socia_garante')
+        self.assertFalse(
+            self.env['cartera.garante.exposicion'].with_user(usuario).has_access('read')
+        )
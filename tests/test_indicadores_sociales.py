@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestIndicadoresSociales(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Caja = cls.env['eps.caja']
+        cls.caja = Caja.create({'name': 'Caja Indicadores', 'codigo': 'CI'})
+        cls.caja_vacia = Caja.create({'name': 'Caja Sin Socios', 'codigo': 'CV'})
+        cls.socia = cls.env['eps.socio'].create({
+            'name': 'Rosa', 'cedula': '1710034008', 'caja_id': cls.caja.id, 'genero': 'mujer',
+        })
+
+    def test_caja_sin_socios_en_cero(self):
+        indicadores = self.env['eps.socio'].obtener_indicadores_sociales(self.caja_vacia.ids)
+        self.assertEqual(indicadores[self.caja_vacia.id]['total'], 0)
+        self.assertEqual(indicadores[self.caja_vacia.id]['mujeres'], 0)
+        self.assertEqual(indicadores[self.caja_vacia.id]['porcentajes']['mujeres'], 0.0)
+
+    def test_cambios_en_la_misma_transaccion(self):
+        Socio = self.env['eps.socio']
+        self.assertEqual(Socio.obtener_indicadores_sociales(self.caja.ids)[self.caja.id]['mujeres'], 1)
+
+        # Misma transacción: la versión no cambia, pero la caja queda marcada
+        # como modificada y se recalcula sin caché
+        self.socia.genero = 'hombre'
+        indicadores = Socio.obtener_indicadores_sociales(self.caja.ids)[self.caja.id]
+        self.assertEqual((indicadores['mujeres'], indicadores['hombres']), (0, 1))
+
+        Socio.create({'name': 'Ana', 'cedula': '1710034016', 'caja_id': self.caja.id})
+        self.assertEqual(Socio.obtener_indicadores_sociales(self.caja.ids)[self.caja.id]['total'], 2)
+
+    def test_cambio_de_caja_actualiza_ambas(self):
+        self.socia.caja_id = self.caja_vacia
+        indicadores = self.env['eps.socio'].obtener_indicadores_sociales((self.caja | self.caja_vacia).ids)
+        self.assertEqual(indicadores[self.caja.id]['total'], 0)
+        self.assertEqual(indicadores[self.caja_vacia.id]['total'], 1)
+
+    def test_campos_de_la_caja(self):
+        self.assertEqual(self.caja.socios_activos, 1)
+        self.assertEqual(self.caja.socios_mujeres, 1)
+        self.assertEqual(self.caja.porcentaje_mujeres, 100.0)
+        self.assertEqual(self.caja_vacia.socios_activos, 0)
+
+    def test_solo_los_campos_de_indicadores_marcan_la_caja(self):
+        Socio = self.env['eps.socio']
+        self.env.cr.precommit.data.pop('eps.socio.cajas_modificadas', None)
+        self.socia.telefono = '0987654321'
+        self.assertNotIn(self.caja.id, Socio._cajas_modificadas())
+        self.socia.es_indigena = True
+        self.assertIn(self.caja.id, Socio._cajas_modificadas())
+
+    def test_no_escribe_en_la_caja(self):
+        """Editar socios no bloquea la fila de la caja"""
+        sentencias = []
+        ejecutar = self.env.cr.execute
+
+        def registrar(consulta, params=None, *args, **kwargs):
+            sentencias.append(str(getattr(consulta, 'code', consulta)))
+            return ejecutar(consulta, params, *args, **kwargs)
+
+        with patch.object(self.env.cr, 'execute', registrar):
+            self.socia.write({'genero': 'otro', 'num_dependientes': 2})
+            self.env['eps.socio'].create({'name': 'Ana', 'cedula': '1710034016', 'caja_id': self.caja.id})
+            self.env.flush_all()
+        self.assertFalse([sql for sql in sentencias if 'UPDATE' in sql.upper() and 'eps_caja' in sql])
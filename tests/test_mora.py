@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.tests import tagged
+
+from .common import CarteraCommon
+
+
+@tagged('post_install', '-at_install')
+class TestCronMora(CarteraCommon):
+
+    def _ejecutar_cron(self):
+        with patch.object(self.env.cr, 'commit', lambda: None):
+            self.env['cartera.mora']._cron_devengar_mora()
+
+    def test_recupera_dias_no_devengados(self):
+        hoy = fields.Date.context_today(self.env['cartera.mora'])
+        credito = self._crear_credito(fecha=hoy - timedelta(days=100))
+        self.env['ir.config_parameter'].set_param(
+            'cartera.mora_ultima_fecha', fields.Date.to_string(hoy - timedelta(days=3))
+        )
+
+        self._ejecutar_cron()
+
+        moras = self.env['cartera.mora'].search([('credito_id', '=', credito.id)])
+        self.assertEqual(set(moras.mapped('fecha')), {hoy - timedelta(days=dias) for dias in range(3)})
+        vencidas = credito.cuota_ids.filtered(lambda c: c.fecha_vencimiento < hoy - timedelta(days=2))
+        self.assertEqual(len(moras.filtered(lambda m: m.fecha == hoy - timedelta(days=2))), len(vencidas))
+
+        # Repetir el mismo día no duplica el devengo
+        self._ejecutar_cron()
+        self.assertEqual(self.env['cartera.mora'].search_count([('credito_id', '=', credito.id)]), len(moras))
+
+    def test_usuario_solo_ve_su_mora(self):
+        hoy = fields.Date.context_today(self.env['cartera.mora'])
+        usuario = self._crear_usuario_cartera('mora_usuario')
+        ajeno = self._crear_credito(fecha=hoy - timedelta(days=100))
+        propio = self._crear_credito(fecha=hoy - timedelta(days=100), socio_id=usuario.partner_id.id)
+        self.env['ir.config_parameter'].set_param(
+            'cartera.mora_ultima_fecha', fields.Date.to_string(hoy - timedelta(days=1))
+        )
+        self._ejecutar_cron()
+
+        visibles = self.env['cartera.mora'].with_user(usuario).search([])
+        self.assertTrue(visibles)
+        self.assertEqual(visibles.credito_id, propio)
+        self.assertTrue(self.env['cartera.mora'].search([('credito_id', '=', ajeno.id)]))
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+from unittest.mock import patch
+
+from odoo.exceptions import ValidationError
+from odoo.tests import tagged
+
+from .common import CarteraCommon
+
+
+@tagged('post_install', '-at_install')
+class TestPagos(CarteraCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.credito = cls._crear_credito()
+        cls.cuota = cls.credito.cuota_ids.sorted('numero_cuota')[0]
+
+    def _pago(self, monto, cuota=None, **context):
+        cuota = cuota or self.cuota
+        return self.env['cartera.pago'].with_context(**context).create({
+            'credito_id': self.credito.id,
+            'cuota_id': cuota.id,
+            'monto': monto,
+        })
+
+    def test_contexto_no_omite_validacion(self):
+        with self.assertRaises(ValidationError):
+            self._pago(self.cuota.monto_total + 10, cartera_pagos_validados=True)
+
+    def test_lote_valida_saldo_acumulado(self):
+        mitad = round(self.cuota.monto_total / 2, 2) + 1
+        with self.assertRaises(ValidationError):
+            self.env['cartera.pago'].create([{
+                'credito_id': self.credito.id,
+                'cuota_id': self.cuota.id,
+                'monto': mitad,
+            } for __ in range(2)])
+
+    def test_importacion_cuenta_filas(self):
+        wizard = self.env['cartera.pago.import.wizard'].create({'file': b'eA==', 'filename': 'pagos.csv'})
+        resultado = wizard._process_rows([
+            # Abono que se reparte en varias cuotas: una fila, varios pagos
+            {'credito': self.credito.name, 'monto': self.cuota.monto_total * 2.5},
+            {'credito': 'NO-EXISTE', 'monto': 10},
+        ])
+        self.assertIn('Filas importadas: 1', resultado)
+        self.assertIn('Filas omitidas: 1', resultado)
+        self.assertIn('Pagos registrados: 3', resultado)
+
+    def test_abonos_en_un_solo_lote(self):
+        """Los abonos de varios créditos se numeran, bloquean y validan una sola vez"""
+        creditos = self.credito | self._crear_credito(plazo=6) | self._crear_credito(plazo=24)
+        Pago = type(self.env['cartera.pago'])
+        Secuencia = type(self.env['ir.sequence'])
+        with patch.object(Pago, '_validar_pago', autospec=True, side_effect=Pago._validar_pago) as validar, \
+                patch.object(Secuencia, 'siguientes_por_caja', autospec=True,
+                             side_effect=Secuencia.siguientes_por_caja) as siguientes:
+            pagos, remanentes = creditos.distribuir_pago({credito.id: 250.0 for credito in creditos})
+        self.assertEqual(validar.call_count, 1)
+        self.assertEqual(validar.call_args.args[0], pagos)
+        self.assertEqual(siguientes.call_count, 1)
+        self.assertEqual(len(set(pagos.mapped('name'))), len(pagos))
+        self.assertFalse(any(remanentes.values()))
+
+    def test_bloqueo_en_orden_de_id(self):
+        """Las cuotas se bloquean en una sola sentencia y en orden de id, sin importar el recordset"""
+        cuotas = self.credito.cuota_ids.sorted('numero_cuota', reverse=True)
+        sentencias = []
+        ejecutar = self.env.cr.execute
+
+        def registrar(consulta, params=None, *args, **kwargs):
+            sentencias.append((str(consulta), params))
+            return ejecutar(consulta, params, *args, **kwargs)
+
+        with patch.object(self.env.cr, 'execute', registrar):
+            cuotas._bloquear_para_pago()
+        bloqueos = [(consulta, params) for consulta, params in sentencias if 'FOR NO KEY UPDATE' in consulta]
+        self.assertEqual(len(bloqueos), 1)
+        consulta, params = bloqueos[0]
+        self.assertIn('ORDER BY id FOR NO KEY UPDATE', consulta)
+        self.assertEqual(set(params[0]), set(cuotas.ids))
+
+    def test_create_bloquea_antes_de_insertar(self):
+        Cuota = type(self.env['cartera.cuota'])
+        with patch.object(Cuota, '_bloquear_para_pago', autospec=True,
+                          side_effect=Cuota._bloquear_para_pago) as bloquear:
+            self._pago(self.cuota.monto_interes + 1)
+        self.assertEqual(bloquear.call_count, 1)
+        self.assertEqual(bloquear.call_args.args[0], self.cuota)
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+import time
+from datetime import date
+
+from psycopg2 import errors
+
+from odoo import SUPERUSER_ID, api
+from odoo.exceptions import ValidationError
+from odoo.modules.registry import Registry
+from odoo.tests import tagged
+from odoo.tests.common import BaseCase, get_db_name
+
+_logger = logging.getLogger(__name__)
+
+# Errores ante los que Odoo reintenta la petición completa
+ERRORES_CONCURRENCIA = (errors.SerializationFailure, errors.DeadlockDetected)
+MAX_REINTENTOS = 10
+
+
+class PagosConcurrentesCommon(BaseCase):
+    """Pagos desde transacciones independientes, como los de varios cajeros.
+
+    A diferencia de TransactionCase, cada hilo abre su propio cursor: los
+    créditos de prueba se confirman en la base y se eliminan al terminar.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.registry = Registry(get_db_name())
+
+    def _crear_creditos(self, cantidad, codigo):
+        """Confirma ``cantidad`` créditos activos en una caja nueva.
+
+        :return: lista de (crédito, primera cuota, monto total de la cuota)
+        """
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            caja = env['eps.caja'].create({
+                'name': f'Caja Concurrencia {codigo}',
+                'codigo': codigo,
+                'tasa_interes_prestamo': 12.0,
+            })
+            socio = env['res.partner'].create({'name': f'Socia Concurrencia {codigo}'})
+            creditos = env['cartera.credito'].create([{
+                'socio_id': socio.id,
+                'caja_id': caja.id,
+                'fecha': date.today(),
+                'monto': 1200.0,
+                'plazo': 12,
+                'tasa': 12.0,
+                'metodo_amortizacion': 'frances',
+            } for __ in range(cantidad)])
+            creditos.action_aprobar()
+            creditos.action_activar()
+            cuotas = [credito.cuota_ids.sorted('numero_cuota')[0] for credito in creditos]
+            datos = [(cuota.credito_id.id, cuota.id, cuota.monto_total) for cuota in cuotas]
+            self.addCleanup(self._eliminar, caja.id, socio.id, creditos.ids)
+        return datos
+
+    def _eliminar(self, caja_id, socio_id, credito_ids):
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            env['cartera.pago'].search([('credito_id', 'in', credito_ids)]).unlink()
+            env['cartera.credito'].browse(credito_ids).unlink()
+            env['eps.caja'].browse(caja_id).unlink()
+            env['res.partner'].browse(socio_id).unlink()
+
+    def _pagar(self, credito_id, cuota_id, monto, barrera=None):
+        """Registra un pago en su propia transacción, reintentando ante conflictos.
+
+        :return: (pagado, reintentos); ``pagado`` es False si la validación
+            rechazó el pago por exceder el saldo
+        """
+        reintentos = 0
+        while True:
+            with self.registry.cursor() as cr:
+                env = api.Environment(cr, SUPERUSER_ID, {})
+                try:
+                    if barrera and not reintentos:
+                        barrera.wait()
+                    env['cartera.pago'].create({
+                        'credito_id': credito_id,
+                        'cuota_id': cuota_id,
+                        'monto': monto,
+                    })
+                    env.flush_all()
+                    cr.commit()
+                    return True, reintentos
+                except ERRORES_CONCURRENCIA:
+                    cr.rollback()
+                except ValidationError:
+                    cr.rollback()
+                    return False, reintentos
+            reintentos += 1
+            if reintentos > MAX_REINTENTOS:
+                raise AssertionError('El pago no se pudo registrar tras %s reintentos' % MAX_REINTENTOS)
+
+    def _estado_cuota(self, cuota_id):
+        """Saldo almacenado de la cuota y suma real de sus pagos, leídos de la base"""
+        with self.registry.cursor() as cr:
+            cr.execute("""
+                SELECT c.monto_total, c.monto_pagado, c.saldo_pendiente,
+                       COALESCE((SELECT SUM(p.monto) FROM cartera_pago p WHERE p.cuota_id = c.id), 0)
+                  FROM cartera_cuota c
+                 WHERE c.id = %s
+            """, [cuota_id])
+            return cr.fetchone()
+
+    def _assert_sin_sobrepago(self, cuota_id):
+        total, pagado, saldo, suma_pagos = self._estado_cuota(cuota_id)
+        self.assertLessEqual(suma_pagos, total + 0.01)
+        self.assertAlmostEqual(pagado, suma_pagos, places=2)
+        self.assertGreaterEqual(saldo, -0.01)
+
+
+@tagged('post_install', '-at_install')
+class TestPagosConcurrentes(PagosConcurrentesCommon):
+
+    def _esperar_bloqueo(self, segundos=10):
+        """Espera a que alguna transacción de la base quede esperando un bloqueo"""
+        limite = time.monotonic() + segundos
+        with self.registry.cursor() as cr:
+            while time.monotonic() < limite:
+                cr.execute("""
+                    SELECT COUNT(*)
+                      FROM pg_stat_activity
+                     WHERE datname = current_database()
+                       AND wait_event_type = 'Lock'
+                """)
+                if cr.fetchone()[0]:
+                    return
+                cr.rollback()
+                time.sleep(0.05)
+        self.fail('Ninguna transacción quedó esperando el bloqueo de la cuota')
+
+    def test_pago_en_espera_se_reintenta_con_el_saldo_actualizado(self):
+        """El segundo cajero espera, falla por serialización y al reintentar ve el primer pago"""
+        (credito_id, cuota_id, total), = self._crear_creditos(1, 'CCA')
+        monto = round(total * 0.6, 2)
+        resultado = {}
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            env['cartera.pago'].create({'credito_id': credito_id, 'cuota_id': cuota_id, 'monto': monto})
+            env.flush_all()
+            hilo = threading.Thread(
+                target=lambda: resultado.update(segundo=self._pagar(credito_id, cuota_id, monto))
+            )
+            hilo.start()
+            self._esperar_bloqueo()
+            cr.commit()
+        hilo.join(timeout=60)
+        self.assertFalse(hilo.is_alive())
+
+        pagado, reintentos = resultado['segundo']
+        self.assertGreaterEqual(reintentos, 1)
+        self.assertFalse(pagado, 'El reintento debe rechazar el pago que ya no cabe en el saldo')
+        self._assert_sin_sobrepago(cuota_id)
+
+    def test_varios_cajeros_no_sobrepagan_la_cuota(self):
+        (credito_id, cuota_id, total), = self._crear_creditos(1, 'CCB')
+        monto = round(total * 0.3, 2)
+        hilos = 6
+        barrera = threading.Barrier(hilos)
+        resultados = []
+
+        def cajero():
+            resultados.append(self._pagar(credito_id, cuota_id, monto, barrera))
+
+        trabajadores = [threading.Thread(target=cajero) for __ in range(hilos)]
+        for trabajador in trabajadores:
+            trabajador.start()
+        for trabajador in trabajadores:
+            trabajador.join(timeout=120)
+        self.assertFalse(any(trabajador.is_alive() for trabajador in trabajadores))
+
+        # Todos los hilos terminan: con pago registrado o rechazado por saldo
+        self.assertEqual(len(resultados), hilos)
+        self.assertEqual(sum(pagado for pagado, __ in resultados), 3)
+        self._assert_sin_sobrepago(cuota_id)
+
+
+@tagged('-standard', 'benchmark')
+class TestBenchmarkPagosConcurrentes(PagosConcurrentesCommon):
+    """Pagos por segundo con varios cajeros; se ejecuta con --test-tags=benchmark"""
+
+    def test_benchmark_pagos_concurrentes(self):
+        cuotas = self._crear_creditos(200, 'CCR')
+        hilos = 4
+        resultados = []
+
+        def cajero(asignadas):
+            for credito_id, cuota_id, total in asignadas:
+                # Dos abonos por cuota, de hilos distintos, para que haya contención
+                resultados.append(self._pagar(credito_id, cuota_id, round(total / 2, 2)))
+
+        trabajadores = [
+            threading.Thread(target=cajero, args=(cuotas[i::hilos] + cuotas[(i + 1) % hilos::hilos],))
+            for i in range(hilos)
+        ]
+        inicio = time.perf_counter()
+        for trabajador in trabajadores:
+            trabajador.start()
+        for trabajador in trabajadores:
+            trabajador.join()
+        duracion = time.perf_counter() - inicio
+
+        pagos = sum(pagado for pagado, __ in resultados)
+        reintentos = sum(reintento for __, reintento in resultados)
+        _logger.info('%s pagos concurrentes (%s hilos) en %.2f s: %.1f pagos/s, %s reintentos',
+                     pagos, hilos, duracion, pagos / duracion, reintentos)
+        self.assertEqual(pagos, len(resultados))
+        for __, cuota_id, __ in cuotas:
+            self._assert_sin_sobrepago(cuota_id)
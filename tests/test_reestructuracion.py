@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+from odoo import fields
+from odoo.tests import tagged
+
+from .common import CarteraCommon
+
+
+@tagged('post_install', '-at_install')
+class TestReestructuracion(CarteraCommon):
+
+    def test_conserva_la_deuda_total(self):
+        hoy = fields.Date.context_today(self.env['cartera.credito'])
+        credito = self._crear_credito(fecha=hoy - timedelta(days=100))
+        cuotas = credito.cuota_ids.sorted('numero_cuota')
+        Pago = self.env['cartera.pago']
+        Pago.create({'credito_id': credito.id, 'cuota_id': cuotas[0].id, 'monto': cuotas[0].monto_total})
+        Pago.create({'credito_id': credito.id, 'cuota_id': cuotas[1].id, 'monto': cuotas[1].monto_interes + 10})
+        mora = self.env['cartera.mora'].create({
+            'cuota_id': cuotas[1].id,
+            'credito_id': credito.id,
+            'caja_id': self.caja.id,
+            'fecha': hoy - timedelta(days=1),
+            'monto': 4.25,
+        })
+
+        deuda = mora.monto
+        for cuota in cuotas.filtered(lambda c: c.saldo_pendiente > 0.01):
+            if cuota.fecha_vencimiento < hoy:
+                deuda += cuota.saldo_pendiente
+            else:
+                deuda += cuota.monto_capital - max(cuota.monto_pagado - cuota.monto_interes, 0)
+
+        registro = credito.reestructurar('cuota', hoy, 'Prueba')
+
+        nuevas = credito.cuota_ids.filtered(lambda c: not c.monto_pagado)
+        self.assertAlmostEqual(sum(nuevas.mapped('monto_capital')), deuda, delta=0.05)
+        self.assertAlmostEqual(registro.saldo_reestructurado, deuda, delta=0.01)
+        self.assertAlmostEqual(registro.mora_capitalizada, 4.25)
+        self.assertGreater(registro.interes_capitalizado, 0)
+        self.assertEqual(mora.reestructuracion_id, registro)
+
+        # La mora ya capitalizada no se vuelve a sumar
+        segundo = credito.reestructurar('cuota', hoy, 'Prueba')
+        self.assertFalse(segundo.mora_capitalizada)
+        self.assertFalse(segundo.interes_capitalizado)
+        self.assertAlmostEqual(segundo.saldo_reestructurado, registro.saldo_reestructurado, delta=0.05)
+
+    def test_conserva_la_mora_de_las_cuotas_eliminadas(self):
+        hoy = fields.Date.context_today(self.env['cartera.credito'])
+        credito = self._crear_credito(fecha=hoy - timedelta(days=100))
+        cuotas = credito.cuota_ids.sorted('numero_cuota')
+        # Una cuota vigente mayor hace que la modalidad 'plazo' necesite menos cuotas
+        cuotas[0].monto_total = cuotas[0].monto_total * 2
+        Mora = self.env['cartera.mora']
+        moras = Mora.create([{
+            'cuota_id': cuota.id,
+            'credito_id': credito.id,
+            'caja_id': self.caja.id,
+            'fecha': hoy - timedelta(days=1),
+            'monto': 1.5,
+        } for cuota in (cuotas[0], cuotas[-1])])
+
+        registro = credito.reestructurar('plazo', hoy, 'Prueba')
+
+        self.assertGreater(registro.num_eliminadas, 0)
+        self.assertFalse(cuotas[-1].exists())
+        self.assertEqual(len(moras.exists()), 2)
+        self.assertEqual(moras.reestructuracion_id, registro)
+        self.assertEqual(moras.cuota_id, cuotas[0])
+        self.assertAlmostEqual(registro.mora_capitalizada, 3.0)
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+
+from .common import CarteraCommon
+
+
+@tagged('post_install', '-at_install')
+class TestSecuenciasCaja(CarteraCommon):
+
+    def _secuencias(self, caja):
+        return self.env['ir.sequence'].sudo().search([('caja_id', '=', caja.id)])
+
+    def test_secuencias_creadas_con_la_caja(self):
+        caja = self.env['eps.caja'].create({'name': 'Caja Norte', 'codigo': 'NOR'})
+        secuencias = self._secuencias(caja)
+        self.assertEqual(set(secuencias.mapped('code')) & {'cartera.credito', 'cartera.pago'},
+                         {'cartera.credito', 'cartera.pago'})
+        credito = self._crear_credito(activar=False, caja_id=caja.id)
+        self.assertEqual(credito.name, 'NOR-CRE00001')
+        # La reserva usó la secuencia existente, sin crear otra
+        self.assertEqual(self._secuencias(caja), secuencias)
+
+    def test_cambio_de_codigo_actualiza_prefijo(self):
+        caja = self.env['eps.caja'].create({'name': 'Caja Sur', 'codigo': 'SUR'})
+        caja.codigo = 'SR'
+        secuencia = self._secuencias(caja).filtered(lambda s: s.code == 'cartera.credito')
+        self.assertEqual(secuencia.prefix, 'SR-CRE')
+
+    def test_caja_sin_secuencia_la_crea_al_reservar(self):
+        caja = self.env['eps.caja'].create({'name': 'Caja Antigua', 'codigo': 'ANT'})
+        self._secuencias(caja).unlink()
+        nombres = self.env['ir.sequence'].siguientes_por_caja('cartera.pago', [caja.id, caja.id])
+        self.assertEqual(nombres, ['ANT-PAG000001', 'ANT-PAG000002'])
+        self.assertEqual(len(self._secuencias(caja)), 1)
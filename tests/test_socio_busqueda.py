@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+
+from odoo.tests import TransactionCase, tagged
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('post_install', '-at_install')
+class TestBusquedaSocios(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.caja = cls.env['eps.caja'].create({'name': 'Caja Búsqueda', 'codigo': 'CB'})
+        cls.maria = cls.env['eps.socio'].create({
+            'name': 'María', 'apellido': 'Guamán Quishpe', 'cedula': '1710034065', 'caja_id': cls.caja.id,
+        })
+
+    def test_nombre_mostrado(self):
+        self.assertEqual(self.maria.display_name, 'María (1710034065)')
+
+    def test_busqueda_por_cedula_con_formato(self):
+        resultado = self.env['eps.socio'].name_search('171003406-5')
+        self.assertEqual(resultado, [(self.maria.id, 'María (1710034065)')])
+
+    def test_busqueda_por_parte_del_apellido(self):
+        resultado = self.env['eps.socio'].name_search('Quishpe')
+        self.assertIn(self.maria.id, [socio_id for socio_id, __ in resultado])
+        # Los filtros de lista usan el mismo criterio
+        self.assertEqual(self.env['eps.socio'].search([('display_name', 'ilike', 'Quishpe')]), self.maria)
+
+
+@tagged('-standard', 'benchmark')
+class TestBenchmarkBusquedaSocios(TransactionCase):
+    """Autocompletado sobre 200.000 socios; se ejecuta con --test-tags=benchmark"""
+
+    def test_benchmark_name_search_200k(self):
+        if not self.env.registry.has_trigram:
+            self.skipTest('pg_trgm no está disponible')
+        caja = self.env['eps.caja'].create({'name': 'Caja Benchmark', 'codigo': 'BM'})
+        self.env.cr.execute("""
+            INSERT INTO eps_socio (name, apellido, nombre_completo, cedula, cedula_norm, caja_id,
+                                   fecha_ingreso, genero, estado, active)
+            SELECT 'Socio' || n, 'Apellido' || (n % 5000), 'Socio' || n || ' Apellido' || (n % 5000),
+                   lpad(n::text, 10, '0'), lpad(n::text, 10, '0'), %s,
+                   CURRENT_DATE, 'mujer', 'activo', TRUE
+              FROM generate_series(1, 200000) AS n
+        """, (caja.id,))
+        self.env.cr.execute("ANALYZE eps_socio")
+
+        Socio = self.env['eps.socio']
+        terminos = ['Socio1234', 'Apelido42', 'Socio 99999', '0000123', 'Apellido4999']
+        duraciones = []
+        for termino in terminos:
+            inicio = time.perf_counter()
+            resultado = Socio.name_search(termino, limit=8)
+            duraciones.append(time.perf_counter() - inicio)
+            self.assertTrue(resultado, termino)
+        _logger.info(
+            'name_search sobre 200000 socios: promedio %.1f ms, máximo %.1f ms',
+            1000 * sum(duraciones) / len(duraciones), 1000 * max(duraciones),
+        )
+        self.assertLess(max(duraciones), 0.5)
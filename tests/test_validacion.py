@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import logging
+import random
+import time
+
+from odoo.exceptions import ValidationError
+from odoo.tests import TransactionCase, tagged
+
+from ..lib import validacion
+
+_logger = logging.getLogger(__name__)
+
+
+def _cedula_aleatoria(generador):
+    """Cédula con provincia, tercer dígito y dígito verificador válidos"""
+    digitos = [*divmod(generador.randint(1, 24), 10), generador.randint(0, 5)]
+    digitos += [generador.randint(0, 9) for __ in range(6)]
+    suma = sum(validacion._DOBLE[d] for d in digitos[0:9:2]) + sum(digitos[1:9:2])
+    return ''.join(map(str, digitos + [(10 - suma % 10) % 10]))
+
+
+@tagged('post_install', '-at_install')
+class TestValidacion(TransactionCase):
+
+    def test_codigos_de_error(self):
+        self.assertIsNone(validacion.validar_cedula('171003406-5'))
+        self.assertEqual(validacion.validar_cedula('17100340A5'), validacion.CEDULA_NO_NUMERICA)
+        self.assertEqual(validacion.validar_cedula('171003406'), validacion.CEDULA_LONGITUD)
+        self.assertEqual(validacion.validar_cedula('9910034065'), validacion.CEDULA_PROVINCIA)
+        self.assertEqual(validacion.validar_cedula('1790034065'), validacion.CEDULA_TERCER_DIGITO)
+        self.assertEqual(validacion.validar_cedula('1710034066'), validacion.CEDULA_VERIFICADOR)
+        self.assertEqual(validacion.validar_telefono('09912345'), validacion.TELEFONO_LONGITUD)
+
+    def test_mensaje_traducible_en_restriccion(self):
+        caja = self.env['eps.caja'].create({'name': 'Caja Validación', 'codigo': 'CV'})
+        with self.assertRaisesRegex(ValidationError, 'no es válida'):
+            self.env['eps.socio'].create({
+                'name': 'Socio',
+                'cedula': '1710034066',
+                'caja_id': caja.id,
+            })
+
+
+@tagged('-standard', 'benchmark')
+class TestBenchmarkValidacion(TransactionCase):
+    """Validación masiva de cédulas; se ejecuta con --test-tags=benchmark"""
+
+    def test_benchmark_100k_cedulas(self):
+        generador = random.Random(20)
+        cedulas = [_cedula_aleatoria(generador) for __ in range(100000)]
+        validacion._validar_cedula.cache_clear()
+        inicio = time.perf_counter()
+        resultados = validacion.validar_cedulas(cedulas)
+        duracion = time.perf_counter() - inicio
+        _logger.info('100000 cédulas validadas en %.3f s', duracion)
+        self.assertFalse([cedula for cedula, error in resultados if error])
+        self.assertLess(duracion, 1.0)
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.tests import tagged
+
+from .common import CarteraCommon
+
+
+@tagged('post_install', '-at_install')
+class TestCronVencimientos(CarteraCommon):
+
+    def _ejecutar_cron(self):
+        with patch.object(self.env.cr, 'commit', lambda: None):
+            self.env['cartera.cuota']._cron_actualizar_vencimientos()
+
+    def test_cuota_atrasada_anterior_a_la_ultima_ejecucion(self):
+        """Una cuota vencida que quedó como pendiente se corrige aunque venza antes de la marca"""
+        hoy = fields.Date.context_today(self.env['cartera.cuota'])
+        credito = self._crear_credito(fecha=hoy - timedelta(days=100))
+        cuota = credito.cuota_ids.sorted('numero_cuota')[0]
+        self.env.flush_all()
+        self.env.cr.execute(
+            "UPDATE cartera_cuota SET estado = 'pendiente', dias_vencido = 0 WHERE id = %s", (cuota.id,)
+        )
+        self.env.cr.execute("UPDATE cartera_credito SET esta_vencido = FALSE WHERE id = %s", (credito.id,))
+        self.env.invalidate_all()
+        self.env['ir.config_parameter'].set_param(
+            'cartera.vencimientos_ultima_fecha', fields.Date.to_string(hoy - timedelta(days=1))
+        )
+
+        self._ejecutar_cron()
+
+        self.assertEqual(cuota.estado, 'vencida')
+        self.assertEqual(cuota.dias_vencido, (hoy - cuota.fecha_vencimiento).days)
+        self.assertTrue(credito.esta_vencido)
+
+    def test_dias_vencido_avanza(self):
+        hoy = fields.Date.context_today(self.env['cartera.cuota'])
+        credito = self._crear_credito(fecha=hoy - timedelta(days=100))
+        vencidas = credito.cuota_ids.filtered(lambda c: c.estado == 'vencida')
+        self.assertTrue(vencidas)
+        self.env.flush_all()
+        self.env.cr.execute("UPDATE cartera_cuota SET dias_vencido = 1 WHERE id = ANY(%s)", (vencidas.ids,))
+        self.env.invalidate_all()
+
+        self._ejecutar_cron()
+
+        for cuota in vencidas:
+            self.assertEqual(cuota.dias_vencido, (hoy - cuota.fecha_vencimiento).days)
+        # Una segunda ejecución el mismo día no hace nada
+        self._ejecutar_cron()
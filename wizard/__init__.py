@@ -1,2 +1,7 @@
 # -*- coding: utf-8 -*-
 from . import eps_socio_import_wizard
+from . import cartera_pago_import_wizard
+from . import cartera_abono_wizard
+from . import cartera_reestructuracion_wizard
+from . import cartera_estres_wizard
+from . import eps_socio_export_wizard
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+
+
+class CarteraAbonoWizard(models.TransientModel):
+    _name = 'cartera.abono.wizard'
+    _description = 'Asistente de abono distribuido entre cuotas'
+
+    credito_id = fields.Many2one('cartera.credito', string='Crédito', required=True,
+                                 domain=[('state', '=', 'activo')])
+    monto = fields.Float(string='Monto del Abono', required=True, digits=(16, 2))
+    fecha = fields.Date(string='Fecha de Pago', required=True, default=fields.Date.context_today)
+    comprobante = fields.Char(string='Comprobante', help='Número de comprobante o referencia bancaria')
+    notas = fields.Text(string='Notas')
+
+    def action_confirmar(self):
+        """Distribuye el abono sobre las cuotas más antiguas del crédito"""
+        self.ensure_one()
+
+        if self.monto <= 0:
+            raise UserError(_('El monto del abono debe ser mayor a cero.'))
+
+        pagos, remanentes = self.credito_id.distribuir_pago(
+            self.monto, fecha=self.fecha, comprobante=self.comprobante, notas=self.notas
+        )
+        remanente = remanentes[self.credito_id.id]
+        if remanente > 0:
+            raise UserError(_('El abono excede el saldo del crédito en $%.2f.') % remanente)
+
+        self.credito_id.message_post(
+            body=f'Abono de ${self.monto:.2f} distribuido en {len(pagos)} cuota(s): '
+                 f'{", ".join(pagos.mapped("name"))}',
+            message_type='notification'
+        )
+        return {'type': 'ir.actions.act_window_close'}
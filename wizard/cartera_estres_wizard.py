@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from odoo import models, fields, api, _
+
+_logger = logging.getLogger(__name__)
+
+
+class CarteraEstresWizard(models.TransientModel):
+    _name = 'cartera.estres.wizard'
+    _description = 'Asistente de simulación de escenarios de cartera'
+
+    caja_id = fields.Many2one('eps.caja', string='Caja de Ahorro',
+                              help='Vacío para simular la cartera de todas las cajas')
+    tasa_actual = fields.Float(string='Tasa Actual (%)', related='caja_id.tasa_interes_prestamo')
+    tasa_propuesta = fields.Float(string='Tasa Propuesta (%)', digits=(5, 2),
+                                  help='Nueva tasa de interés anual de préstamos a evaluar')
+    choque_tasa = fields.Float(string='Variación de Tasa (p.p.)', digits=(5, 2),
+                               help='Puntos porcentuales que se suman a la tasa de cada crédito')
+    tasa_incumplimiento = fields.Float(string='Incumplimiento Anual (%)', digits=(5, 2), default=5.0)
+    tasa_prepago = fields.Float(string='Prepago Anual (%)', digits=(5, 2), default=10.0)
+
+    resultado = fields.Text(string='Resultado', readonly=True)
+    state = fields.Selection([
+        ('draft', 'Borrador'),
+        ('en_cola', 'En Proceso'),
+        ('done', 'Completado'),
+        ('error', 'Error'),
+    ], default='draft')
+
+    @api.onchange('caja_id')
+    def _onchange_caja_id(self):
+        self.tasa_propuesta = self.caja_id.tasa_interes_prestamo
+
+    @api.onchange('tasa_propuesta')
+    def _onchange_tasa_propuesta(self):
+        if self.caja_id:
+            self.choque_tasa = self.tasa_propuesta - self.caja_id.tasa_interes_prestamo
+
+    def _preparar_escenarios(self):
+        """Escenarios individuales y combinado a partir de los parámetros del asistente"""
+        escenarios = []
+        if self.choque_tasa:
+            escenarios.append({'nombre': _('Tasa %+.2f p.p.') % self.choque_tasa,
+                               'choque_tasa': self.choque_tasa})
+        if self.tasa_incumplimiento:
+            escenarios.append({'nombre': _('Incumplimiento %.2f%%') % self.tasa_incumplimiento,
+                               'tasa_incumplimiento': self.tasa_incumplimiento})
+        if self.tasa_prepago:
+            escenarios.append({'nombre': _('Prepago %.2f%%') % self.tasa_prepago,
+                               'tasa_prepago': self.tasa_prepago})
+        if len(escenarios) > 1:
+            escenarios.append({
+                'nombre': _('Combinado'),
+                'choque_tasa': self.choque_tasa,
+                'tasa_incumplimiento': self.tasa_incumplimiento,
+                'tasa_prepago': self.tasa_prepago,
+            })
+        return escenarios
+
+    def action_simular(self):
+        """Encola la simulación; el proceso en segundo plano la toma de inmediato.
+
+        Recalcular toda la cartera puede tardar más que una petición web, por
+        lo que el cálculo no se hace en el servidor que atiende al usuario.
+        """
+        self.ensure_one()
+        self.write({'state': 'en_cola', 'resultado': False})
+        self.env.ref('prefectura_ute_6.ir_cron_cartera_simulacion_estres')._trigger()
+        return self._reabrir()
+
+    def action_actualizar(self):
+        """Vuelve a mostrar el asistente con el estado actual de la simulación"""
+        return self._reabrir()
+
+    def _reabrir(self):
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': 'cartera.estres.wizard',
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    @api.model
+    def _cron_procesar_simulaciones(self):
+        """Ejecutar las simulaciones en cola con los permisos de quien las pidió"""
+        for wizard in self.sudo().search([('state', '=', 'en_cola')], order='id'):
+            usuario = wizard.create_uid
+            try:
+                wizard.with_user(usuario).with_context(lang=usuario.lang)._simular()
+            except Exception as e:
+                _logger.exception('Error en la simulación de escenarios %s', wizard.id)
+                self.env.cr.rollback()
+                wizard.write({'state': 'error', 'resultado': str(e)})
+            self.env.cr.commit()
+
+    def _simular(self):
+        """Ejecuta la simulación y guarda el resumen por escenario"""
+        self.ensure_one()
+
+        resultados = self.env['cartera.credito'].simular_escenarios(
+            self._preparar_escenarios(), caja_ids=self.caja_id.ids or None
+        )
+        lineas = [
+            _('Créditos evaluados: %s | Capital pendiente: $%.2f')
+            % (resultados[0]['num_creditos'], resultados[0]['capital']),
+            '',
+        ]
+        for fila in resultados:
+            lineas += [
+                fila['nombre'],
+                _('  Interés esperado: $%.2f (%+.2f frente al base)')
+                % (fila['interes_esperado'], fila['variacion_interes']),
+                _('  Pérdida esperada: $%.2f') % fila['perdida_esperada'],
+                _('  Prepago esperado: $%.2f') % fila['prepago_esperado'],
+                _('  Cuota promedio: $%.2f') % fila['cuota_promedio'],
+            ]
+
+        self.write({
+            'resultado': '\n'.join(lineas),
+            'state': 'done',
+        })
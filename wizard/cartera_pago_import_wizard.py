@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+import base64
+import csv
+import datetime
+import io
+import logging
+
+_logger = logging.getLogger(__name__)
+
+try:
+    import openpyxl
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+    _logger.warning('openpyxl no está instalado. La importación de archivos XLSX no estará disponible.')
+
+
+class CarteraPagoImportWizard(models.TransientModel):
+    _name = 'cartera.pago.import.wizard'
+    _description = 'Asistente de importación de pagos por lote'
+
+    file = fields.Binary(string='Archivo', required=True, help='Archivo CSV o XLSX con los pagos recaudados')
+    filename = fields.Char(string='Nombre del archivo')
+    delimiter = fields.Selection([
+        (',', 'Coma (,)'),
+        (';', 'Punto y coma (;)'),
+        ('\t', 'Tabulador'),
+    ], string='Delimitador CSV', default=',', help='Solo aplica para archivos CSV')
+    fecha = fields.Date(string='Fecha por defecto', default=fields.Date.context_today,
+                        help='Fecha de pago para las filas que no la indiquen')
+
+    import_result = fields.Text(string='Resultado', readonly=True)
+    state = fields.Selection([
+        ('draft', 'Borrador'),
+        ('done', 'Completado'),
+    ], default='draft')
+
+    def action_import(self):
+        """Procesa el archivo y registra los pagos en un solo lote"""
+        self.ensure_one()
+
+        if not self.file:
+            raise UserError(_('Debe seleccionar un archivo.'))
+
+        file_content = base64.b64decode(self.file)
+
+        if self.filename and self.filename.endswith('.xlsx'):
+            if not OPENPYXL_AVAILABLE:
+                raise UserError(_('No se puede procesar archivos XLSX. Instale openpyxl: pip3 install openpyxl'))
+            rows = self._read_xlsx(file_content)
+        elif self.filename and (self.filename.endswith('.csv') or self.filename.endswith('.txt')):
+            rows = self._read_csv(file_content)
+        else:
+            raise UserError(_('Formato de archivo no soportado. Use CSV o XLSX.'))
+
+        self.write({
+            'import_result': self._process_rows(rows),
+            'state': 'done',
+        })
+
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': 'cartera.pago.import.wizard',
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    def _read_csv(self, file_content):
+        """Lee las filas de un archivo CSV"""
+        for encoding in ['utf-8', 'latin-1', 'iso-8859-1']:
+            try:
+                content_str = file_content.decode(encoding)
+                break
+            except UnicodeDecodeError:
+                continue
+        else:
+            raise UserError(_('No se pudo decodificar el archivo. Verifique el formato.'))
+
+        try:
+            return list(csv.DictReader(io.StringIO(content_str), delimiter=self.delimiter))
+        except csv.Error as e:
+            raise UserError(_('Error al leer el archivo CSV: %s') % str(e))
+
+    def _read_xlsx(self, file_content):
+        """Lee las filas de un archivo XLSX"""
+        try:
+            workbook = openpyxl.load_workbook(io.BytesIO(file_content), read_only=True, data_only=True)
+            sheet = workbook.active
+            iterador = sheet.iter_rows(values_only=True)
+            headers = next(iterador, None) or []
+            return [
+                {headers[i]: row[i] for i in range(len(headers)) if i < len(row)}
+                for row in iterador
+            ]
+        except Exception as e:
+            raise UserError(_('Error al leer el archivo XLSX: %s') % str(e))
+
+    def _process_rows(self, rows):
+        """Valida todas las filas en memoria y crea los pagos válidos con un único create.
+
+        Créditos y cuotas se resuelven con una búsqueda cada uno. El saldo de
+        cada cuota se descuenta a medida que se aceptan filas, de modo que
+        varios pagos a la misma cuota dentro del archivo se validan contra el
+        saldo que realmente queda. Las filas sin número de cuota se tratan
+        como abonos y se distribuyen sobre las cuotas pendientes más antiguas.
+        """
+        Pago = self.env['cartera.pago']
+        errors = []
+        imported = 0
+        skipped = 0
+
+        filas = []
+        for idx, row in enumerate(rows, start=2):
+            if not row or not any(row.values()):
+                continue
+            filas.append((idx, row))
+
+        nombres = {
+            str(self._get_value(row, ['credito', 'Credito', 'CREDITO', 'numero_credito']) or '').strip()
+            for idx, row in filas
+        }
+        creditos = self.env['cartera.credito'].search([('name', 'in', list(nombres))])
+        creditos_por_nombre = {credito.name: credito for credito in creditos}
+        cuotas = self.env['cartera.cuota'].search([('credito_id', 'in', creditos.ids)])
+        cuotas._bloquear_para_pago()
+        cuotas_por_numero = {(cuota.credito_id.id, cuota.numero_cuota): cuota for cuota in cuotas}
+        saldos = {cuota.id: cuota.saldo_pendiente for cuota in cuotas}
+        cuotas_por_credito = {}
+        for cuota in cuotas.sorted(lambda c: (c.credito_id.id, c.numero_cuota)):
+            if cuota.estado != 'pagada':
+                cuotas_por_credito.setdefault(cuota.credito_id.id, []).append(cuota)
+
+        vals_list = []
+        for idx, row in filas:
+            try:
+                nombre = str(self._get_value(row, ['credito', 'Credito', 'CREDITO', 'numero_credito']) or '').strip()
+                credito = creditos_por_nombre.get(nombre)
+                if not credito:
+                    raise UserError(f"Crédito {nombre} no encontrado")
+                if credito.state != 'activo':
+                    raise UserError(f"El crédito {nombre} no está activo")
+
+                monto = self._parse_float(self._get_value(row, ['monto', 'Monto', 'MONTO', 'valor', 'Valor']))
+                if not monto or monto <= 0:
+                    raise UserError("El monto del pago debe ser mayor a cero")
+
+                fecha = self._get_value(row, ['fecha', 'Fecha', 'FECHA', 'fecha_pago'])
+                fecha = self._parse_date(fecha) if fecha else self.fecha
+                comprobante = self._get_value(row, ['comprobante', 'Comprobante', 'COMPROBANTE', 'referencia'])
+                notas = self._get_value(row, ['notas', 'Notas', 'NOTAS', 'observaciones'])
+
+                numero = self._parse_int(self._get_value(row, ['cuota', 'Cuota', 'CUOTA', 'numero_cuota']))
+                if numero is None:
+                    # Sin cuota: abono distribuido sobre las cuotas más antiguas
+                    asignaciones, remanente = self.env['cartera.credito']._asignar_en_cascada(
+                        cuotas_por_credito.get(credito.id, []), monto, saldos
+                    )
+                    if remanente > 0:
+                        for cuota, aplicado in asignaciones:
+                            saldos[cuota.id] += aplicado
+                        raise UserError(f"El abono excede el saldo del crédito {nombre} en ${remanente:.2f}")
+                else:
+                    cuota = cuotas_por_numero.get((credito.id, numero))
+                    if not cuota:
+                        raise UserError(f"Cuota {numero} del crédito {nombre} no encontrada")
+
+                    error = Pago._verificar_monto(cuota, monto, saldos[cuota.id])
+                    if error:
+                        raise error
+                    saldos[cuota.id] -= monto
+                    asignaciones = [(cuota, monto)]
+
+                vals_list += [{
+                    'credito_id': credito.id,
+                    'cuota_id': cuota.id,
+                    'monto': aplicado,
+                    'fecha': fecha,
+                    'comprobante': comprobante,
+                    'notas': notas,
+                } for cuota, aplicado in asignaciones]
+                imported += 1
+
+            except Exception as e:
+                skipped += 1
+                errors.append(f"Fila {idx}: {str(e)}")
+
+        pagos = Pago._crear_distribuidos(vals_list)
+
+        result = f"""
+IMPORTACIÓN COMPLETADA
+
+Filas importadas: {imported}
+Filas omitidas: {skipped}
+Pagos registrados: {len(pagos)}
+Monto total: ${sum(pagos.mapped('monto')):.2f}
+
+"""
+        if errors:
+            result += "\nERRORES Y ADVERTENCIAS:\n"
+            result += "\n".join(errors[:50])
+            if len(errors) > 50:
+                result += f"\n... y {len(errors) - 50} errores más"
+
+        return result
+
+    def _get_value(self, row, possible_keys):
+        """Obtiene valor de un diccionario probando múltiples keys"""
+        for key in possible_keys:
+            if key in row and row[key]:
+                return row[key]
+        return None
+
+    def _parse_int(self, value):
+        """Convierte un valor a entero, o None si no es posible"""
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return None
+
+    def _parse_float(self, value):
+        """Convierte un valor a número aceptando coma decimal"""
+        if isinstance(value, (int, float)):
+            return float(value)
+        try:
+            return float(str(value).strip().replace(',', '.'))
+        except (TypeError, ValueError):
+            return None
+
+    def _parse_date(self, date_value):
+        """Convierte diferentes formatos de fecha a formato Odoo (YYYY-MM-DD)"""
+        if hasattr(date_value, 'strftime'):
+            return date_value.strftime('%Y-%m-%d')
+
+        date_str = str(date_value).strip()
+        for fmt in ['%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d', '%d.%m.%Y']:
+            try:
+                return datetime.datetime.strptime(date_str, fmt).strftime('%Y-%m-%d')
+            except ValueError:
+                continue
+
+        raise UserError(f"Fecha {date_str} no reconocida")
+
+    def action_close(self):
+        """Cierra el wizard y vuelve al historial de pagos"""
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': 'cartera.pago',
+            'view_mode': 'list,form',
+        }
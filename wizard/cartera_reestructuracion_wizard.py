@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields
+
+from ..models.cartera_reestructuracion import MODALIDADES_REESTRUCTURACION
+
+
+class CarteraReestructuracionWizard(models.TransientModel):
+    _name = 'cartera.reestructuracion.wizard'
+    _description = 'Asistente de reestructuración de crédito'
+
+    credito_id = fields.Many2one('cartera.credito', string='Crédito', required=True,
+                                 domain=[('state', '=', 'activo')])
+    modalidad = fields.Selection(MODALIDADES_REESTRUCTURACION, string='Modalidad',
+                                 required=True, default='cuota')
+    fecha = fields.Date(string='Fecha de Reestructuración', required=True,
+                        default=fields.Date.context_today,
+                        help='La primera cuota nueva vence un mes después de esta fecha')
+    motivo = fields.Text(string='Motivo', required=True)
+
+    def action_confirmar(self):
+        """Reestructura las cuotas pendientes y abre la bitácora generada"""
+        self.ensure_one()
+        registro = self.credito_id.reestructurar(
+            modalidad=self.modalidad, fecha=self.fecha, motivo=self.motivo
+        )
+        return {
+            'name': 'Reestructuración',
+            'type': 'ir.actions.act_window',
+            'res_model': 'cartera.reestructuracion',
+            'view_mode': 'form',
+            'res_id': registro.id,
+        }
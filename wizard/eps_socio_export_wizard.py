@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, _
+from odoo.exceptions import UserError
+from odoo.tools import SQL
+import csv
+import io
+import logging
+import re
+import tempfile
+
+_logger = logging.getLogger(__name__)
+
+try:
+    import openpyxl
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+# Filas que se traen del servidor en cada viaje
+TAMANO_LOTE = 5000
+
+# Edad a la fecha de exportación; los textos Sí/No se derivan de ella
+SQL_EDAD = "date_part('year', age(%(hoy)s, s.fecha_nacimiento))::int"
+
+
+def _si_no(condicion):
+    return f"CASE WHEN {condicion} THEN 'Sí' ELSE 'No' END"
+
+
+# (encabezado, expresión SQL) de cada columna del listado
+COLUMNAS_EXPORTACION = [
+    ('Cédula', 's.cedula'),
+    ('Nombres', 's.name'),
+    ('Apellidos', 's.apellido'),
+    ('Caja', 'c.name'),
+    ('Fecha Ingreso', "to_char(s.fecha_ingreso, 'YYYY-MM-DD')"),
+    ('Fecha Nacimiento', "to_char(s.fecha_nacimiento, 'YYYY-MM-DD')"),
+    ('Edad', SQL_EDAD),
+    ('Teléfono', 's.telefono'),
+    ('Correo', 's.email'),
+    ('Dirección', 's.direccion'),
+    ('Género', "CASE s.genero WHEN 'mujer' THEN 'Mujer' WHEN 'hombre' THEN 'Hombre' ELSE 'Otro' END"),
+    ('3ra Edad', _si_no(f'{SQL_EDAD} >= 65')),
+    ('Menor', _si_no(f'{SQL_EDAD} < 18')),
+    ('Discapacidad', _si_no('s.tiene_discapacidad')),
+    ('Tipo Discapacidad', 's.tipo_discapacidad'),
+    ('% Discapacidad', 's.porcentaje_discapacidad'),
+    ('Cabeza Hogar', _si_no('s.es_cabeza_hogar')),
+    ('Dependientes', 's.num_dependientes'),
+    ('Indígena', _si_no('s.es_indigena')),
+    ('Afroecuatoriano/a', _si_no('s.es_afroecuatoriano')),
+    ('Montubio/a', _si_no('s.es_montubio')),
+    ('Mestizo/a', _si_no('s.es_mestizo')),
+    ('Estado', "initcap(s.estado)"),
+]
+
+
+class EpsSocioExportWizard(models.TransientModel):
+    _name = 'eps.socio.export.wizard'
+    _description = 'Asistente de exportación de socios'
+
+    caja_id = fields.Many2one('eps.caja', string='Caja',
+                              help='Vacío para exportar los socios de todas las cajas')
+    formato = fields.Selection([
+        ('xlsx', 'Excel (XLSX)'),
+        ('csv', 'CSV'),
+    ], string='Formato', default='xlsx', required=True)
+    incluir_inactivos = fields.Boolean(string='Incluir inactivos', default=False)
+
+    def action_exportar(self):
+        """Descarga el listado de socios.
+
+        El archivo lo genera y envía el controlador de exportación, sin pasar
+        por un adjunto: se escribe en un archivo temporal que se borra al
+        terminar la descarga.
+        """
+        self.ensure_one()
+        if self.formato == 'xlsx' and not OPENPYXL_AVAILABLE:
+            raise UserError(_('No se puede generar archivos XLSX. Instale openpyxl: pip3 install openpyxl'))
+        self.env['eps.socio'].check_access('read')
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/prefectura_ute_6/socios/exportar/{self.id}',
+            'target': 'self',
+        }
+
+    def _generar_archivo(self):
+        """Escribe el listado en un archivo temporal.
+
+        Las filas se leen por lotes con un cursor del lado del servidor y se
+        escriben directamente en el archivo (XLSX en modo de solo escritura o
+        CSV), de modo que la memoria usada no crece con el número de socios.
+        Las columnas derivadas (edad, textos Sí/No) se calculan en la misma
+        consulta.
+
+        :return: (archivo abierto y rebobinado, nombre, tipo MIME); quien lo
+            recibe debe cerrarlo
+        """
+        self.ensure_one()
+        if self.formato == 'xlsx' and not OPENPYXL_AVAILABLE:
+            raise UserError(_('No se puede generar archivos XLSX. Instale openpyxl: pip3 install openpyxl'))
+        self.env['eps.socio'].check_access('read')
+        self.env['eps.socio'].flush_model()
+
+        archivo = tempfile.TemporaryFile()
+        try:
+            if self.formato == 'xlsx':
+                total = self._escribir_xlsx(archivo)
+            else:
+                total = self._escribir_csv(archivo)
+            archivo.seek(0)
+        except Exception:
+            archivo.close()
+            raise
+        _logger.info('Exportación de socios: %s filas', total)
+        mimetype = ('text/csv' if self.formato == 'csv' else
+                    'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        return archivo, self._nombre_archivo(), mimetype
+
+    def _nombre_archivo(self):
+        """Nombre del archivo, con el nombre de la caja reducido a caracteres seguros"""
+        caja = re.sub(r'[^\w-]+', '_', self.caja_id.name or '').strip('_') or 'todas'
+        return f'socios_{caja}_{fields.Date.context_today(self)}.{self.formato}'
+
+    def _lotes(self):
+        """Recorre los socios a exportar por lotes con un cursor del lado del servidor"""
+        # Los socios se filtran con _search, que aplica las reglas de registro
+        # de eps.socio del usuario además de la caja y el estado elegidos
+        Socio = self.env['eps.socio'].with_context(active_test=not self.incluir_inactivos)
+        permitidos = Socio._search([('caja_id', '=', self.caja_id.id)] if self.caja_id else [])
+        consulta = SQL("""
+            SELECT %(columnas)s
+              FROM eps_socio s
+              JOIN eps_caja c ON c.id = s.caja_id
+             WHERE s.id IN %(permitidos)s
+          ORDER BY c.name, s.name, s.apellido, s.id
+        """,
+            columnas=SQL(', '.join(expresion for __, expresion in COLUMNAS_EXPORTACION),
+                         hoy=fields.Date.context_today(self)),
+            permitidos=permitidos.subselect(),
+        )
+        cursor = self.env.cr._cnx.cursor(name='eps_socio_exportacion')
+        cursor.itersize = TAMANO_LOTE
+        try:
+            cursor.execute(consulta.code, consulta.params)
+            while True:
+                filas = cursor.fetchmany(TAMANO_LOTE)
+                if not filas:
+                    break
+                yield filas
+        finally:
+            cursor.close()
+
+    def _escribir_xlsx(self, archivo):
+        libro = openpyxl.Workbook(write_only=True)
+        hoja = libro.create_sheet('Socios')
+        hoja.append([encabezado for encabezado, __ in COLUMNAS_EXPORTACION])
+        total = 0
+        for filas in self._lotes():
+            for fila in filas:
+                hoja.append(fila)
+            total += len(filas)
+        libro.save(archivo)
+        return total
+
+    def _escribir_csv(self, archivo):
+        texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+        escritor = csv.writer(texto)
+        escritor.writerow([encabezado for encabezado, __ in COLUMNAS_EXPORTACION])
+        total = 0
+        for filas in self._lotes():
+            escritor.writerows(filas)
+            total += len(filas)
+        texto.flush()
+        # Se separa el envoltorio para que no cierre el archivo temporal
+        texto.detach()
+        return total
@@ -6,6 +6,8 @@ import csv
 import io
 import logging
 
+from ..lib import validacion
+
 _logger = logging.getLogger(__name__)
 
 try:
@@ -111,34 +113,54 @@ class EpsSocioImportWizard(models.TransientModel):
 
     def _process_rows(self, rows):
         """Procesa las filas y crea/actualiza socios"""
+        Socio = self.env['eps.socio']
         created = 0
         updated = 0
         skipped = 0
         errors = []
         
-        for idx, row in enumerate(rows, start=2):
+        # Saltar filas vacías y validar todas las cédulas y teléfonos de una vez,
+        # para no intentar crear socios que la restricción rechazaría
+        filas = [(idx, row) for idx, row in enumerate(rows, start=2) if row and any(row.values())]
+        cedulas = validacion.validar_cedulas([
+            self._get_value(row, ['cedula', 'Cedula', 'CEDULA', 'CI', 'ci']) for __, row in filas
+        ])
+        telefonos = validacion.validar_telefonos([
+            self._get_value(row, ['telefono', 'Telefono', 'TELEFONO', 'tel', 'Tel', 'celular', 'Celular'])
+            for __, row in filas
+        ])
+        
+        # Socios ya registrados en la caja, en una sola consulta sobre el índice
+        # (caja_id, cedula_norm)
+        existentes = {
+            socio.cedula_norm: socio
+            for socio in self.env['eps.socio'].with_context(active_test=False).search([
+                ('caja_id', '=', self.caja_id.id),
+                ('cedula_norm', 'in', [cedula for cedula, error in cedulas if cedula and not error]),
+            ])
+        }
+        
+        for (idx, row), (cedula, error_cedula), (telefono, error_telefono) in zip(filas, cedulas, telefonos):
             try:
-                # Saltar filas vacías
-                if not row or not any(row.values()):
-                    continue
-                
-                # Extraer datos (soportar diferentes nombres de columnas)
-                cedula = self._get_value(row, ['cedula', 'Cedula', 'CEDULA', 'CI', 'ci'])
                 if not cedula:
                     skipped += 1
                     errors.append(f"Fila {idx}: Cédula vacía - omitida")
                     continue
+                if error_cedula:
+                    skipped += 1
+                    errors.append(f"Fila {idx}: Cédula {cedula}: {Socio._mensaje_validacion(error_cedula)} - omitida")
+                    continue
+                if telefono and error_telefono:
+                    skipped += 1
+                    errors.append(f"Fila {idx}: Teléfono {telefono}: {Socio._mensaje_validacion(error_telefono)} - omitida")
+                    continue
                 
                 # Preparar valores
                 values = self._prepare_values(row)
+                values['cedula'] = cedula
                 values['caja_id'] = self.caja_id.id
                 
-                # Buscar si existe
-                existing = self.env['eps.socio'].search([
-                    ('cedula', '=', str(cedula)),
-                    ('caja_id', '=', self.caja_id.id)
-                ], limit=1)
-                
+                existing = existentes.get(cedula)
                 if existing:
                     if self.update_existing:
                         existing.write(values)
@@ -147,7 +169,7 @@ class EpsSocioImportWizard(models.TransientModel):
                         skipped += 1
                         errors.append(f"Fila {idx}: Socio con cédula {cedula} ya existe - omitido")
                 else:
-                    self.env['eps.socio'].create(values)
+                    existentes[cedula] = self.env['eps.socio'].create(values)
                     created += 1
                     
             except Exception as e: